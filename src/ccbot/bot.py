@@ -32,13 +32,16 @@ import asyncio
 import io
 import logging
 from pathlib import Path
+from typing import Any
 
 from telegram import (
     Bot,
     BotCommand,
+    CallbackQuery,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     InputMediaDocument,
+    MaybeInaccessibleMessage,
     Update,
 )
 from telegram.constants import ChatAction
@@ -101,6 +104,7 @@ from .handlers.interactive_ui import (
 )
 from .handlers.message_queue import (
     clear_status_msg_info,
+    end_live_message,
     enqueue_content_message,
     get_message_queue,
     shutdown_workers,
@@ -112,8 +116,14 @@ from .handlers.message_sender import (
     safe_reply,
     safe_send,
 )
-from .markdown_v2 import convert_markdown
-from .handlers.response_builder import build_response_parts
+from .markdown_v2 import markdown_cache_stats
+from .handlers.response_builder import (
+    build_document_response,
+    build_response_parts_async,
+    convert_markdown_async,
+    render_stats,
+    shutdown_render_executor,
+)
 from .handlers.resume import (
     CB_RESUME_CANCEL,
     CB_RESUME_CONFIRM,
@@ -122,12 +132,15 @@ from .handlers.resume import (
     handle_resume_callback,
     resume_command,
 )
-from .handlers.status_polling import status_poll_loop
-from .screenshot import text_to_image
+from .handlers.status_polling import status_poll_loop, update_status_message
+from .hook import WAKE_EVENTS
+from .hook_server import start_hook_server, stop_hook_server
+from .screenshot import frame_digest, render_frame
 from .session import session_manager
+from .session_map import session_map_reader
 from .session_monitor import NewMessage, SessionMonitor
 from .terminal_parser import extract_bash_output
-from .tmux_manager import tmux_manager
+from .tmux_manager import TmuxWindow, tmux_manager
 
 logger = logging.getLogger(__name__)
 
@@ -137,6 +150,17 @@ session_monitor: SessionMonitor | None = None
 # Status polling task
 _status_poll_task: asyncio.Task | None = None
 
+# Unix socket server receiving `ccbot hook` events
+_hook_server: asyncio.AbstractServer | None = None
+
+# Hook wake-ups in progress: session_id -> another wake-up arrived meanwhile
+_hook_wakes: dict[str, bool] = {}
+
+# Frame each screenshot message shows: (chat_id, message_id) -> frame digest,
+# oldest first
+_screenshot_frames: dict[tuple[int, int], str] = {}
+_SCREENSHOT_FRAMES_MAX = 256
+
 # Claude Code commands shown in bot menu (forwarded via tmux)
 CC_COMMANDS: dict[str, str] = {
     "clear": "↗ Clear conversation history",
@@ -322,13 +346,14 @@ async def screenshot_command(
         await safe_reply(update.message, "❌ Failed to capture pane content.")
         return
 
-    png_bytes = await text_to_image(text, with_ansi=True)
+    digest, png_bytes = await _render_screenshot(w, text)
     keyboard = _build_screenshot_keyboard(wid)
-    await update.message.reply_document(
+    sent = await update.message.reply_document(
         document=io.BytesIO(png_bytes),
         filename="screenshot.png",
         reply_markup=keyboard,
     )
+    _remember_screenshot(sent, digest)
 
 
 async def esc_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -431,6 +456,48 @@ _KEY_LABELS: dict[str, str] = {
 }
 
 
+async def _render_screenshot(w: TmuxWindow, text: str) -> tuple[str, bytes]:
+    """Render captured pane text on the pane's own cell grid.
+
+    Returns (frame digest, PNG bytes); unchanged panes come from the
+    per-window frame cache.
+    """
+    return await render_frame(w.window_id, text, w.pane_width, w.pane_height)
+
+
+def _remember_screenshot(message: MaybeInaccessibleMessage, digest: str) -> None:
+    """Record which frame a screenshot message now shows."""
+    key = (message.chat.id, message.message_id)
+    _screenshot_frames.pop(key, None)
+    _screenshot_frames[key] = digest
+    if len(_screenshot_frames) > _SCREENSHOT_FRAMES_MAX:
+        del _screenshot_frames[next(iter(_screenshot_frames))]
+
+
+async def _edit_screenshot(query: CallbackQuery, w: TmuxWindow, text: str) -> bool:
+    """Show a new capture in the screenshot message behind a button press.
+
+    Returns False, without rendering or uploading, when the message
+    already shows this frame.  Errors from the edit propagate.
+    """
+    message = query.message
+    key = (message.chat.id, message.message_id) if message else None
+    if key and _screenshot_frames.get(key) == frame_digest(
+        text, w.pane_width, w.pane_height
+    ):
+        return False
+    digest, png_bytes = await _render_screenshot(w, text)
+    await query.edit_message_media(
+        media=InputMediaDocument(
+            media=io.BytesIO(png_bytes), filename="screenshot.png"
+        ),
+        reply_markup=_build_screenshot_keyboard(w.window_id),
+    )
+    if message:
+        _remember_screenshot(message, digest)
+    return True
+
+
 def _build_screenshot_keyboard(window_id: str) -> InlineKeyboardMarkup:
     """Build inline keyboard for screenshot: control keys + refresh."""
 
@@ -639,7 +706,7 @@ async def _capture_bash_output(
                     await bot.edit_message_text(
                         chat_id=chat_id,
                         message_id=msg_id,
-                        text=convert_markdown(output),
+                        text=await convert_markdown_async(output),
                         parse_mode="MarkdownV2",
                         link_preview_options=NO_LINK_PREVIEW,
                     )
@@ -790,6 +857,8 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
     await update.message.chat.send_action(ChatAction.TYPING)
     clear_status_msg_info(user.id, thread_id)
+    # A new turn starts a new live message (live-append mode)
+    end_live_message(user.id, thread_id)
 
     # Cancel any running bash capture — new message pushes pane content down
     _cancel_bash_capture(user.id, thread_id)
@@ -1219,16 +1288,9 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             await query.answer("Failed to capture pane", show_alert=True)
             return
 
-        png_bytes = await text_to_image(text, with_ansi=True)
-        keyboard = _build_screenshot_keyboard(window_id)
         try:
-            await query.edit_message_media(
-                media=InputMediaDocument(
-                    media=io.BytesIO(png_bytes), filename="screenshot.png"
-                ),
-                reply_markup=keyboard,
-            )
-            await query.answer("Refreshed")
+            changed = await _edit_screenshot(query, w, text)
+            await query.answer("Refreshed" if changed else "Unchanged")
         except Exception as e:
             logger.error(f"Failed to refresh screenshot: {e}")
             await query.answer("Failed to refresh", show_alert=True)
@@ -1382,18 +1444,10 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await asyncio.sleep(0.5)
         text = await tmux_manager.capture_pane(w.window_id, with_ansi=True)
         if text:
-            png_bytes = await text_to_image(text, with_ansi=True)
-            keyboard = _build_screenshot_keyboard(window_id)
             try:
-                await query.edit_message_media(
-                    media=InputMediaDocument(
-                        media=io.BytesIO(png_bytes),
-                        filename="screenshot.png",
-                    ),
-                    reply_markup=keyboard,
-                )
+                await _edit_screenshot(query, w, text)
             except Exception:
-                pass  # Screenshot unchanged or message too old
+                pass  # Message too old
 
 
 # --- Streaming response / notifications ---
@@ -1437,6 +1491,8 @@ async def handle_new_message(msg: NewMessage, bot: Bot) -> None:
         logger.info(f"No active users for session {msg.session_id}")
         return
 
+    parts: list[str] | None = None
+    document: tuple[str, str] | None = None
     for user_id, wid, thread_id in active_users:
         # Handle interactive tools specially - capture terminal and send UI
         if msg.tool_name in INTERACTIVE_TOOL_NAMES and msg.content_type == "tool_use":
@@ -1469,12 +1525,25 @@ async def handle_new_message(msg: NewMessage, bot: Bot) -> None:
         if get_interactive_msg_id(user_id, thread_id):
             await clear_interactive_msg(user_id, bot, thread_id)
 
-        parts = build_response_parts(
-            msg.text,
-            msg.is_complete,
-            msg.content_type,
-            msg.role,
-        )
+        # Render once per message and share the parts across subscribers.
+        # Content over its notify.json document threshold goes out as a
+        # preview plus one document upload instead of many [i/N] parts.
+        if parts is None:
+            threshold = config.notify.document_threshold(msg.content_type)
+            if (
+                msg.is_complete
+                and msg.role != "user"
+                and threshold
+                and len(msg.text) >= threshold
+            ):
+                parts, document = build_document_response(msg.text, msg.content_type)
+            else:
+                parts = await build_response_parts_async(
+                    msg.text,
+                    msg.is_complete,
+                    msg.content_type,
+                    msg.role,
+                )
 
         if msg.is_complete:
             # Enqueue content message task
@@ -1484,11 +1553,12 @@ async def handle_new_message(msg: NewMessage, bot: Bot) -> None:
                 bot=bot,
                 user_id=user_id,
                 window_id=wid,
-                parts=parts,
+                parts=list(parts),
                 tool_use_id=msg.tool_use_id,
                 content_type=msg.content_type,
                 text=msg.text,
                 thread_id=thread_id,
+                document=document,
             )
 
             # Update user's read offset to current file position
@@ -1505,8 +1575,45 @@ async def handle_new_message(msg: NewMessage, bot: Bot) -> None:
 # --- App lifecycle ---
 
 
+async def _handle_hook_event(bot: Bot, event: dict[str, Any]) -> None:
+    """Hook push from `ccbot hook`.
+
+    SessionStart: apply the updated session_map now and wake the monitor.
+    Wake events (Stop/PostToolUse/Notification): poll that session's JSONL
+    and its bound panes now.  Wake-ups arriving while one is running for
+    the same session are folded into a single follow-up poll.
+    """
+    name = event.get("event")
+    if name not in WAKE_EVENTS:
+        await session_map_reader.refresh()
+        if session_monitor:
+            session_monitor.wake()
+        return
+
+    session_id = event.get("session_id")
+    if not isinstance(session_id, str) or not session_id:
+        return
+    if session_id in _hook_wakes:
+        _hook_wakes[session_id] = True
+        return
+    _hook_wakes[session_id] = False
+    try:
+        while True:
+            if session_monitor:
+                await session_monitor.poll_session(session_id)
+            for user_id, wid, thread_id in await session_manager.find_users_for_session(
+                session_id
+            ):
+                await update_status_message(bot, user_id, wid, thread_id)
+            if not _hook_wakes[session_id]:
+                break
+            _hook_wakes[session_id] = False
+    finally:
+        _hook_wakes.pop(session_id, None)
+
+
 async def post_init(application: Application) -> None:
-    global session_monitor, _status_poll_task
+    global session_monitor, _status_poll_task, _hook_server
 
     await application.bot.delete_my_commands()
 
@@ -1541,13 +1648,23 @@ async def post_init(application: Application) -> None:
     session_monitor = monitor
     logger.info("Session monitor started")
 
+    # Push channel from `ccbot hook` (falls back to polling if unavailable)
+    async def hook_callback(event: dict[str, Any]) -> None:
+        await _handle_hook_event(application.bot, event)
+
+    _hook_server = await start_hook_server(config.hook_socket_file, hook_callback)
+
     # Start status polling task
     _status_poll_task = asyncio.create_task(status_poll_loop(application.bot))
     logger.info("Status polling task started")
 
 
 async def post_shutdown(application: Application) -> None:
-    global _status_poll_task
+    global _status_poll_task, _hook_server
+
+    if _hook_server:
+        await stop_hook_server(_hook_server, config.hook_socket_file)
+        _hook_server = None
 
     # Stop status polling
     if _status_poll_task:
@@ -1566,6 +1683,27 @@ async def post_shutdown(application: Application) -> None:
         session_monitor.stop()
         logger.info("Session monitor stopped")
 
+    # Write any state changes still waiting for the debounced save
+    await session_manager.flush_state()
+
+    stats = markdown_cache_stats()
+    logger.info(
+        "Markdown cache: %d hits, %d misses (hit rate %.0f%%)",
+        stats["hits"],
+        stats["misses"],
+        stats["hit_rate"] * 100,
+    )
+    for where, timing in render_stats().items():
+        if timing["count"]:
+            logger.info(
+                "Renders %s: %d (avg %.1fms, max %.1fms)",
+                where,
+                timing["count"],
+                timing["total"] / timing["count"] * 1000,
+                timing["max"] * 1000,
+            )
+    shutdown_render_executor()
+
 
 def create_bot() -> Application:
     application = (
@@ -7,6 +7,8 @@ The module-level `config` instance is imported by nearly every other module.
 
 Notification preferences are loaded from $CCBOT_DIR/notify.json.
 If the file doesn't exist, it is created with defaults (everything on).
+Its optional "document_threshold" map sets, per content type, the length
+from which a message is uploaded as a document instead of split.
 
 Key class: Config (singleton instantiated as `config`).
 """
@@ -18,7 +20,7 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-from .utils import ccbot_dir
+from .utils import HOOK_SOCKET_NAME, ccbot_dir
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,14 @@ NOTIFY_DEFAULTS: dict[str, bool] = {
     "user": True,  # User messages echoed back (👤 prefix)
 }
 
+# Message length (chars) from which content is sent as a short preview plus
+# a document upload instead of many [i/N] parts.  0 or missing = never.
+DOCUMENT_THRESHOLD_DEFAULTS: dict[str, int] = {
+    "text": 12000,
+    "tool_result": 12000,
+    "local_command": 12000,
+}
+
 
 class NotifyConfig:
     """Per-content-type notification toggle loaded from notify.json."""
@@ -41,6 +51,7 @@ class NotifyConfig:
     def __init__(self, config_dir: Path) -> None:
         self._file = config_dir / "notify.json"
         self._settings: dict[str, bool] = dict(NOTIFY_DEFAULTS)
+        self._document_thresholds: dict[str, int] = dict(DOCUMENT_THRESHOLD_DEFAULTS)
         self._load()
 
     def _load(self) -> None:
@@ -52,6 +63,11 @@ class NotifyConfig:
                     for key in NOTIFY_DEFAULTS:
                         if key in data and isinstance(data[key], bool):
                             self._settings[key] = data[key]
+                    thresholds = data.get("document_threshold")
+                    if isinstance(thresholds, dict):
+                        for key, value in thresholds.items():
+                            if isinstance(value, int) and not isinstance(value, bool):
+                                self._document_thresholds[key] = max(0, value)
                 logger.debug("Loaded notify config from %s", self._file)
             except (json.JSONDecodeError, OSError) as e:
                 logger.warning("Failed to read notify.json: %s (using defaults)", e)
@@ -63,7 +79,11 @@ class NotifyConfig:
     def _save(self) -> None:
         try:
             with open(self._file, "w", encoding="utf-8") as f:
-                json.dump(self._settings, f, indent=2)
+                json.dump(
+                    {**self._settings, "document_threshold": self._document_thresholds},
+                    f,
+                    indent=2,
+                )
                 f.write("\n")
         except OSError as e:
             logger.error("Failed to write notify.json: %s", e)
@@ -79,6 +99,10 @@ class NotifyConfig:
             return self._settings.get("tool_error", True)
         return self._settings.get(content_type, True)
 
+    def document_threshold(self, content_type: str) -> int:
+        """Length from which this content type is sent as a document (0 = never)."""
+        return self._document_thresholds.get(content_type, 0)
+
     def summary(self) -> str:
         """One-line summary for logging."""
         on = [k for k, v in self._settings.items() if v]
@@ -132,11 +156,51 @@ class Config:
         self.state_file = self.config_dir / "state.json"
         self.session_map_file = self.config_dir / "session_map.json"
         self.monitor_state_file = self.config_dir / "monitor_state.json"
+        self.hook_socket_file = self.config_dir / HOOK_SOCKET_NAME
+
+        # State storage: "json" (state.json / monitor_state.json rewritten in
+        # full) or "sqlite" (state.db, row-level writes; imports the JSON
+        # files on first start)
+        self.state_backend = os.getenv("STATE_BACKEND", "json").strip().lower()
+        if self.state_backend not in ("json", "sqlite"):
+            raise ValueError(
+                f"STATE_BACKEND must be 'json' or 'sqlite', got {self.state_backend!r}"
+            )
+        self.state_db_file = self.config_dir / "state.db"
 
         # Claude Code session monitoring configuration
         self.claude_projects_path = Path.home() / ".claude" / "projects"
         self.monitor_poll_interval = float(os.getenv("MONITOR_POLL_INTERVAL", "2.0"))
 
+        # How long the message queue worker waits for more mergeable content
+        # before sending (0 disables lingering)
+        self.message_merge_linger = float(os.getenv("MESSAGE_MERGE_LINGER", "0.3"))
+
+        # Messages at least this many chars are rendered on a worker thread
+        # instead of the event loop (0 renders everything inline)
+        self.render_offload_threshold = int(
+            os.getenv("RENDER_OFFLOAD_THRESHOLD", "1024")
+        )
+
+        # Opt-in: keep one live message per topic per turn and append new
+        # content to it by editing, instead of sending a message per entry
+        self.live_append = os.getenv("LIVE_APPEND", "").lower() in ("1", "true", "yes")
+
+        # Backpressure: once a user's queue holds this many tasks, or a tool
+        # message has waited this many seconds, queued tool messages are
+        # collapsed into one digest (0 disables each trigger)
+        self.tool_digest_backlog = int(os.getenv("TOOL_DIGEST_BACKLOG", "10"))
+        self.tool_digest_latency = float(os.getenv("TOOL_DIGEST_LATENCY", "15"))
+
+        # send_keys waits for the pane to echo typed text (or show bash
+        # mode) before pressing Enter, with the fixed delays as the upper
+        # bound; false always waits the full delays
+        self.send_keys_adaptive = os.getenv("SEND_KEYS_ADAPTIVE", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+
         # Display user messages in history and real-time notifications
         # When True, user messages are shown with a 👤 prefix
         self.show_user_messages = True
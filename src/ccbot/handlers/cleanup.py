@@ -13,7 +13,11 @@ from typing import Any
 from telegram import Bot
 
 from .interactive_ui import clear_interactive_msg
-from .message_queue import clear_status_msg_info, clear_tool_msg_ids_for_topic
+from .message_queue import (
+    clear_status_msg_info,
+    clear_tool_msg_ids_for_topic,
+    end_live_message,
+)
 
 
 async def clear_topic_state(
@@ -31,6 +35,7 @@ async def clear_topic_state(
     Cleans up:
       - _status_msg_info (status message tracking)
       - _tool_msg_ids (tool_use → message_id mapping)
+      - _live_msg_info (live-append message)
       - _interactive_msgs and _interactive_mode (interactive UI state)
       - user_data pending state (_pending_thread_id, _pending_thread_text)
     """
@@ -40,6 +45,9 @@ async def clear_topic_state(
     # Clear tool message ID tracking
     clear_tool_msg_ids_for_topic(user_id, thread_id)
 
+    # Stop appending to the topic's live message
+    end_live_message(user_id, thread_id)
+
     # Clear interactive UI state (also deletes message from chat)
     await clear_interactive_msg(user_id, bot, thread_id)
 
@@ -196,7 +196,8 @@ async def send_history(
             else:
                 lines.append(msg_text)
         full_text = "\n\n".join(lines)
-        pages = split_message(full_text, max_length=4096)
+        # Budget by escaped length so each page still fits once converted
+        pages = split_message(full_text, max_length=4000, markdown_v2=True)
 
         # Default to last page (newest messages) for both history and unread
         if offset < 0:
@@ -32,6 +32,7 @@ from .callback_data import (
     CB_ASK_TAB,
     CB_ASK_UP,
 )
+from .message_queue import end_live_message
 from .message_sender import NO_LINK_PREVIEW, rate_limit_send_message
 
 logger = logging.getLogger(__name__)
@@ -220,6 +221,8 @@ async def handle_interactive_ui(
     if sent:
         _interactive_msgs[ikey] = sent.message_id
         _interactive_mode[ikey] = window_id
+        # Content after the prompt must not be appended above it
+        end_live_message(user_id, thread_id)
         return True
     return False
 
@@ -3,8 +3,20 @@
 Provides a queue-based message processing system that ensures:
   - Messages are sent in receive order (FIFO)
   - Status messages always follow content messages
-  - Consecutive content messages can be merged for efficiency
+  - Consecutive content messages can be merged for efficiency, with a short
+    linger window so content arriving in quick succession shares one send
   - Rate limiting is respected
+  - Oversized content is delivered as a preview plus one document upload
+  - Optional live-append mode (LIVE_APPEND): one live message per topic per
+    turn, extended by editing until it nears 4096 chars or a tool_use /
+    interactive boundary arrives
+  - Backpressure: when a user's queue falls behind, queued tool_use /
+    tool_result messages collapse into one digest ("12 tool calls:
+    Read×5, Edit×4, Bash×3") so delivery lag stays bounded
+  - Status throttling: typing actions are sent at most once per Telegram
+    display lifetime, and status edits at most once per
+    STATUS_EDIT_INTERVAL per topic (latest text wins, intermediate
+    spinner frames are dropped)
   - Thread-aware sending: each MessageTask carries an optional thread_id
     for Telegram topic support
 
@@ -14,27 +26,55 @@ Key components:
   - Message queue worker: Background task processing user's queue
   - Content task processing with tool_use/tool_result handling
   - Status message tracking and conversion (keyed by (user_id, thread_id))
+  - end_live_message: Close the topic's live message (new turn / boundary)
 """
 
 import asyncio
 import logging
+import re
+import time
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import Literal
 
 from telegram import Bot
 from telegram.error import RetryAfter
 
+from ..config import config
 from ..markdown_v2 import convert_markdown
 from ..session import session_manager
 from ..terminal_parser import parse_context_info, parse_status_line
 from ..tmux_manager import tmux_manager
-from .message_sender import NO_LINK_PREVIEW, rate_limit_send_message
+from ..utils import ExpiringDict
+from .message_sender import (
+    NO_LINK_PREVIEW,
+    rate_limit_remaining,
+    rate_limit_send,
+    rate_limit_send_document,
+    rate_limit_send_message,
+)
+from .response_builder import convert_markdown_async
 
 logger = logging.getLogger(__name__)
 
 # Merge limit for content messages
 MERGE_MAX_LENGTH = 3800  # Leave room for markdown conversion overhead
 
+# How often the worker re-checks the queue while lingering for mergeable content
+MERGE_LINGER_STEP = 0.05  # seconds
+
+# Live-append mode rolls over to a new message beyond this (MarkdownV2) length
+LIVE_APPEND_MAX_LENGTH = 4000
+
+# Tool digests list at most this many error lines
+DIGEST_MAX_ERRORS = 5
+_TOOL_NAME_RE = re.compile(r"^\*\*([^*\n]+)\*\*")
+
+# Telegram shows a chat action for about 5s; resend just before it fades
+TYPING_ACTION_INTERVAL = 4.5  # seconds
+# Minimum gap between edits of one topic's status message
+STATUS_EDIT_INTERVAL = 3.0  # seconds
+
 
 @dataclass
 class MessageTask:
@@ -48,6 +88,10 @@ class MessageTask:
     tool_use_id: str | None = None
     content_type: str = "text"
     thread_id: int | None = None  # Telegram topic thread_id for targeted send
+    # (filename, body) uploaded after the parts, for content over the
+    # document threshold (parts then hold just a preview)
+    document: tuple[str, str] | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
 
 
 # Per-user message queues and worker tasks
@@ -55,13 +99,33 @@ _message_queues: dict[int, asyncio.Queue[MessageTask]] = {}
 _queue_workers: dict[int, asyncio.Task[None]] = {}
 _queue_locks: dict[int, asyncio.Lock] = {}  # Protect drain/refill operations
 
-# Map (tool_use_id, user_id, thread_id_or_0) -> telegram message_id
-# for editing tool_use messages with results
-_tool_msg_ids: dict[tuple[str, int, int], int] = {}
+# Map (user_id, thread_id_or_0) -> {tool_use_id: telegram message_id}
+# for editing tool_use messages with results.  A tool_result may never
+# arrive (interrupts, notify filtering), so each topic's map is capped and
+# entries expire.
+_tool_msg_ids: dict[tuple[int, int], ExpiringDict[str, int]] = {}
+TOOL_MSG_IDS_MAX_PER_TOPIC = 256
+TOOL_MSG_IDS_TTL = 6 * 3600.0  # seconds; long enough for slow agent tasks
 
 # Status message tracking: (user_id, thread_id_or_0) -> (message_id, window_id, last_text)
 _status_msg_info: dict[tuple[int, int], tuple[int, str, str]] = {}
 
+# Live-append mode: (user_id, thread_id_or_0) -> (message_id, window_id, text)
+# of the message new content is appended to (text is MarkdownV2)
+_live_msg_info: dict[tuple[int, int], tuple[int, str, str]] = {}
+
+# Status throttling, all keyed by (user_id, thread_id_or_0):
+#   _typing_sent_at: monotonic time of the last typing action
+#   _status_sent_at: monotonic time of the last status send/edit
+#   _status_seen_at: enqueue time of the newest status task processed
+#     (older tasks arriving later are stale frames and dropped)
+#   _status_pending: latest status held back by the edit interval, and the
+#     timer that re-queues it once the interval has passed
+_typing_sent_at: dict[tuple[int, int], float] = {}
+_status_sent_at: dict[tuple[int, int], float] = {}
+_status_seen_at: dict[tuple[int, int], float] = {}
+_status_pending: dict[tuple[int, int], tuple[MessageTask, asyncio.TimerHandle]] = {}
+
 
 def get_message_queue(user_id: int) -> asyncio.Queue[MessageTask] | None:
     """Get the message queue for a user (if exists)."""
@@ -95,20 +159,28 @@ def _inspect_queue(queue: asyncio.Queue[MessageTask]) -> list[MessageTask]:
     return items
 
 
+def _is_mergeable(task: MessageTask) -> bool:
+    """Check if a content task may take part in a merge chain.
+
+    tool_use/tool_result break merge chains:
+      - tool_use: will be edited later by tool_result
+      - tool_result: edits previous message, merging would cause order issues
+    Tasks carrying a document, and tool digests, also stand alone.
+    """
+    return task.document is None and task.content_type not in (
+        "tool_use",
+        "tool_result",
+        "tool_digest",
+    )
+
+
 def _can_merge_tasks(base: MessageTask, candidate: MessageTask) -> bool:
     """Check if two content tasks can be merged."""
     if base.window_id != candidate.window_id:
         return False
     if candidate.task_type != "content":
         return False
-    # tool_use/tool_result break merge chain
-    # - tool_use: will be edited later by tool_result
-    # - tool_result: edits previous message, merging would cause order issues
-    if base.content_type in ("tool_use", "tool_result"):
-        return False
-    if candidate.content_type in ("tool_use", "tool_result"):
-        return False
-    return True
+    return _is_mergeable(base) and _is_mergeable(candidate)
 
 
 async def _merge_content_tasks(
@@ -175,6 +247,158 @@ async def _merge_content_tasks(
     )
 
 
+async def _linger_and_merge(
+    queue: asyncio.Queue[MessageTask],
+    first: MessageTask,
+    lock: asyncio.Lock,
+    linger: float,
+) -> tuple[MessageTask, int]:
+    """Merge consecutive content tasks, waiting up to `linger` seconds for more.
+
+    Content often arrives in bursts a few tens of milliseconds apart (one
+    JSONL poll yields several entries), so merging only what is already
+    queued would still send each entry separately.  The linger is adaptive:
+      - Skipped when a backlog is already waiting (the queue is non-empty
+        after merging, i.e. the next task can't be merged anyway).
+      - Ends as soon as a non-mergeable task arrives or the length cap is hit.
+
+    Returns: (merged_task, merge_count), as _merge_content_tasks().
+    """
+    merged, total = await _merge_content_tasks(queue, first, lock)
+    if linger <= 0 or not _is_mergeable(merged) or not queue.empty():
+        return merged, total
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + linger
+    while (remaining := deadline - loop.time()) > 0:
+        await asyncio.sleep(min(MERGE_LINGER_STEP, remaining))
+        if queue.empty():
+            continue
+        merged, count = await _merge_content_tasks(queue, merged, lock)
+        total += count
+        if not queue.empty():
+            # Blocked by a non-mergeable task or the length cap — send now
+            break
+    return merged, total
+
+
+def _merge_linger(user_id: int, task: MessageTask) -> float:
+    """Linger window for a content task.
+
+    Time the rate limiter would make us wait anyway is free, so the window
+    is at least that long; MESSAGE_MERGE_LINGER=0 disables lingering.
+    """
+    if config.message_merge_linger <= 0:
+        return 0.0
+    chat_id = session_manager.resolve_chat_id(user_id, task.thread_id)
+    return max(config.message_merge_linger, rate_limit_remaining(chat_id))
+
+
+def _is_tool_task(task: MessageTask) -> bool:
+    """Check if a task is a tool_use/tool_result content message."""
+    return task.task_type == "content" and task.content_type in (
+        "tool_use",
+        "tool_result",
+    )
+
+
+def _lane_behind(queue: asyncio.Queue[MessageTask], task: MessageTask) -> bool:
+    """Check if the queue is far enough behind to collapse tool messages."""
+    backlog = config.tool_digest_backlog
+    latency = config.tool_digest_latency
+    if backlog > 0 and queue.qsize() >= backlog:
+        return True
+    return latency > 0 and time.monotonic() - task.enqueued_at >= latency
+
+
+async def _collapse_tool_backlog(
+    queue: asyncio.Queue[MessageTask],
+    first: MessageTask,
+    lock: asyncio.Lock,
+) -> tuple[MessageTask, int]:
+    """Collapse the queued run of tool messages starting at `first` into a digest.
+
+    The run covers consecutive tool_use/tool_result tasks for the same
+    window and topic; status tasks inside it are left queued, and any other
+    content (text, other topics) ends it, so text keeps its order.
+
+    Returns: (task_to_process, collapse_count) — collapse_count tasks were
+    absorbed into the digest (0 if there was nothing to collapse).
+    """
+    run = [first]
+    async with lock:
+        items = _inspect_queue(queue)
+        remaining: list[MessageTask] = []
+        blocked = False
+        for item in items:
+            if (
+                not blocked
+                and _is_tool_task(item)
+                and item.window_id == first.window_id
+                and item.thread_id == first.thread_id
+            ):
+                run.append(item)
+                continue
+            if item.task_type == "content":
+                blocked = True
+            remaining.append(item)
+
+        for item in remaining:
+            queue.put_nowait(item)
+            # Compensate for the duplicate count added by put_nowait
+            queue.task_done()
+
+    if len(run) == 1:
+        return first, 0
+
+    text = _build_tool_digest(run)
+    return (
+        MessageTask(
+            task_type="content",
+            text=text,
+            window_id=first.window_id,
+            parts=[convert_markdown(text)],
+            content_type="tool_digest",
+            thread_id=first.thread_id,
+        ),
+        len(run) - 1,
+    )
+
+
+def _build_tool_digest(tasks: list[MessageTask]) -> str:
+    """Summarize tool messages: call counts per tool plus error highlights."""
+    names: dict[str, str] = {}  # call key -> tool name, first seen order
+    errors: list[str] = []
+    for i, task in enumerate(tasks):
+        raw = task.text or ""
+        key = task.tool_use_id or f"#{i}"
+        m = _TOOL_NAME_RE.match(raw)
+        if key not in names or (m and names[key] == "Tool"):
+            names[key] = m.group(1) if m else "Tool"
+        if task.content_type == "tool_result" and (
+            "Error:" in raw or "\u23f9 Interrupted" in raw
+        ):
+            lines = [line.strip() for line in raw.split("\n") if line.strip()]
+            detail = next(
+                (line for line in lines if "Error:" in line or "Interrupted" in line),
+                "",
+            ).lstrip("⎿ ")
+            errors.append(
+                f"⚠️ {lines[0]}" + (f" — {detail}" if detail != lines[0] else "")
+            )
+
+    counts = Counter(names.values()).most_common()
+    calls = len(names)
+    summary = ", ".join(f"{name}×{n}" for name, n in counts)
+    lines = [f"🧰 {calls} tool call{'s' if calls != 1 else ''}: {summary}"]
+    if errors:
+        lines.append(f"{len(errors)} error{'s' if len(errors) != 1 else ''}:")
+        lines.extend(errors[:DIGEST_MAX_ERRORS])
+        if len(errors) > DIGEST_MAX_ERRORS:
+            lines.append(f"… and {len(errors) - DIGEST_MAX_ERRORS} more")
+    return "\n".join(lines)
+
+
 async def _message_queue_worker(bot: Bot, user_id: int) -> None:
     """Process message tasks for a user sequentially."""
     queue = _message_queues[user_id]
@@ -186,9 +410,22 @@ async def _message_queue_worker(bot: Bot, user_id: int) -> None:
             task = await queue.get()
             try:
                 if task.task_type == "content":
+                    # Falling behind: collapse queued tool messages
+                    if _is_tool_task(task) and _lane_behind(queue, task):
+                        task, collapsed = await _collapse_tool_backlog(
+                            queue, task, lock
+                        )
+                        if collapsed:
+                            logger.info(
+                                "Collapsed %d tool messages into a digest for user %d",
+                                collapsed + 1,
+                                user_id,
+                            )
+                            for _ in range(collapsed):
+                                queue.task_done()
                     # Try to merge consecutive content tasks
-                    merged_task, merge_count = await _merge_content_tasks(
-                        queue, task, lock
+                    merged_task, merge_count = await _linger_and_merge(
+                        queue, task, lock, _merge_linger(user_id, task)
                     )
                     if merge_count > 0:
                         logger.debug(f"Merged {merge_count} tasks for user {user_id}")
@@ -234,10 +471,15 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
     tid = task.thread_id or 0
     chat_id = session_manager.resolve_chat_id(user_id, task.thread_id)
 
+    live = config.live_append and _is_mergeable(task)
+    if not live:
+        # tool_use / tool_result / document: the next content starts afresh
+        _live_msg_info.pop((user_id, tid), None)
+
     # 1. Handle tool_result editing (merged parts are edited together)
     if task.content_type == "tool_result" and task.tool_use_id:
-        _tkey = (task.tool_use_id, user_id, tid)
-        edit_msg_id = _tool_msg_ids.pop(_tkey, None)
+        topic_ids = _tool_msg_ids.get((user_id, tid))
+        edit_msg_id = topic_ids.pop(task.tool_use_id) if topic_ids else None
         if edit_msg_id is not None:
             # Clear status message first
             await _do_clear_status_message(bot, user_id, tid)
@@ -251,6 +493,7 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
                     parse_mode="MarkdownV2",
                     link_preview_options=NO_LINK_PREVIEW,
                 )
+                await _send_task_document(bot, chat_id, task)
                 await _check_and_send_status(bot, user_id, wid, task.thread_id)
                 return
             except RetryAfter:
@@ -258,13 +501,14 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
             except Exception:
                 try:
                     # Fallback: strip markdown
-                    plain_text = task.text or full_text
+                    plain_text = full_text if task.document else task.text or full_text
                     await bot.edit_message_text(
                         chat_id=chat_id,
                         message_id=edit_msg_id,
                         text=plain_text,
                         link_preview_options=NO_LINK_PREVIEW,
                     )
+                    await _send_task_document(bot, chat_id, task)
                     await _check_and_send_status(bot, user_id, wid, task.thread_id)
                     return
                 except RetryAfter:
@@ -273,10 +517,20 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
                     logger.debug(f"Failed to edit tool msg {edit_msg_id}, sending new")
                     # Fall through to send as new message
 
-    # 2. Send content messages, converting status message to first content part
+    # 2. Live-append mode: extend the topic's live message where it fits
+    parts = task.parts
+    if live:
+        parts = await _append_to_live_message(bot, user_id, task)
+        if not parts:
+            # No new message takes over the status message (step 3), so
+            # drop it before step 7 sends a fresh one below the live message
+            await _do_clear_status_message(bot, user_id, tid)
+
+    # 3. Send content messages, converting status message to first content part
     first_part = True
     last_msg_id: int | None = None
-    for part in task.parts:
+    last_part = ""
+    for part in parts:
         sent = None
 
         # For first part, try to convert status message to content (edit instead of delete)
@@ -291,6 +545,7 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
             )
             if converted_msg_id is not None:
                 last_msg_id = converted_msg_id
+                last_part = part
                 continue
 
         sent = await rate_limit_send_message(
@@ -302,15 +557,99 @@ async def _process_content_task(bot: Bot, user_id: int, task: MessageTask) -> No
 
         if sent:
             last_msg_id = sent.message_id
+            last_part = part
 
-    # 3. Record tool_use message ID for later editing
+    # 4. Record tool_use message ID for later editing
     if last_msg_id and task.tool_use_id and task.content_type == "tool_use":
-        _tool_msg_ids[(task.tool_use_id, user_id, tid)] = last_msg_id
+        topic_ids = _tool_msg_ids.get((user_id, tid))
+        if topic_ids is None:
+            topic_ids = _tool_msg_ids[(user_id, tid)] = ExpiringDict(
+                TOOL_MSG_IDS_MAX_PER_TOPIC, TOOL_MSG_IDS_TTL
+            )
+        topic_ids[task.tool_use_id] = last_msg_id
+
+    # 5. The newest content message becomes the live message
+    if live and last_msg_id is not None:
+        _live_msg_info[(user_id, tid)] = (last_msg_id, wid, last_part)
+
+    # 6. Upload the full content, if the parts were only a preview
+    await _send_task_document(bot, chat_id, task)
 
-    # 4. After content, check and send status
+    # 7. After content, check and send status
     await _check_and_send_status(bot, user_id, wid, task.thread_id)
 
 
+async def _append_to_live_message(
+    bot: Bot, user_id: int, task: MessageTask
+) -> list[str]:
+    """Append as many leading parts as fit to the topic's live message.
+
+    Returns the parts that still need sending as new messages.  The live
+    message is dropped (rolled over) when nothing more fits, the window
+    changed, or the edit fails.
+    """
+    skey = (user_id, task.thread_id or 0)
+    info = _live_msg_info.get(skey)
+    if not info:
+        return task.parts
+    msg_id, stored_wid, combined = info
+    if stored_wid != (task.window_id or ""):
+        _live_msg_info.pop(skey, None)
+        return task.parts
+
+    appended = 0
+    for part in task.parts:
+        candidate = f"{combined}\n\n{part}"
+        if len(candidate) > LIVE_APPEND_MAX_LENGTH:
+            break
+        combined = candidate
+        appended += 1
+    if appended == 0:
+        _live_msg_info.pop(skey, None)
+        return task.parts
+
+    chat_id = session_manager.resolve_chat_id(user_id, task.thread_id)
+    await rate_limit_send(chat_id)
+    try:
+        await bot.edit_message_text(
+            chat_id=chat_id,
+            message_id=msg_id,
+            text=combined,
+            parse_mode="MarkdownV2",
+            link_preview_options=NO_LINK_PREVIEW,
+        )
+    except RetryAfter:
+        raise
+    except Exception as e:
+        logger.debug(f"Failed to append to live message {msg_id}: {e}")
+        _live_msg_info.pop(skey, None)
+        return task.parts
+
+    # end_live_message() may have closed it while the edit was in flight
+    if skey in _live_msg_info:
+        _live_msg_info[skey] = (msg_id, stored_wid, combined)
+    return task.parts[appended:]
+
+
+def end_live_message(user_id: int, thread_id: int | None = None) -> None:
+    """Stop appending to the topic's live message (next content starts a new one)."""
+    _live_msg_info.pop((user_id, thread_id or 0), None)
+
+
+async def _send_task_document(bot: Bot, chat_id: int, task: MessageTask) -> None:
+    """Upload a content task's document, if it has one."""
+    if task.document is None:
+        return
+    filename, body = task.document
+    await rate_limit_send_document(
+        bot,
+        chat_id,
+        filename,
+        body,
+        **_send_kwargs(task.thread_id),  # type: ignore[arg-type]
+    )
+
+
 async def _convert_status_to_content(
     bot: Bot,
     user_id: int,
@@ -323,6 +662,7 @@ async def _convert_status_to_content(
     Returns the message_id if converted successfully, None otherwise.
     """
     skey = (user_id, thread_id_or_0)
+    _cancel_pending_status(skey)
     info = _status_msg_info.pop(skey, None)
     if not info:
         return None
@@ -372,7 +712,12 @@ async def _convert_status_to_content(
 async def _process_status_update_task(
     bot: Bot, user_id: int, task: MessageTask
 ) -> None:
-    """Process a status update task."""
+    """Process a status update task.
+
+    Edits are throttled per topic: a change arriving within
+    STATUS_EDIT_INTERVAL of the last edit is held back, replacing any
+    earlier held-back text, and sent once the interval has passed.
+    """
     wid = task.window_id or ""
     tid = task.thread_id or 0
     chat_id = session_manager.resolve_chat_id(user_id, task.thread_id)
@@ -384,10 +729,20 @@ async def _process_status_update_task(
         await _do_clear_status_message(bot, user_id, tid)
         return
 
+    # Drop frames overtaken by a newer status for this topic
+    if task.enqueued_at < _status_seen_at.get(skey, 0.0):
+        return
+    _status_seen_at[skey] = task.enqueued_at
+
+    now = time.monotonic()
+
     # Send typing indicator if Claude is interruptible (working)
     from telegram.constants import ChatAction
 
-    if "esc to interrupt" in status_text.lower():
+    if "esc to interrupt" in status_text.lower() and (
+        now - _typing_sent_at.get(skey, float("-inf")) >= TYPING_ACTION_INTERVAL
+    ):
+        _typing_sent_at[skey] = now
         try:
             await bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
         except Exception:
@@ -403,15 +758,21 @@ async def _process_status_update_task(
             await _do_clear_status_message(bot, user_id, tid)
             await _do_send_status_message(bot, user_id, tid, wid, status_text)
         elif status_text == last_text:
-            # Same content, skip edit
-            pass
+            # Same content, skip edit (and any older held-back text)
+            _cancel_pending_status(skey)
         else:
+            wait = _status_sent_at.get(skey, float("-inf")) + STATUS_EDIT_INTERVAL - now
+            if wait > 0:
+                _defer_status_update(user_id, skey, task, wait)
+                return
             # Same window, text changed - edit in place
+            _cancel_pending_status(skey)
+            _status_sent_at[skey] = now
             try:
                 await bot.edit_message_text(
                     chat_id=chat_id,
                     message_id=msg_id,
-                    text=convert_markdown(status_text),
+                    text=await convert_markdown_async(status_text),
                     parse_mode="MarkdownV2",
                     link_preview_options=NO_LINK_PREVIEW,
                 )
@@ -438,6 +799,36 @@ async def _process_status_update_task(
         await _do_send_status_message(bot, user_id, tid, wid, status_text)
 
 
+def _defer_status_update(
+    user_id: int, skey: tuple[int, int], task: MessageTask, delay: float
+) -> None:
+    """Hold back a status update; the latest one is re-queued after delay."""
+    pending = _status_pending.get(skey)
+    if pending:
+        # Keep the running timer, just swap in the newer text
+        _status_pending[skey] = (task, pending[1])
+        return
+    handle = asyncio.get_running_loop().call_later(
+        delay, _requeue_pending_status, user_id, skey
+    )
+    _status_pending[skey] = (task, handle)
+
+
+def _requeue_pending_status(user_id: int, skey: tuple[int, int]) -> None:
+    """Timer callback: put the held-back status back on the user's queue."""
+    pending = _status_pending.pop(skey, None)
+    queue = _message_queues.get(user_id)
+    if pending and queue is not None:
+        queue.put_nowait(pending[0])
+
+
+def _cancel_pending_status(skey: tuple[int, int]) -> None:
+    """Discard a held-back status update (it was sent or superseded)."""
+    pending = _status_pending.pop(skey, None)
+    if pending:
+        pending[1].cancel()
+
+
 async def _do_send_status_message(
     bot: Bot,
     user_id: int,
@@ -455,6 +846,8 @@ async def _do_send_status_message(
         text,
         **_send_kwargs(thread_id),  # type: ignore[arg-type]
     )
+    _cancel_pending_status(skey)
+    _status_sent_at[skey] = time.monotonic()
     if sent:
         _status_msg_info[skey] = (sent.message_id, window_id, text)
 
@@ -466,6 +859,7 @@ async def _do_clear_status_message(
 ) -> None:
     """Delete the status message for a user (internal, called from worker)."""
     skey = (user_id, thread_id_or_0)
+    _cancel_pending_status(skey)
     info = _status_msg_info.pop(skey, None)
     if info:
         msg_id = info[0]
@@ -520,8 +914,9 @@ async def enqueue_content_message(
     content_type: str = "text",
     text: str | None = None,
     thread_id: int | None = None,
+    document: tuple[str, str] | None = None,
 ) -> None:
-    """Enqueue a content message task."""
+    """Enqueue a content message task (optionally with a document upload)."""
     logger.debug(
         "Enqueue content: user=%d, window_id=%s, content_type=%s",
         user_id,
@@ -538,6 +933,7 @@ async def enqueue_content_message(
         tool_use_id=tool_use_id,
         content_type=content_type,
         thread_id=thread_id,
+        document=document,
     )
     queue.put_nowait(task)
 
@@ -569,24 +965,24 @@ def clear_status_msg_info(user_id: int, thread_id: int | None = None) -> None:
     """Clear status message tracking for a user (and optionally a specific thread)."""
     skey = (user_id, thread_id or 0)
     _status_msg_info.pop(skey, None)
+    _cancel_pending_status(skey)
+    _typing_sent_at.pop(skey, None)
+    _status_sent_at.pop(skey, None)
+    _status_seen_at.pop(skey, None)
 
 
 def clear_tool_msg_ids_for_topic(user_id: int, thread_id: int | None = None) -> None:
     """Clear tool message ID tracking for a specific topic.
 
-    Removes all entries in _tool_msg_ids that match the given user and thread.
+    Drops the topic's whole tool_use_id map in one step.
     """
-    tid = thread_id or 0
-    # Find and remove all matching keys
-    keys_to_remove = [
-        key for key in _tool_msg_ids if key[1] == user_id and key[2] == tid
-    ]
-    for key in keys_to_remove:
-        _tool_msg_ids.pop(key, None)
+    _tool_msg_ids.pop((user_id, thread_id or 0), None)
 
 
 async def shutdown_workers() -> None:
     """Stop all queue workers (called during bot shutdown)."""
+    for skey in list(_status_pending):
+        _cancel_pending_status(skey)
     for user_id, worker in list(_queue_workers.items()):
         worker.cancel()
         try:
@@ -5,20 +5,23 @@ conversion to MarkdownV2 format and fallback to plain text on failure.
 
 Functions:
   - rate_limit_send: Rate limiter to avoid Telegram flood control
+  - rate_limit_remaining: Seconds until the next send to a chat is allowed
   - rate_limit_send_message: Combined rate limiting + send with fallback
+  - rate_limit_send_document: Rate-limited in-memory text document upload
   - safe_reply: Reply with MarkdownV2, fallback to plain text
   - safe_edit: Edit message with MarkdownV2, fallback to plain text
   - safe_send: Send message with MarkdownV2, fallback to plain text
 """
 
+import io
 import logging
 import time
 from typing import Any
 
 from telegram import Bot, LinkPreviewOptions, Message
-from telegram.error import RetryAfter
+from telegram.error import RetryAfter, TelegramError
 
-from ..markdown_v2 import convert_markdown
+from .response_builder import convert_markdown_async
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,14 @@ _last_send_time: dict[int, float] = {}
 MESSAGE_SEND_INTERVAL = 1.1  # seconds between messages to same user
 
 
+def rate_limit_remaining(user_id: int) -> float:
+    """Seconds until rate_limit_send() would let the next message through."""
+    last = _last_send_time.get(user_id)
+    if last is None:
+        return 0.0
+    return max(0.0, MESSAGE_SEND_INTERVAL - (time.time() - last))
+
+
 async def rate_limit_send(user_id: int) -> None:
     """Wait if necessary to avoid Telegram flood control (max 1 msg/sec per user)."""
     import asyncio
@@ -59,7 +70,7 @@ async def _send_with_fallback(
     try:
         return await bot.send_message(
             chat_id=chat_id,
-            text=convert_markdown(text),
+            text=await convert_markdown_async(text),
             parse_mode="MarkdownV2",
             **kwargs,
         )
@@ -92,12 +103,38 @@ async def rate_limit_send_message(
     return await _send_with_fallback(bot, chat_id, text, **kwargs)
 
 
+async def rate_limit_send_document(
+    bot: Bot,
+    chat_id: int,
+    filename: str,
+    body: str,
+    **kwargs: Any,
+) -> Message | None:
+    """Rate-limited upload of a text body as a document, streamed from memory.
+
+    Returns the sent Message on success, None on failure.
+    """
+    await rate_limit_send(chat_id)
+    try:
+        return await bot.send_document(
+            chat_id=chat_id,
+            document=io.BytesIO(body.encode("utf-8")),
+            filename=filename,
+            **kwargs,
+        )
+    except RetryAfter:
+        raise
+    except (TelegramError, OSError) as e:
+        logger.error(f"Failed to send document to {chat_id}: {e}")
+        return None
+
+
 async def safe_reply(message: Message, text: str, **kwargs: Any) -> Message:
     """Reply with MarkdownV2, falling back to plain text on failure."""
     kwargs.setdefault("link_preview_options", NO_LINK_PREVIEW)
     try:
         return await message.reply_text(
-            convert_markdown(text),
+            await convert_markdown_async(text),
             parse_mode="MarkdownV2",
             **kwargs,
         )
@@ -112,7 +149,7 @@ async def safe_edit(target: Any, text: str, **kwargs: Any) -> None:
     kwargs.setdefault("link_preview_options", NO_LINK_PREVIEW)
     try:
         await target.edit_message_text(
-            convert_markdown(text),
+            await convert_markdown_async(text),
             parse_mode="MarkdownV2",
             **kwargs,
         )
@@ -141,7 +178,7 @@ async def safe_send(
     try:
         await bot.send_message(
             chat_id=chat_id,
-            text=convert_markdown(text),
+            text=await convert_markdown_async(text),
             parse_mode="MarkdownV2",
             **kwargs,
         )
@@ -5,15 +5,61 @@ Builds paginated response messages from Claude Code output:
   - Converts markdown to Telegram MarkdownV2 format
   - Splits long messages into pages within Telegram's 4096 char limit
   - Truncates thinking content to keep messages compact
+  - Memoizes rendered parts so a message fanned out to several subscribers
+    (or re-delivered) is split and converted only once
+  - Renders large messages (and large standalone conversions, e.g. history
+    pages) on a worker thread so the event loop keeps serving tmux polling
+    and Telegram updates
+  - Builds a short preview plus a document body for messages too long to
+    send as parts (see NotifyConfig.document_threshold)
 
-Key function:
+Key functions:
   - build_response_parts: Build paginated response messages
+  - build_response_parts_async: Same, off-loop for large input
+  - convert_markdown_async: convert_markdown, off-loop for large input
+  - build_document_response: Preview part + document for huge messages
+  - render_stats: Inline/offloaded render counts and timings
+  - shutdown_render_executor: Stop the render worker thread
 """
 
-from ..markdown_v2 import convert_markdown
-from ..telegram_sender import split_message
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from ..config import config
+from ..markdown_v2 import convert_markdown, mdv2_escaped_length
+from ..telegram_sender import TELEGRAM_MAX_MESSAGE_LENGTH, split_message
 from ..transcript_parser import TranscriptParser
 
+logger = logging.getLogger(__name__)
+
+# Recently rendered messages kept for fan-out to multiple subscribers
+RENDER_CACHE_SIZE = 32
+
+# Escaped chars kept free in each part for the "[i/N]" suffix and the
+# converter's trailing newline
+PART_SUFFIX_RESERVE = 32
+# Smallest chunk budget tried when converted parts come out oversized
+MIN_SPLIT_BUDGET = 1024
+
+# Raw chars of content shown above a document upload
+DOCUMENT_PREVIEW_LENGTH = 800
+
+# Offloaded renders run on a single worker: conversions are CPU-bound, so
+# more threads would only contend for the GIL with the event loop.  Inline
+# and offloaded mistletoe renders still exclude each other through
+# markdown_v2's render lock.
+_render_executor: ThreadPoolExecutor | None = None
+
+# Render timing metrics, split by where the render ran
+_stats: dict[str, dict[str, float]] = {
+    "inline": {"count": 0, "total": 0.0, "max": 0.0},
+    "offloaded": {"count": 0, "total": 0.0, "max": 0.0},
+}
+
 
 def build_response_parts(
     text: str,
@@ -25,7 +71,134 @@ def build_response_parts(
 
     Returns a list of message strings, each within Telegram's 4096 char limit.
     Multi-part messages get a [1/N] suffix.
+
+    Results are memoized per (text, is_complete, content_type, role); each
+    call returns a fresh list so callers may mutate it freely.
     """
+    return list(_render_parts(text, is_complete, content_type, role))
+
+
+async def build_response_parts_async(
+    text: str,
+    is_complete: bool,
+    content_type: str = "text",
+    role: str = "assistant",
+) -> list[str]:
+    """Build response parts without blocking the event loop on large input.
+
+    Text at or above config.render_offload_threshold chars is rendered on
+    the render worker thread; smaller text is rendered inline, where it is
+    cheaper than a thread hop.
+    """
+    return await _render(build_response_parts, text, is_complete, content_type, role)
+
+
+async def convert_markdown_async(text: str) -> str:
+    """convert_markdown() that runs on the render worker for large input.
+
+    Used for text sent outside the response pipeline (safe_* senders,
+    history pages, status and bash-output edits).
+    """
+    return await _render(convert_markdown, text)
+
+
+async def _render[T](func: Callable[..., T], text: str, *args: object) -> T:
+    """Run func(text, *args) inline or on the render worker, by text length."""
+    threshold = config.render_offload_threshold
+    if threshold <= 0 or len(text) < threshold:
+        return _timed_render("inline", func, text, *args)
+
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ccbot-render"
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _render_executor, _timed_render, "offloaded", func, text, *args
+    )
+
+
+def _timed_render[T](where: str, func: Callable[..., T], text: str, *args: object) -> T:
+    """Call func(text, *args) and record the elapsed time under _stats[where]."""
+    start = time.perf_counter()
+    result = func(text, *args)
+    elapsed = time.perf_counter() - start
+    bucket = _stats[where]
+    bucket["count"] += 1
+    bucket["total"] += elapsed
+    bucket["max"] = max(bucket["max"], elapsed)
+    if where == "inline" and elapsed > 0.01:
+        logger.debug(
+            "Inline render of %d chars took %.0fms (offload threshold %d)",
+            len(text),
+            elapsed * 1000,
+            config.render_offload_threshold,
+        )
+    return result
+
+
+def build_document_response(
+    text: str,
+    content_type: str = "text",
+) -> tuple[list[str], tuple[str, str]]:
+    """Build a preview part and a (filename, body) document for a huge message.
+
+    Markdown content (text, thinking) becomes a .md file, tool and command
+    output a .txt file.  The preview is the first fence-balanced chunk of
+    the message followed by a size note.
+    """
+    start_tag = TranscriptParser.EXPANDABLE_QUOTE_START
+    end_tag = TranscriptParser.EXPANDABLE_QUOTE_END
+    body = text.replace(start_tag, "").replace(end_tag, "").strip()
+
+    if content_type in ("text", "thinking"):
+        filename = f"{content_type}.md"
+    else:
+        filename = f"{content_type}.txt"
+
+    preview = split_message(body, max_length=DOCUMENT_PREVIEW_LENGTH)[0]
+    if len(preview) < len(body):
+        preview += "\n…"
+    lines = body.count("\n") + 1
+    note = (
+        f"📎 Full content attached as {filename} ({len(body):,} chars, {lines:,} lines)"
+    )
+    part = convert_markdown(f"{preview}\n\n{note}")
+    return [part], (filename, body + "\n")
+
+
+def render_stats() -> dict[str, dict[str, float]]:
+    """Return render counts and timings (seconds) for inline/offloaded renders."""
+    return {where: dict(bucket) for where, bucket in _stats.items()}
+
+
+def shutdown_render_executor() -> None:
+    """Stop the render worker thread, if it was started."""
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=False, cancel_futures=True)
+        _render_executor = None
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render_parts(
+    text: str,
+    is_complete: bool,
+    content_type: str,
+    role: str,
+) -> tuple[str, ...]:
+    """Memoized rendering; returns an immutable tuple shared by all callers."""
+    return tuple(_build_parts(text, is_complete, content_type, role))
+
+
+def _build_parts(
+    text: str,
+    is_complete: bool,
+    content_type: str,
+    role: str,
+) -> list[str]:
+    """Split and convert a message (uncached body of build_response_parts)."""
     text = text.strip()
 
     # User messages: add emoji prefix (no newline)
@@ -69,25 +242,34 @@ def build_response_parts(
         else:
             return [convert_markdown(text)]
 
-    # Split markdown first, then convert each chunk to HTML.
-    # Use conservative max to leave room for HTML tags added by conversion.
-    max_text = 3000 - len(prefix) - len(separator)
+    # Split markdown first, then convert each chunk.  Chunks are budgeted by
+    # their MarkdownV2-escaped length, leaving room for the prefix and the
+    # [i/N] suffix; constructs the converter expands (tables, headings) are
+    # caught by re-splitting with a smaller budget.
+    budget = (
+        TELEGRAM_MAX_MESSAGE_LENGTH
+        - PART_SUFFIX_RESERVE
+        - mdv2_escaped_length(prefix + separator)
+    )
+    while True:
+        parts = _convert_chunks(
+            split_message(text, max_length=budget, markdown_v2=True),
+            prefix,
+            separator,
+        )
+        if budget <= MIN_SPLIT_BUDGET or all(
+            len(part) <= TELEGRAM_MAX_MESSAGE_LENGTH for part in parts
+        ):
+            return parts
+        budget = max(MIN_SPLIT_BUDGET, budget * 3 // 4)
 
-    text_chunks = split_message(text, max_length=max_text)
-    total = len(text_chunks)
 
+def _convert_chunks(chunks: list[str], prefix: str, separator: str) -> list[str]:
+    """Convert split chunks, adding the prefix and [i/N] page suffixes."""
+    total = len(chunks)
     if total == 1:
-        if prefix:
-            return [convert_markdown(f"{prefix}{separator}{text_chunks[0]}")]
-        else:
-            return [convert_markdown(text_chunks[0])]
-
-    parts = []
-    for i, chunk in enumerate(text_chunks, 1):
-        if prefix:
-            parts.append(
-                convert_markdown(f"{prefix}{separator}{chunk}\n\n[{i}/{total}]")
-            )
-        else:
-            parts.append(convert_markdown(f"{chunk}\n\n[{i}/{total}]"))
-    return parts
+        return [convert_markdown(f"{prefix}{separator}{chunks[0]}")]
+    return [
+        convert_markdown(f"{prefix}{separator}{chunk}\n\n[{i}/{total}]")
+        for i, chunk in enumerate(chunks, 1)
+    ]
@@ -9,20 +9,29 @@ Provides background polling of terminal status lines for all active users:
     (silent no-op when no pins); cleans up deleted topics (kills tmux window
     + unbinds thread)
 
+  - Probes each window's process tree through /proc CPU ticks
+    (probe_activity): panes that are clearly idle are captured once, then
+    only every IDLE_RECAPTURE_INTERVAL; while any is clearly busy the loop
+    polls every BUSY_POLL_INTERVAL
+
 Key components:
   - STATUS_POLL_INTERVAL: Polling frequency (1 second)
+  - BUSY_POLL_INTERVAL: Polling frequency while a window is busy (0.5 seconds)
   - TOPIC_CHECK_INTERVAL: Topic existence probe frequency (60 seconds)
   - status_poll_loop: Background polling task
   - update_status_message: Poll and enqueue status updates
+  - probe_activity: busy/idle/unknown from the pane's CPU accounting
 """
 
 import asyncio
 import logging
 import time
+from dataclasses import dataclass
 
 from telegram import Bot
 from telegram.error import BadRequest
 
+from .. import procfs
 from ..session import session_manager
 from ..terminal_parser import is_interactive_ui, parse_context_info, parse_status_line
 from ..tmux_manager import tmux_manager
@@ -42,6 +51,29 @@ STATUS_POLL_INTERVAL = 1.0  # seconds - faster response (rate limiting at send l
 # Topic existence probe interval
 TOPIC_CHECK_INTERVAL = 60.0  # seconds
 
+# Activity probe: CPU share of a pane's process tree (shell, claude and
+# its tools) between two polls.  Busy: at least BUSY_CPU_SHARE, or
+# processes started/exited.  Idle: below IDLE_CPU_SHARE.  In between (or
+# without /proc) the pane is captured every cycle as before.
+BUSY_CPU_SHARE = 0.10
+IDLE_CPU_SHARE = 0.02
+BUSY_POLL_INTERVAL = 0.5  # seconds, while any bound window is busy
+IDLE_RECAPTURE_INTERVAL = 15.0  # seconds between captures of an idle pane
+
+
+@dataclass
+class _Activity:
+    """Last CPU sample of a window's process tree."""
+
+    ticks: int
+    procs: int
+    at: float
+    # When the pane was last captured during the current idle stretch
+    idle_captured_at: float | None = None
+
+
+_activity: dict[str, _Activity] = {}  # window_id -> last sample
+
 # Cache last-known context % per window (the "NN% context left" line is only
 # visible when Claude is idle, not while it's actively working)
 _context_cache: dict[str, int] = {}  # window_id -> last known context %
@@ -116,6 +148,54 @@ async def update_status_message(
     # If no status line, keep existing status message (don't clear on transient state)
 
 
+async def probe_activity(window_id: str) -> str:
+    """Classify a window's process tree as "busy", "idle" or "unknown".
+
+    Compares the tree's CPU ticks (procfs.tree_cpu_ticks of the pane's
+    shell) with the previous probe of the same window.  The first probe,
+    an in-between CPU share, a vanished process and systems without /proc
+    all give "unknown".
+    """
+    if not procfs.available():
+        return "unknown"
+    pid = await tmux_manager.get_shell_pid(window_id)
+    sample = procfs.tree_cpu_ticks(pid) if pid else None
+    if sample is None:
+        _activity.pop(window_id, None)
+        return "unknown"
+    ticks, procs = sample
+    now = time.monotonic()
+    prev = _activity.get(window_id)
+    if prev is None:
+        _activity[window_id] = _Activity(ticks, procs, now)
+        return "unknown"
+
+    elapsed = now - prev.at
+    share = max(ticks - prev.ticks, 0) / (elapsed * procfs.CLK_TCK) if elapsed else 0
+    if procs != prev.procs or share >= BUSY_CPU_SHARE:
+        state = "busy"
+    elif share < IDLE_CPU_SHARE:
+        state = "idle"
+    else:
+        state = "unknown"
+    prev.ticks, prev.procs, prev.at = ticks, procs, now
+    if state != "idle":
+        prev.idle_captured_at = None
+    return state
+
+
+def _needs_capture(window_id: str, state: str, now: float) -> bool:
+    """Whether the poller should capture this window's pane this cycle.
+
+    An idle pane is captured once (its settled frame: final status,
+    permission prompt), then only every IDLE_RECAPTURE_INTERVAL.
+    """
+    if state != "idle":
+        return True
+    captured_at = _activity[window_id].idle_captured_at
+    return captured_at is None or now - captured_at >= IDLE_RECAPTURE_INTERVAL
+
+
 async def status_poll_loop(bot: Bot) -> None:
     """Background task to poll terminal status for all thread-bound windows."""
     logger.info("Status polling started (interval: %ss)", STATUS_POLL_INTERVAL)
@@ -162,7 +242,17 @@ async def status_poll_loop(bot: Bot) -> None:
                             e,
                         )
 
-            for user_id, thread_id, wid in list(session_manager.iter_thread_bindings()):
+            bindings = list(session_manager.iter_thread_bindings())
+            # One probe per window, shared by every topic bound to it
+            states = {}
+            for wid in {b[2] for b in bindings}:
+                states[wid] = await probe_activity(wid)
+            for wid in set(_activity) - set(states):
+                del _activity[wid]
+            now = time.monotonic()
+            captured: set[str] = set()
+
+            for user_id, thread_id, wid in bindings:
                 try:
                     # Clean up stale bindings (window no longer exists)
                     w = await tmux_manager.find_window_by_id(wid)
@@ -177,6 +267,8 @@ async def status_poll_loop(bot: Bot) -> None:
                         )
                         continue
 
+                    if not _needs_capture(wid, states[wid], now):
+                        continue
                     queue = get_message_queue(user_id)
                     if queue and not queue.empty():
                         continue
@@ -186,12 +278,19 @@ async def status_poll_loop(bot: Bot) -> None:
                         wid,
                         thread_id=thread_id,
                     )
+                    captured.add(wid)
                 except Exception as e:
                     logger.debug(
                         f"Status update error for user {user_id} "
                         f"thread {thread_id}: {e}"
                     )
+
+            for wid in captured:
+                if states[wid] == "idle" and wid in _activity:
+                    _activity[wid].idle_captured_at = now
+            busy = "busy" in states.values()
         except Exception as e:
             logger.error(f"Status poll loop error: {e}")
+            busy = False
 
-        await asyncio.sleep(STATUS_POLL_INTERVAL)
+        await asyncio.sleep(BUSY_POLL_INTERVAL if busy else STATUS_POLL_INTERVAL)
@@ -1,37 +1,91 @@
 """Hook subcommand for Claude Code session tracking.
 
 Called by Claude Code's SessionStart hook to maintain a window↔session
-mapping in <CCBOT_DIR>/session_map.json. Also provides `--install` to
+mapping in <CCBOT_DIR>/session_map.json, then pushes the event to the
+running bot over <CCBOT_DIR>/hook.sock (silently skipped when the bot is
+down; it reads the file on its next poll). Also provides `--install` to
 auto-configure the hook in ~/.claude/settings.json.
 
+Optionally (`--install --wake-events`) also runs on Stop, PostToolUse and
+Notification. Those events only forward a wake-up (session_id, event) to
+the bot, which then polls that session's JSONL and pane right away
+instead of on its next tick.
+
 This module must NOT import config.py (which requires TELEGRAM_BOT_TOKEN),
 since hooks run inside tmux panes where bot env vars are not set.
-Config directory resolution uses utils.ccbot_dir() (shared with config.py).
-
-Key functions: hook_main() (CLI entry), _install_hook().
+It runs on every session start, so the event path keeps its imports to
+json/os/sys, resolves the window with a single `tmux display-message` and
+records the entry under one lock with one write.
+
+The map is stored as session_map.json plus session_map.log, an append
+log of {"key", "entry"} lines (entry null = deleted) applied on top of it.
+A hook appends only its own entry; compact_session_map() folds the log
+back into session_map.json, when the log grows past COMPACT_LOG_BYTES and
+when the bot drops entries of dead windows.  load_session_map() returns
+the merged map.
+
+Config directory resolution mirrors utils.ccbot_dir() (shared with
+config.py) without importing pathlib.
+
+Key functions: hook_main() (CLI entry), _install_hook(), _resolve_window(),
+_update_session_map(), load_session_map(), compact_session_map(),
+_notify_bot().
 """
 
-import argparse
-import fcntl
 import json
-import logging
 import os
-import re
-import shutil
-import subprocess
 import sys
-from pathlib import Path
 
-logger = logging.getLogger(__name__)
+# Everything else (pathlib, logging, re, subprocess, argparse, socket) is
+# imported where it's needed: interpreter startup dominates the hook's cost.
+
+# Config directory (mirrors utils.ccbot_dir(), which needs pathlib)
+_CCBOT_DIR_ENV = "CCBOT_DIR"
+_SESSION_MAP_NAME = "session_map.json"
+# Hooks append to session_map.log; past this size the next hook folds it
+# into session_map.json (the bot also compacts it when collecting garbage)
+COMPACT_LOG_BYTES = 256 * 1024
+# Mirrors utils.HOOK_SOCKET_NAME
+_HOOK_SOCKET_NAME = "hook.sock"
 
-# Validate session_id looks like a UUID
-_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+_HEX = frozenset("0123456789abcdef")
 
-_CLAUDE_SETTINGS_FILE = Path.home() / ".claude" / "settings.json"
+# Overridden in tests; defaults to ~/.claude/settings.json
+_CLAUDE_SETTINGS_FILE = None
 
 # The hook command suffix for detection
 _HOOK_COMMAND_SUFFIX = "ccbot hook"
 
+# Events that only wake the bot (installed with --wake-events)
+WAKE_EVENTS = ("Stop", "PostToolUse", "Notification")
+
+# Give up on the bot socket after this; the session_map file still works
+_NOTIFY_TIMEOUT = 0.25  # seconds
+
+
+def _log(msg: str, *args: object) -> None:
+    """Report a problem on stderr (shown by Claude Code in debug mode)."""
+    print("ccbot hook: " + (msg % args if args else msg), file=sys.stderr)
+
+
+def _is_uuid(value: str) -> bool:
+    """Check that session_id looks like a lowercase UUID."""
+    if len(value) != 36:
+        return False
+    for i, ch in enumerate(value):
+        if i in (8, 13, 18, 23):
+            if ch != "-":
+                return False
+        elif ch not in _HEX:
+            return False
+    return True
+
+
+def _ccbot_dir() -> str:
+    """Config directory as a string (same rules as utils.ccbot_dir())."""
+    raw = os.environ.get(_CCBOT_DIR_ENV, "")
+    return raw if raw else os.path.join(os.path.expanduser("~"), ".ccbot")
+
 
 def _find_ccbot_path() -> str:
     """Find the full path to the ccbot executable.
@@ -40,6 +94,8 @@ def _find_ccbot_path() -> str:
     1. shutil.which("ccbot") - if ccbot is in PATH
     2. Same directory as the Python interpreter (for venv installs)
     """
+    import shutil
+
     # Try PATH first
     ccbot_path = shutil.which("ccbot")
     if ccbot_path:
@@ -47,24 +103,23 @@ def _find_ccbot_path() -> str:
 
     # Fall back to the directory containing the Python interpreter
     # This handles the case where ccbot is installed in a venv
-    python_dir = Path(sys.executable).parent
-    ccbot_in_venv = python_dir / "ccbot"
-    if ccbot_in_venv.exists():
-        return str(ccbot_in_venv)
+    ccbot_in_venv = os.path.join(os.path.dirname(sys.executable), "ccbot")
+    if os.path.exists(ccbot_in_venv):
+        return ccbot_in_venv
 
     # Last resort: assume it will be in PATH
     return "ccbot"
 
 
-def _is_hook_installed(settings: dict) -> bool:
-    """Check if ccbot hook is already installed in the settings.
+def _is_hook_installed(settings: dict, event: str = "SessionStart") -> bool:
+    """Check if ccbot hook is already installed for an event in the settings.
 
     Detects both 'ccbot hook' and full paths like '/path/to/ccbot hook'.
     """
     hooks = settings.get("hooks", {})
-    session_start = hooks.get("SessionStart", [])
+    entries = hooks.get(event, [])
 
-    for entry in session_start:
+    for entry in entries:
         if not isinstance(entry, dict):
             continue
         inner_hooks = entry.get("hooks", [])
@@ -78,12 +133,15 @@ def _is_hook_installed(settings: dict) -> bool:
     return False
 
 
-def _install_hook() -> int:
+def _install_hook(wake_events: bool = False) -> int:
     """Install the ccbot hook into Claude's settings.json.
 
+    Registers SessionStart, plus WAKE_EVENTS when wake_events is set.
     Returns 0 on success, 1 on error.
     """
-    settings_file = _CLAUDE_SETTINGS_FILE
+    from pathlib import Path
+
+    settings_file = _CLAUDE_SETTINGS_FILE or Path.home() / ".claude" / "settings.json"
     settings_file.parent.mkdir(parents=True, exist_ok=True)
 
     # Read existing settings
@@ -92,13 +150,13 @@ def _install_hook() -> int:
         try:
             settings = json.loads(settings_file.read_text())
         except (json.JSONDecodeError, OSError) as e:
-            logger.error("Error reading %s: %s", settings_file, e)
             print(f"Error reading {settings_file}: {e}", file=sys.stderr)
             return 1
 
     # Check if already installed
-    if _is_hook_installed(settings):
-        logger.info("Hook already installed in %s", settings_file)
+    events = ["SessionStart", *(WAKE_EVENTS if wake_events else ())]
+    missing = [e for e in events if not _is_hook_installed(settings, e)]
+    if not missing:
         print(f"Hook already installed in {settings_file}")
         return 0
 
@@ -106,15 +164,12 @@ def _install_hook() -> int:
     ccbot_path = _find_ccbot_path()
     hook_command = f"{ccbot_path} hook"
     hook_config = {"type": "command", "command": hook_command, "timeout": 5}
-    logger.info("Installing hook command: %s", hook_command)
 
     # Install the hook
     if "hooks" not in settings:
         settings["hooks"] = {}
-    if "SessionStart" not in settings["hooks"]:
-        settings["hooks"]["SessionStart"] = []
-
-    settings["hooks"]["SessionStart"].append({"hooks": [hook_config]})
+    for event in missing:
+        settings["hooks"].setdefault(event, []).append({"hooks": [dict(hook_config)]})
 
     # Write back
     try:
@@ -122,46 +177,26 @@ def _install_hook() -> int:
             json.dumps(settings, indent=2, ensure_ascii=False) + "\n"
         )
     except OSError as e:
-        logger.error("Error writing %s: %s", settings_file, e)
         print(f"Error writing {settings_file}: {e}", file=sys.stderr)
         return 1
 
-    logger.info("Hook installed successfully in %s", settings_file)
     print(f"Hook installed successfully in {settings_file}")
     return 0
 
 
 def hook_main() -> None:
     """Process a Claude Code hook event from stdin, or install the hook."""
-    # Configure logging for the hook subprocess (main.py logging doesn't apply here)
-    logging.basicConfig(
-        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        level=logging.DEBUG,
-        stream=sys.stderr,
-    )
-
-    parser = argparse.ArgumentParser(
-        prog="ccbot hook",
-        description="Claude Code session tracking hook",
-    )
-    parser.add_argument(
-        "--install",
-        action="store_true",
-        help="Install the hook into ~/.claude/settings.json",
-    )
-    # Parse only known args to avoid conflicts with stdin JSON
-    args, _ = parser.parse_known_args(sys.argv[2:])
-
-    if args.install:
-        logger.info("Hook install requested")
-        sys.exit(_install_hook())
+    argv = sys.argv[2:]
+    if "--install" in argv:
+        _install_main(argv)
+        return
 
-    # Normal hook processing: read JSON from stdin
-    logger.debug("Processing hook event from stdin")
     try:
         payload = json.load(sys.stdin)
     except (json.JSONDecodeError, ValueError) as e:
-        logger.warning("Failed to parse stdin JSON: %s", e)
+        _log("failed to parse stdin JSON: %s", e)
+        return
+    if not isinstance(payload, dict):
         return
 
     session_id = payload.get("session_id", "")
@@ -169,29 +204,90 @@ def hook_main() -> None:
     event = payload.get("hook_event_name", "")
 
     if not session_id or not event:
-        logger.debug("Empty session_id or event, ignoring")
         return
 
-    # Validate session_id format
-    if not _UUID_RE.match(session_id):
-        logger.warning("Invalid session_id format: %s", session_id)
+    if not _is_uuid(session_id):
+        _log("invalid session_id format: %s", session_id)
         return
 
     # Validate cwd is an absolute path (if provided)
     if cwd and not os.path.isabs(cwd):
-        logger.warning("cwd is not absolute: %s", cwd)
+        _log("cwd is not absolute: %s", cwd)
+        return
+
+    if event in WAKE_EVENTS:
+        # Wake-up only: the bot already knows the session's window
+        _notify_bot({"event": event, "session_id": session_id})
         return
 
     if event != "SessionStart":
-        logger.debug("Ignoring non-SessionStart event: %s", event)
         return
 
-    # Get tmux session:window key for the pane running this hook.
+    window = _resolve_window()
+    if window is None:
+        return
+    tmux_session_name, window_id, window_name = window
+    # Key uses window_id for uniqueness
+    session_window_key = f"{tmux_session_name}:{window_id}"
+
+    entry = {"session_id": session_id, "cwd": cwd, "window_name": window_name}
+    # Previous versions keyed by window_name instead of window_id
+    old_key = (
+        f"{tmux_session_name}:{window_name}" if window_name else session_window_key
+    )
+    try:
+        _update_session_map(session_window_key, entry, old_key)
+    except OSError as e:
+        _log("failed to write session_map: %s", e)
+        return
+
+    _notify_bot(
+        {
+            "event": event,
+            "session_id": session_id,
+            "cwd": cwd,
+            "window_key": session_window_key,
+            "window_name": window_name,
+        }
+    )
+
+
+def _install_main(argv: list[str]) -> None:
+    """Handle `ccbot hook --install [--wake-events]`."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="ccbot hook",
+        description="Claude Code session tracking hook",
+    )
+    parser.add_argument(
+        "--install",
+        action="store_true",
+        help="Install the hook into ~/.claude/settings.json",
+    )
+    parser.add_argument(
+        "--wake-events",
+        action="store_true",
+        help="With --install: also run on Stop/PostToolUse/Notification to "
+        "wake the bot",
+    )
+    args, _ = parser.parse_known_args(argv)
+    sys.exit(_install_hook(wake_events=args.wake_events))
+
+
+def _resolve_window() -> tuple[str, str, str] | None:
+    """Return (tmux_session_name, window_id, window_name) for this pane.
+
+    One fork of `tmux display-message` for the pane in TMUX_PANE.  The name
+    is read at every session start because windows can be renamed.
+    """
     # TMUX_PANE is set by tmux for every process inside a pane.
     pane_id = os.environ.get("TMUX_PANE", "")
     if not pane_id:
-        logger.warning("TMUX_PANE not set, cannot determine window")
-        return
+        _log("TMUX_PANE not set, cannot determine window")
+        return None
+
+    import subprocess
 
     result = subprocess.run(
         [
@@ -203,74 +299,166 @@ def hook_main() -> None:
             "#{session_name}:#{window_id}:#{window_name}",
         ],
         capture_output=True,
+        check=False,
         text=True,
     )
-    raw_output = result.stdout.strip()
+    raw = result.stdout.rstrip("\n") if result.returncode == 0 else ""
+
     # Expected format: "session_name:@id:window_name"
-    parts = raw_output.split(":", 2)
+    parts = raw.split(":", 2)
     if len(parts) < 3:
-        logger.warning(
-            "Failed to parse session:window_id:window_name from tmux (pane=%s, output=%s)",
+        _log(
+            "failed to parse session:window_id:window_name (pane=%s, output=%s)",
             pane_id,
-            raw_output,
+            raw,
         )
-        return
-    tmux_session_name, window_id, window_name = parts
-    # Key uses window_id for uniqueness
-    session_window_key = f"{tmux_session_name}:{window_id}"
+        return None
+    return parts[0], parts[1], parts[2]
 
-    logger.debug(
-        "tmux key=%s, window_name=%s, session_id=%s, cwd=%s",
-        session_window_key,
-        window_name,
-        session_id,
-        cwd,
-    )
 
-    # Read-modify-write with file locking to prevent concurrent hook races
-    from .utils import ccbot_dir
+def _update_session_map(key: str, entry: dict[str, str], old_key: str) -> None:
+    """Record one session_map entry: a single append to session_map.log.
 
-    map_file = ccbot_dir() / "session_map.json"
-    map_file.parent.mkdir(parents=True, exist_ok=True)
+    Only the changed entry is written, whatever the size of the map.
+    Appends hold the lock shared (concurrent hooks don't wait for each
+    other); compaction holds it exclusive.  Not fsynced: the map only
+    describes windows of the running tmux server, which an OS crash takes
+    down with it.
+    """
+    import fcntl
+
+    base = _ccbot_dir()
+    os.makedirs(base, exist_ok=True)
+    map_path = os.path.join(base, _SESSION_MAP_NAME)
+    log_path, lock_path = map_side_paths(map_path)
+
+    records = [{"key": key, "entry": entry}]
+    if old_key != key:
+        # Previous versions keyed by window_name instead of window_id
+        records.append({"key": old_key, "entry": None})
+    # One write() of whole lines: O_APPEND keeps concurrent appends apart
+    data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+
+    with open(lock_path, "w") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_SH)
+        fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode())
+            log_size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
 
-    lock_path = map_file.with_suffix(".lock")
+    if log_size > COMPACT_LOG_BYTES:
+        compact_session_map(map_path)
+
+
+def map_side_paths(map_path: str) -> tuple[str, str]:
+    """(append log, lock file) paths belonging to a session_map.json path.
+
+    The bot's reader takes the same lock shared while reloading.
+    """
+    stem = os.path.splitext(map_path)[0]
+    return stem + ".log", stem + ".lock"
+
+
+def apply_session_map_log(session_map: dict, chunk: bytes) -> None:
+    """Apply session_map.log records (complete lines) to a map in place.
+
+    A record sets ``session_map[key] = entry``, or deletes the key when
+    entry is null.  Unparseable lines (e.g. from a crashed writer) are
+    skipped.
+    """
+    for line in chunk.splitlines():
+        try:
+            record = json.loads(line)
+            key = record["key"]
+            entry = record["entry"]
+        except (ValueError, TypeError, KeyError):
+            continue
+        if entry is None:
+            session_map.pop(key, None)
+        elif isinstance(entry, dict):
+            session_map[key] = entry
+
+
+def load_session_map(map_path: str) -> dict:
+    """Current session map: session_map.json with session_map.log applied."""
+    session_map: dict = {}
+    try:
+        with open(map_path, "rb") as f:
+            session_map = json.loads(f.read())
+    except FileNotFoundError:
+        pass
+    except (ValueError, OSError):
+        _log("failed to read existing session_map, starting fresh")
+    if not isinstance(session_map, dict):
+        session_map = {}
+
+    log_path = map_side_paths(map_path)[0]
     try:
-        with open(lock_path, "w") as lock_f:
-            fcntl.flock(lock_f, fcntl.LOCK_EX)
-            logger.debug("Acquired lock on %s", lock_path)
+        with open(log_path, "rb") as f:
+            chunk = f.read()
+    except FileNotFoundError:
+        chunk = b""
+    # A trailing partial line is an append still in progress
+    apply_session_map_log(session_map, chunk[: chunk.rfind(b"\n") + 1])
+    return session_map
+
+
+def compact_session_map(map_path: str, stale: dict | None = None) -> int:
+    """Fold session_map.log into session_map.json and empty the log.
+
+    stale maps keys of dead windows to the entry they had when found dead;
+    each is dropped unless it has been rewritten since (a new window
+    reusing the id).  Holds the lock exclusive, so no append is in flight.
+    Returns the number of stale entries removed.
+    """
+    import fcntl
+
+    log_path, lock_path = map_side_paths(map_path)
+    with open(lock_path, "w") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        has_log = os.path.exists(log_path) and os.path.getsize(log_path) > 0
+        session_map = load_session_map(map_path)
+        removed = 0
+        for key, entry in (stale or {}).items():
+            if key in session_map and session_map[key] == entry:
+                del session_map[key]
+                removed += 1
+        if not has_log and not removed:
+            return 0
+
+        tmp_path = f"{map_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                # No indent: keeps json on its C encoder
+                f.write(json.dumps(session_map, separators=(",", ":")))
+            os.replace(tmp_path, map_path)
+        except BaseException:
             try:
-                session_map: dict[str, dict[str, str]] = {}
-                if map_file.exists():
-                    try:
-                        session_map = json.loads(map_file.read_text())
-                    except (json.JSONDecodeError, OSError):
-                        logger.warning(
-                            "Failed to read existing session_map, starting fresh"
-                        )
-
-                session_map[session_window_key] = {
-                    "session_id": session_id,
-                    "cwd": cwd,
-                    "window_name": window_name,
-                }
-
-                # Clean up old-format key ("session:window_name") if it exists.
-                # Previous versions keyed by window_name instead of window_id.
-                old_key = f"{tmux_session_name}:{window_name}"
-                if old_key != session_window_key and old_key in session_map:
-                    del session_map[old_key]
-                    logger.info("Removed old-format session_map key: %s", old_key)
-
-                from .utils import atomic_write_json
-
-                atomic_write_json(map_file, session_map)
-                logger.info(
-                    "Updated session_map: %s -> session_id=%s, cwd=%s",
-                    session_window_key,
-                    session_id,
-                    cwd,
-                )
-            finally:
-                fcntl.flock(lock_f, fcntl.LOCK_UN)
-    except OSError as e:
-        logger.error("Failed to write session_map: %s", e)
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        if has_log:
+            os.truncate(log_path, 0)
+        return removed
+
+
+def _notify_bot(event: dict[str, str]) -> None:
+    """Push an event to the running bot over its Unix socket.
+
+    Best effort: when the bot is not running (no socket, connection
+    refused, timeout) the event is dropped and the bot learns about it
+    from session_map.json on its next poll.
+    """
+    import socket
+
+    sock_path = os.path.join(_ccbot_dir(), _HOOK_SOCKET_NAME)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_NOTIFY_TIMEOUT)
+            sock.connect(sock_path)
+            sock.sendall(json.dumps(event).encode() + b"\n")
+    except OSError:
+        pass
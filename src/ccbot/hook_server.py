@@ -0,0 +1,93 @@
+"""Unix-socket push channel from `ccbot hook` to the running bot.
+
+The bot listens on <CCBOT_DIR>/hook.sock. After appending its session_map
+record (session_map.log), `ccbot hook` connects and writes the event as
+one JSON line, so the bot can pick up a new session within milliseconds
+instead of on its next poll.
+The channel is best effort on both sides: the hook ignores a missing or
+unresponsive socket, and the session map files remain the source of truth.
+
+Key functions: start_hook_server(), stop_hook_server().
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted event line; hook events are a few hundred bytes
+MAX_EVENT_BYTES = 64 * 1024
+# A client that connects but doesn't send its line within this is dropped
+READ_TIMEOUT = 1.0  # seconds
+
+HookEventHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+async def start_hook_server(
+    path: Path, handler: HookEventHandler
+) -> asyncio.AbstractServer | None:
+    """Serve hook events on a Unix socket at path.
+
+    A socket file left by a previous run is replaced.  Returns None (and
+    the bot falls back to polling) if the socket can't be created.
+    """
+
+    async def on_connect(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+        except (TimeoutError, ValueError, ConnectionError) as e:
+            logger.debug("Dropped hook connection: %s", e)
+            return
+        finally:
+            writer.close()
+        try:
+            event = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            logger.debug("Ignoring malformed hook event: %r", line[:200])
+            return
+        if not isinstance(event, dict) or not event.get("event"):
+            return
+        logger.debug("Hook event: %s", event)
+        try:
+            await handler(event)
+        except Exception as e:
+            logger.error("Hook event handler failed: %s", e)
+
+    server: asyncio.AbstractServer | None = None
+    try:
+        path.unlink(missing_ok=True)
+        # Bind inside a private (0700) directory and move the socket into
+        # place only once it is 0600, so other users never get to connect.
+        private_dir = tempfile.mkdtemp(prefix=".hook-", dir=path.parent)
+        try:
+            bound = os.path.join(private_dir, path.name)
+            server = await asyncio.start_unix_server(
+                on_connect, path=bound, limit=MAX_EVENT_BYTES
+            )
+            os.chmod(bound, 0o600)
+            os.replace(bound, path)
+        finally:
+            shutil.rmtree(private_dir, ignore_errors=True)
+    except OSError as e:
+        logger.warning("Hook socket unavailable (%s), relying on polling", e)
+        if server is not None:
+            server.close()
+        return None
+    logger.info("Listening for hook events on %s", path)
+    return server
+
+
+async def stop_hook_server(server: asyncio.AbstractServer, path: Path) -> None:
+    """Close the server and remove its socket file."""
+    server.close()
+    await server.wait_closed()
+    path.unlink(missing_ok=True)
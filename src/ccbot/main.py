@@ -6,18 +6,20 @@ Handles two execution modes:
      Telegram bot polling loop via bot.create_bot().
 """
 
-import logging
 import sys
 
 
 def main() -> None:
     """Main entry point."""
     if len(sys.argv) > 1 and sys.argv[1] == "hook":
+        # Nothing else imported on this path: hooks run at every session start
         from .hook import hook_main
 
         hook_main()
         return
 
+    import logging
+
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         level=logging.WARNING,
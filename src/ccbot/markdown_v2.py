@@ -5,10 +5,18 @@ blockquotes (delimited by sentinel tokens from TranscriptParser).
 Expandable quotes are escaped and formatted as Telegram >…|| syntax
 separately, so the library doesn't mangle them.
 
+Conversions are memoized in a bounded LRU cache (status lines and tool
+summaries repeat constantly); markdown_cache_stats() reports hit rates.
+mistletoe keeps its token registry in module globals, so full renders are
+serialized by _RENDER_LOCK and are safe to run from any thread.
+
 Key function: convert_markdown(text) → MarkdownV2 string.
+mdv2_escaped_length(text) gives the escaped length, for sizing chunks.
 """
 
 import re
+import threading
+from functools import lru_cache
 
 import mistletoe
 from mistletoe.block_token import BlockCode, remove_token
@@ -32,6 +40,64 @@ def _escape_mdv2(text: str) -> str:
     return _MDV2_ESCAPE_RE.sub(r"\\\1", text)
 
 
+def mdv2_escaped_length(text: str) -> int:
+    """Length of text after MarkdownV2 escaping (without building it)."""
+    return len(text) + len(_MDV2_ESCAPE_RE.findall(text))
+
+
+# Plain-text fast path: text without block structure, carrying at most
+# simple **bold** / `code` spans, renders to its escaped self — no need to
+# build a mistletoe Document.  Anything the checks below don't recognise
+# takes the full renderer, so these only need to be conservative.
+# (Unsafe chars include every line break str.splitlines() knows besides \n.)
+_FAST_UNSAFE_RE = re.compile(r"[\\<&|~\[\]\t\r\v\f\x1c-\x1e\x85\u2028\u2029]")
+_FAST_LINE_START_RE = re.compile(r"^(?:[-+=>#]|\d*[.)])", re.MULTILINE)
+_FAST_SPAN_RE = re.compile(
+    r"(?<!\*)\*\*([^\W_](?:[^*`_\n]*[^\W_])?)\*\*(?!\*)"  # **bold**
+    r"|(?<!`)`([^`\s](?:[^`\n]*[^`\s])?)`(?!`)"  # `code`
+)
+# An underscore is literal only inside a word (alphanumerics on both sides)
+_FAST_LOOSE_UNDERSCORE_RE = re.compile(r"(?<![^\W_])_|_(?![^\W_])")
+
+
+def _fast_plain_segment_ok(text: str, start: int, end: int) -> bool:
+    """Check that text[start:end] (outside any span) is literal text."""
+    segment = text[start:end]
+    if "*" in segment or "`" in segment:
+        return False
+    return "_" not in segment or not _FAST_LOOSE_UNDERSCORE_RE.search(text, start, end)
+
+
+def _try_fast_convert(text: str) -> str | None:
+    """Render simple text without parsing; None if the full renderer is needed.
+
+    Output is byte-identical to _markdownify() for every accepted input.
+    """
+    if not text or _FAST_UNSAFE_RE.search(text) or _FAST_LINE_START_RE.search(text):
+        return None
+    if any(line != line.strip() for line in text.split("\n")):
+        return None
+
+    out: list[str] = []
+    pos = 0
+    for m in _FAST_SPAN_RE.finditer(text):
+        if not _fast_plain_segment_ok(text, pos, m.start()):
+            return None
+        out.append(_escape_mdv2(text[pos : m.start()]))
+        bold, code = m.groups()
+        if bold is not None:
+            out.append(f"*{_escape_mdv2(bold)}*")
+        else:
+            out.append(f"`{_escape_mdv2(code)}`")
+        pos = m.end()
+    if not _fast_plain_segment_ok(text, pos, len(text)):
+        return None
+    out.append(_escape_mdv2(text[pos:]))
+
+    result = "".join(out)
+    return result if result.endswith("\n") else result + "\n"
+
+
 # Max rendered chars for a single expandable quote block.
 # Leaves room for surrounding text within Telegram's 4096 char message limit.
 _EXPQUOTE_MAX_RENDERED = 3800
@@ -69,6 +135,12 @@ def _render_expandable_quote(m: re.Match[str]) -> str:
     return "\n".join(built) + "||"
 
 
+# mistletoe's token registry is module-global: the renderer's __init__ and
+# remove_token() change it and __exit__ resets it, so two renders running
+# at once (event loop + render worker thread) would corrupt each other.
+_RENDER_LOCK = threading.Lock()
+
+
 def _markdownify(text: str) -> str:
     """Custom markdownify with our rendering rules.
 
@@ -79,22 +151,58 @@ def _markdownify(text: str) -> str:
 
     Custom rules:
       - Disable indented code blocks (only fenced ``` blocks are code).
+
+    Simple inputs take the _try_fast_convert() path instead; everything
+    else renders under _RENDER_LOCK.
     """
-    with TelegramMarkdownRenderer(normalize_whitespace=False) as renderer:
+    fast = _try_fast_convert(text)
+    if fast is not None:
+        return fast
+    content = escape_latex(text)
+    with (
+        _RENDER_LOCK,
+        TelegramMarkdownRenderer(normalize_whitespace=False) as renderer,
+    ):
         remove_token(BlockCode)
-        content = escape_latex(text)
         document = mistletoe.Document(content)
         _update_block(document)
         return renderer.render(document)
 
 
+# Conversion cache bounds: entry count, and the largest input worth caching
+# (big one-off answers would only evict the small, frequently repeated texts)
+_CACHE_MAX_ENTRIES = 512
+_CACHE_MAX_INPUT = 8192
+
+
 def convert_markdown(text: str) -> str:
     """Convert standard Markdown to Telegram MarkdownV2 format.
 
     Expandable blockquote sections (marked by sentinel tokens from
     TranscriptParser) are extracted, escaped, and formatted separately
     so that telegramify_markdown doesn't mangle the >...|| syntax.
+
+    Inputs up to _CACHE_MAX_INPUT chars are served from an LRU cache.
     """
+    if len(text) > _CACHE_MAX_INPUT:
+        return _convert_markdown(text)
+    return _convert_markdown_cached(text)
+
+
+def markdown_cache_stats() -> dict[str, float]:
+    """Return conversion cache metrics: hits, misses, size, hit_rate."""
+    info = _convert_markdown_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+def _convert_markdown(text: str) -> str:
+    """Uncached conversion (see convert_markdown)."""
     # Extract expandable quote blocks before telegramify
     segments: list[tuple[bool, str]] = []  # (is_quote, content)
     last_end = 0
@@ -116,3 +224,6 @@ def convert_markdown(text: str) -> str:
         else:
             parts.append(_markdownify(segment))
     return "".join(parts)
+
+
+_convert_markdown_cached = lru_cache(maxsize=_CACHE_MAX_ENTRIES)(_convert_markdown)
@@ -1,17 +1,22 @@
 """Monitor state persistence — tracks byte offsets for each session.
 
 Persists TrackedSession records (session_id, file_path, last_byte_offset)
-to ~/.ccbot/monitor_state.json so the session monitor can resume
-incremental reading after restarts without re-sending old messages.
+to ~/.ccbot/monitor_state.json (or the SQLite state store with
+STATE_BACKEND=sqlite) so the session monitor can resume incremental
+reading after restarts without re-sending old messages.
 
 Key classes: MonitorState, TrackedSession.
 """
 
 import json
 import logging
+import sqlite3
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .state_store import StateStore
 
 logger = logging.getLogger(__name__)
 
@@ -48,10 +53,25 @@ class MonitorState:
 
     state_file: Path
     tracked_sessions: dict[str, TrackedSession] = field(default_factory=dict)
+    # SQLite store used instead of state_file when set
+    store: "StateStore | None" = field(default=None, repr=False)
     _dirty: bool = field(default=False, repr=False)
+    # Session ids updated or removed since the last save (store writes only
+    # their rows)
+    _dirty_ids: set[str] = field(default_factory=set, repr=False)
 
     def load(self) -> None:
         """Load state from file."""
+        if self.store is not None:
+            self.tracked_sessions = {
+                k: TrackedSession.from_dict(v)
+                for k, v in self.store.load_tracked_sessions().items()
+            }
+            logger.info(
+                f"Loaded {len(self.tracked_sessions)} tracked sessions from state"
+            )
+            return
+
         if not self.state_file.exists():
             logger.debug(f"State file does not exist: {self.state_file}")
             return
@@ -70,9 +90,23 @@ class MonitorState:
             self.tracked_sessions = {}
 
     def save(self) -> None:
-        """Save state to file atomically."""
+        """Save state to file atomically (changed rows only with a store)."""
         from .utils import atomic_write_json
 
+        if self.store is not None:
+            sessions: dict[str, dict[str, Any] | None] = {}
+            for sid in self._dirty_ids:
+                tracked = self.tracked_sessions.get(sid)
+                sessions[sid] = tracked.to_dict() if tracked else None
+            try:
+                changed = self.store.save_tracked_sessions(sessions)
+                self._dirty = False
+                self._dirty_ids.clear()
+                logger.debug("Saved %d changed tracked sessions to state", changed)
+            except sqlite3.Error as e:
+                logger.error("Failed to save state: %s", e)
+            return
+
         data = {
             "tracked_sessions": {
                 k: v.to_dict() for k, v in self.tracked_sessions.items()
@@ -82,6 +116,7 @@ class MonitorState:
         try:
             atomic_write_json(self.state_file, data)
             self._dirty = False
+            self._dirty_ids.clear()
             logger.debug(
                 "Saved %d tracked sessions to state", len(self.tracked_sessions)
             )
@@ -96,12 +131,14 @@ class MonitorState:
         """Update or add a tracked session."""
         self.tracked_sessions[session.session_id] = session
         self._dirty = True
+        self._dirty_ids.add(session.session_id)
 
     def remove_session(self, session_id: str) -> None:
         """Remove a tracked session."""
         if session_id in self.tracked_sessions:
             del self.tracked_sessions[session_id]
             self._dirty = True
+            self._dirty_ids.add(session_id)
 
     def save_if_dirty(self) -> None:
         """Save state only if it has been modified."""
@@ -0,0 +1,125 @@
+"""Process-tree lookups straight from /proc (Linux).
+
+Replaces fork/exec of `pgrep -P` per tree level: a child list is one read
+of /proc/<pid>/task/<tid>/children per thread, or, on kernels built
+without that file, one pass over /proc/*/stat.  Everything is a few
+syscalls, cheap enough to call on the event loop.
+
+Also samples CPU time (utime+stime+cutime+cstime from /proc/<pid>/stat)
+over a process and its descendants, the raw input of the status poller's
+busy/idle probe.
+
+Key functions: available(), is_alive(), children(), deepest_child(),
+tree_cpu_ticks().
+"""
+
+import os
+
+PROC = "/proc"
+
+# Units of the CPU time fields in /proc/<pid>/stat
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def available() -> bool:
+    """True when /proc exposes this process (i.e. Linux procfs)."""
+    return os.path.exists(f"{PROC}/self/stat")
+
+
+def is_alive(pid: int) -> bool:
+    """True while /proc/<pid> exists (zombies included)."""
+    return os.path.exists(f"{PROC}/{pid}")
+
+
+def _read_stat_fields(pid: int | str) -> list[str] | None:
+    """Fields of /proc/<pid>/stat after the "(comm)" field, or None.
+
+    comm may contain spaces and parentheses, so the split starts after
+    its last ")".  Index 0 is then the state, 1 the ppid.
+    """
+    try:
+        with open(f"{PROC}/{pid}/stat", "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    end = raw.rfind(b")")
+    if end < 0:
+        return None
+    return raw[end + 2 :].decode("ascii", "replace").split()
+
+
+def children(pid: int) -> list[int]:
+    """PIDs of pid's direct children, ascending."""
+    try:
+        tids = os.listdir(f"{PROC}/{pid}/task")
+    except OSError:
+        return []
+    found: set[int] = set()
+    for tid in tids:
+        try:
+            with open(f"{PROC}/{pid}/task/{tid}/children", "rb") as f:
+                found.update(int(c) for c in f.read().split())
+        except FileNotFoundError:
+            # Kernel without CONFIG_PROC_CHILDREN
+            return _children_by_scan(pid)
+        except OSError:
+            continue  # Thread exited meanwhile
+    return sorted(found)
+
+
+def _children_by_scan(pid: int) -> list[int]:
+    """Children of pid by scanning every /proc/<n>/stat for its ppid."""
+    parent = str(pid)
+    found = []
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        fields = _read_stat_fields(entry)
+        if fields and len(fields) > 1 and fields[1] == parent:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def deepest_child(pid: int) -> int:
+    """Follow the first (lowest-PID) child down to a leaf process.
+
+    From a tmux pane's shell this is the foreground program (claude);
+    later children are typically background jobs.
+    """
+    while True:
+        kids = children(pid)
+        if not kids:
+            return pid
+        pid = kids[0]
+
+
+def cpu_ticks(pid: int) -> int | None:
+    """CPU time of pid plus its reaped children, in CLK_TCK ticks."""
+    fields = _read_stat_fields(pid)
+    if not fields or len(fields) < 15:
+        return None
+    # utime, stime, cutime, cstime (stat fields 14-17)
+    return sum(int(v) for v in fields[11:15])
+
+
+def tree_cpu_ticks(pid: int) -> tuple[int, int] | None:
+    """(CPU ticks, process count) summed over pid and its live descendants.
+
+    Descendants cover tool subprocesses (shells, builds, MCP servers);
+    a change in the count is itself a sign of activity.  None if pid is
+    gone.
+    """
+    total = cpu_ticks(pid)
+    if total is None:
+        return None
+    count = 1
+    stack = children(pid)
+    while stack:
+        child = stack.pop()
+        ticks = cpu_ticks(child)
+        if ticks is None:
+            continue  # Exited meanwhile
+        total += ticks
+        count += 1
+        stack.extend(children(child))
+    return total, count
@@ -7,13 +7,31 @@ and a three-tier font fallback chain:
   2. Noto Sans Mono CJK SC — CJK characters
   3. Symbola — remaining special symbols
 
-Key function: text_to_image(text, font_size, with_ansi) → PNG bytes.
+Given the pane's column/row count, text is laid out on tmux's fixed cell
+grid instead (East Asian wide characters take two cells): the canvas size
+follows from the grid, background runs are single rectangles and each
+glyph is rasterized once per size and then blitted into its cell.
+
+Fonts are loaded once per size and glyph advance widths are memoized per
+(size, font tier, character), so a render only measures characters it has
+never seen before.
+
+render_frame() sits in front of text_to_image() for pane screenshots: it
+keeps the last PNG per window keyed by a digest of the captured text and
+pane size, so an unchanged pane is never rendered twice, whichever user
+asks.
+
+Key functions: text_to_image(text, font_size, with_ansi, columns, rows) → PNG
+bytes; frame_digest(); render_frame(window_id, text, columns, rows).
 """
 
 import asyncio
+import hashlib
 import io
 import logging
+import math
 import re
+import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -67,6 +85,13 @@ _ANSI_COLORS: dict[int, tuple[int, int, int]] = {
     15: (255, 255, 255),  # Bright White
 }
 
+_PADDING = 16  # pixels around the text
+
+# window_id -> (frame digest, PNG) of the last screenshot rendered for it,
+# least recently used first
+_frame_cache: dict[str, tuple[str, bytes]] = {}
+_FRAME_CACHE_MAX = 32
+
 # Default colors for terminals
 _DEFAULT_FG = (212, 212, 212)  # Light gray
 _DEFAULT_BG = (30, 30, 30)  # Dark gray
@@ -89,7 +114,18 @@ class StyledSegment:
     font_tier: int
 
 
-def _load_font(path: Path, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+_Font = ImageFont.FreeTypeFont | ImageFont.ImageFont
+
+# font_size -> fonts in _FONT_PATHS order
+_font_cache: dict[int, list[_Font]] = {}
+# (font_size, font_tier, char) -> horizontal advance in pixels
+_advance_cache: dict[tuple[int, int, str], float] = {}
+# (font_size, font_tier, char) -> (rasterized glyph mask, x offset of the
+# mask from the pen position) (grid mode)
+_glyph_cache: dict[tuple[int, int, str], tuple[Image.Image, int]] = {}
+
+
+def _load_font(path: Path, size: int) -> _Font:
     """Load a TrueType/OpenType font, falling back to Pillow default."""
     try:
         return ImageFont.truetype(str(path), size)
@@ -98,6 +134,30 @@ def _load_font(path: Path, size: int) -> ImageFont.FreeTypeFont | ImageFont.Imag
         return ImageFont.load_default()
 
 
+def _get_fonts(size: int) -> list[_Font]:
+    """The fallback chain at a size, parsed from disk on first use only."""
+    fonts = _font_cache.get(size)
+    if fonts is None:
+        fonts = [_load_font(p, size) for p in _FONT_PATHS]
+        _font_cache[size] = fonts
+    return fonts
+
+
+def _text_width(text: str, tier: int, size: int) -> float:
+    """Advance width of text in one font tier: the sum of its glyphs' advances."""
+    width = 0.0
+    font = None
+    for ch in text:
+        key = (size, tier, ch)
+        advance = _advance_cache.get(key)
+        if advance is None:
+            font = font or _get_fonts(size)[tier]
+            advance = font.getlength(ch)
+            _advance_cache[key] = advance
+        width += advance
+    return width
+
+
 def _font_tier(ch: str) -> int:
     """Return 0 (JetBrains), 1 (Noto CJK), or 2 (Symbola) for a character."""
     cp = ord(ch)
@@ -254,8 +314,174 @@ def _split_line_segments_plain(line: str) -> list[tuple[str, int]]:
     return segments
 
 
+def _char_cells(ch: str) -> int:
+    """Terminal cells a character occupies: 2 if East Asian wide, 0 if combining."""
+    if unicodedata.combining(ch):
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+
+
+@dataclass
+class _Cell:
+    """A glyph placed on the grid: one character plus any combining marks."""
+
+    col: int
+    cells: int
+    text: str
+    fg_color: tuple[int, int, int]
+    font_tier: int
+
+
+def _layout_grid_line(
+    segments: list[StyledSegment],
+) -> tuple[list[list], list[_Cell], int]:
+    """Place a line's characters on cells.
+
+    Returns (background runs as [start, end, color], glyphs, cells used).
+    Spaces take a cell but produce no glyph, unless a combining mark
+    follows them.
+    """
+    bg_runs: list[list] = []
+    glyphs: list[_Cell] = []
+    # Cell the next combining mark belongs to; a space's is only added to
+    # glyphs once a mark lands on it.
+    base: _Cell | None = None
+    col = 0
+    for seg in segments:
+        fg, bg = seg.style.fg_color, seg.style.bg_color
+        for ch in seg.text:
+            cells = _char_cells(ch)
+            if cells == 0:
+                if base is not None:  # Otherwise an orphan mark: dropped
+                    if base.text == " ":
+                        glyphs.append(base)
+                    base.text += ch
+                continue
+            if bg:
+                if bg_runs and bg_runs[-1][1] == col and bg_runs[-1][2] == bg:
+                    bg_runs[-1][1] += cells
+                else:
+                    bg_runs.append([col, col + cells, bg])
+            base = _Cell(col, cells, ch, fg, seg.font_tier)
+            if ch != " ":
+                glyphs.append(base)
+            col += cells
+    return bg_runs, glyphs, col
+
+
+def _glyph_mask(ch: str, tier: int, size: int) -> tuple[Image.Image, int]:
+    """Coverage mask of one rasterized character and its x offset.
+
+    The mask starts at the glyph's left edge, which lies left of the pen
+    position (offset < 0) for glyphs with a negative left bearing.
+    """
+    key = (size, tier, ch)
+    cached = _glyph_cache.get(key)
+    if cached is None:
+        font = _get_fonts(size)[tier]
+        left, _, right, bottom = font.getbbox(ch)
+        offset = min(0, math.floor(left))
+        width = max(math.ceil(_text_width(ch, tier, size)), math.ceil(right))
+        mask = Image.new(
+            "L", (width - offset + size // 2, max(int(size * 1.4), math.ceil(bottom)))
+        )
+        ImageDraw.Draw(mask).text((-offset, 0), ch, fill=255, font=font)
+        cached = _glyph_cache[key] = (mask, offset)
+    return cached
+
+
+def _render_grid(
+    line_segments: list[list[StyledSegment]],
+    font_size: int,
+    columns: int,
+    rows: int,
+) -> Image.Image:
+    """Draw styled lines on a columns x rows cell grid."""
+    fonts = _get_fonts(font_size)
+    cell_width = _text_width("M", 0, font_size)
+    line_height = int(font_size * 1.4)
+    layouts = [_layout_grid_line(segments) for segments in line_segments]
+    # A line longer than the pane (e.g. a resize mid-capture) widens the canvas
+    columns = max([columns] + [used for _, _, used in layouts])
+    rows = max(rows, len(layouts))
+
+    img = Image.new(
+        "RGB",
+        (round(columns * cell_width) + _PADDING * 2, line_height * rows + _PADDING * 2),
+        _DEFAULT_BG,
+    )
+    draw = ImageDraw.Draw(img)
+
+    def x_of(col: int) -> float:
+        return _PADDING + col * cell_width
+
+    y = _PADDING
+    for bg_runs, glyphs, _ in layouts:
+        # Each same-colored background run is one rectangle
+        for start, end, color in bg_runs:
+            draw.rectangle(
+                [round(x_of(start)), y, round(x_of(end)) - 1, y + line_height - 1],
+                fill=color,
+            )
+        for g in glyphs:
+            x = x_of(g.col)
+            if g.font_tier or g.cells > 1:
+                # Fallback fonts have other advances: center in the cells
+                advance = _text_width(g.text, g.font_tier, font_size)
+                x += (g.cells * cell_width - advance) / 2
+            if len(g.text) == 1:
+                mask, offset = _glyph_mask(g.text, g.font_tier, font_size)
+                img.paste(g.fg_color, (round(x) + offset, y), mask)
+            else:
+                draw.text((x, y), g.text, fill=g.fg_color, font=fonts[g.font_tier])
+        y += line_height
+    return img
+
+
+def _render_flow(
+    line_segments: list[list[StyledSegment]], font_size: int
+) -> Image.Image:
+    """Draw styled lines one after another, sizing the canvas to the widest."""
+    fonts = _get_fonts(font_size)
+    padding = _PADDING
+
+    # Measure text size (advances are measured once, then reused below)
+    line_height = int(font_size * 1.4)
+    widths = [
+        [_text_width(seg.text, seg.font_tier, font_size) for seg in segments]
+        for segments in line_segments
+    ]
+    max_width = max((sum(w) for w in widths), default=0)
+
+    img_width = int(max_width) + padding * 2
+    img_height = line_height * len(line_segments) + padding * 2
+
+    img = Image.new("RGB", (img_width, img_height), _DEFAULT_BG)
+    draw = ImageDraw.Draw(img)
+
+    y = padding
+    for segments, seg_widths in zip(line_segments, widths, strict=True):
+        x = padding
+        for seg, w in zip(segments, seg_widths, strict=True):
+            f = fonts[seg.font_tier]
+
+            # Draw background if specified
+            if seg.style.bg_color:
+                draw.rectangle([x, y, x + w, y + line_height], fill=seg.style.bg_color)
+
+            # Draw text with foreground color
+            draw.text((x, y), seg.text, fill=seg.style.fg_color, font=f)
+            x += w
+        y += line_height
+    return img
+
+
 async def text_to_image(
-    text: str, font_size: int = 28, with_ansi: bool = True
+    text: str,
+    font_size: int = 28,
+    with_ansi: bool = True,
+    columns: int | None = None,
+    rows: int | None = None,
 ) -> bytes:
     """Render monospace text onto a dark-background image and return PNG bytes.
 
@@ -263,16 +489,19 @@ async def text_to_image(
         text: The text to render (may contain ANSI color codes)
         font_size: Font size in pixels
         with_ansi: If True, parse and render ANSI color codes
+        columns: Pane width in cells; if set, render on the cell grid
+        rows: Pane height in cells (grid mode only)
 
     Returns:
         PNG image bytes
     """
 
     def _render_image() -> bytes:
-        fonts = [_load_font(p, font_size) for p in _FONT_PATHS]
-
-        lines = text.split("\n")
-        padding = 16
+        if columns:
+            # capture-pane ends every row, including the last, with "\n"
+            lines = text.removesuffix("\n").split("\n")
+        else:
+            lines = text.split("\n")
 
         # Parse lines into styled segments
         if with_ansi:
@@ -288,43 +517,10 @@ async def text_to_image(
                 for segments in line_segments_plain
             ]
 
-        # Measure text size
-        dummy = Image.new("RGB", (1, 1))
-        draw = ImageDraw.Draw(dummy)
-        line_height = int(font_size * 1.4)
-        max_width = 0
-        for segments in line_segments:
-            w = 0
-            for seg in segments:
-                bbox = draw.textbbox((0, 0), seg.text, font=fonts[seg.font_tier])
-                w += bbox[2] - bbox[0]
-            max_width = max(max_width, w)
-
-        img_width = int(max_width) + padding * 2
-        img_height = line_height * len(lines) + padding * 2
-
-        img = Image.new("RGB", (img_width, img_height), _DEFAULT_BG)
-        draw = ImageDraw.Draw(img)
-
-        y = padding
-        for segments in line_segments:
-            x = padding
-            for seg in segments:
-                f = fonts[seg.font_tier]
-
-                # Draw background if specified
-                if seg.style.bg_color:
-                    bbox = draw.textbbox((x, y), seg.text, font=f)
-                    draw.rectangle(
-                        [bbox[0], y, bbox[2], y + line_height], fill=seg.style.bg_color
-                    )
-
-                # Draw text with foreground color
-                draw.text((x, y), seg.text, fill=seg.style.fg_color, font=f)
-
-                bbox = draw.textbbox((0, 0), seg.text, font=f)
-                x += bbox[2] - bbox[0]
-            y += line_height
+        if columns:
+            img = _render_grid(line_segments, font_size, columns, rows or 0)
+        else:
+            img = _render_flow(line_segments, font_size)
 
         buf = io.BytesIO()
         img.save(buf, format="PNG")
@@ -332,3 +528,31 @@ async def text_to_image(
 
     # Run CPU-intensive image rendering in thread pool
     return await asyncio.to_thread(_render_image)
+
+
+def frame_digest(text: str, columns: int = 0, rows: int = 0) -> str:
+    """Identity of a captured pane frame: its ANSI text and the pane size."""
+    h = hashlib.blake2b(f"{columns}x{rows}\n".encode(), digest_size=16)
+    h.update(text.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+async def render_frame(
+    window_id: str, text: str, columns: int = 0, rows: int = 0
+) -> tuple[str, bytes]:
+    """Render a window's captured pane (ANSI) as (frame digest, PNG bytes).
+
+    The last frame of each window is cached: if the pane has not changed
+    since, the PNG is returned without rendering.
+    """
+    digest = frame_digest(text, columns, rows)
+    cached = _frame_cache.pop(window_id, None)
+    if cached is None or cached[0] != digest:
+        png = await text_to_image(
+            text, with_ansi=True, columns=columns or None, rows=rows or None
+        )
+        cached = (digest, png)
+    _frame_cache[window_id] = cached
+    if len(_frame_cache) > _FRAME_CACHE_MAX:
+        del _frame_cache[next(iter(_frame_cache))]
+    return cached
@@ -5,8 +5,11 @@ Manages the key mappings:
   User→Thread→Window (thread_bindings): topic-to-window bindings (1 topic = 1 window_id).
 
 Responsibilities:
-  - Persist/load state to ~/.ccbot/state.json.
-  - Sync window↔session bindings from session_map.json (written by hook).
+  - Persist/load state to ~/.ccbot/state.json, or state.db with
+    STATE_BACKEND=sqlite (write-behind: changes mark the state dirty and are
+    written off-loop, coalesced per STATE_SAVE_DELAY).
+  - Sync window↔session bindings from session_map.json (written by hook),
+    applied whenever the shared session_map reader publishes a change.
   - Resolve window IDs to ClaudeSession objects (JSONL file reading).
   - Track per-user read offsets for unread-message detection.
   - Manage thread↔window bindings for Telegram topic routing.
@@ -19,11 +22,13 @@ Key methods for thread binding access:
   - resolve_window_for_thread: Get window_id for a user's thread
   - iter_thread_bindings: Generator for iterating all (user_id, thread_id, window_id)
   - find_users_for_session: Find all users bound to a session_id
+  - flush_state: Write pending state changes now (shutdown)
 """
 
 import asyncio
 import json
 import logging
+import sqlite3
 from dataclasses import dataclass, field
 from pathlib import Path
 from collections.abc import Iterator
@@ -32,12 +37,17 @@ from typing import Any
 import aiofiles
 
 from .config import config
+from .session_map import SessionMapSnapshot, session_map_reader
+from .state_store import RowChanges, get_state_store
 from .tmux_manager import tmux_manager
 from .transcript_parser import TranscriptParser
 from .utils import atomic_write_json
 
 logger = logging.getLogger(__name__)
 
+# State changes within this window are written to disk together
+STATE_SAVE_DELAY = 1.0  # seconds
+
 
 @dataclass
 class WindowState:
@@ -96,6 +106,20 @@ class UnreadInfo:
     end_offset: int  # Current file size
 
 
+@dataclass
+class _StateWrite:
+    """Pending state changes, copied off the live state for a worker thread.
+
+    state is the whole state.json (JSON backend, or a full diff after bulk
+    changes); rows holds just the changed rows (SQLite backend).  dirty is
+    the set of changed keys taken for this write, restored if it fails.
+    """
+
+    state: dict[str, Any] | None = None
+    rows: RowChanges | None = None
+    dirty: dict[str, set[tuple[Any, ...]]] | None = None
+
+
 @dataclass
 class SessionManager:
     """Manages session state for Claude Code.
@@ -122,9 +146,22 @@ class SessionManager:
         default_factory=dict, repr=False
     )
 
+    # Write-behind persistence: pending changes, the debounced save task and
+    # the write currently running on a worker thread
+    _dirty: bool = field(default=False, repr=False)
+    # Keys changed since the last save, per state_store table, so the SQLite
+    # backend writes only their rows; None = diff everything (bulk changes)
+    _dirty_rows: dict[str, set[tuple[Any, ...]]] | None = field(
+        default_factory=dict, repr=False
+    )
+    _save_task: asyncio.Task[None] | None = field(default=None, repr=False)
+    _write_future: asyncio.Future[None] | None = field(default=None, repr=False)
+    _write_running: _StateWrite | None = field(default=None, repr=False)
+
     def __post_init__(self) -> None:
         self._load_state()
         self._rebuild_reverse_index()
+        session_map_reader.add_listener(self._apply_session_map)
 
     def _rebuild_reverse_index(self) -> None:
         """Rebuild _window_to_thread from thread_bindings."""
@@ -133,22 +170,139 @@ class SessionManager:
             for tid, wid in bindings.items():
                 self._window_to_thread[(uid, wid)] = tid
 
+    def _mark(self, table: str, *key: Any) -> None:
+        """Record that one row (state_store table + key) changed."""
+        if self._dirty_rows is not None:
+            self._dirty_rows.setdefault(table, set()).add(key)
+
     def _save_state(self) -> None:
-        state: dict[str, Any] = {
+        """Mark state dirty and schedule a coalesced write.
+
+        Callers _mark() the rows they changed first.  Inside the event loop
+        the write happens STATE_SAVE_DELAY later on a worker thread,
+        together with any other changes made meanwhile.  Outside a loop
+        (startup, CLI) the state is written immediately.
+        """
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._dirty = False
+            self._write_state(self._take_write())
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._save_later())
+
+    def _take_write(self) -> _StateWrite:
+        """Copy the pending changes for a write and reset the dirty keys."""
+        dirty, self._dirty_rows = self._dirty_rows, {}
+        if dirty is None or get_state_store() is None:
+            return _StateWrite(state=self._snapshot_state(), dirty=dirty)
+        rows: RowChanges = {
+            table: {key: self._row(table, key) for key in keys}
+            for table, keys in dirty.items()
+        }
+        return _StateWrite(rows=rows, dirty=dirty)
+
+    def _restore_write(self, write: _StateWrite) -> None:
+        """Mark a failed write's changes dirty again, to be retried."""
+        self._dirty = True
+        if write.dirty is None or self._dirty_rows is None:
+            self._dirty_rows = None
+            return
+        for table, keys in write.dirty.items():
+            self._dirty_rows.setdefault(table, set()).update(keys)
+
+    def _row(self, table: str, key: tuple[Any, ...]) -> tuple[Any, ...] | None:
+        """Current value of one state_store row, None if it no longer exists."""
+        if table == "window_states":
+            ws = self.window_states.get(key[0])
+            return (ws.session_id, ws.cwd, ws.window_name) if ws else None
+        if table == "thread_bindings":
+            wid = self.thread_bindings.get(key[0], {}).get(key[1])
+            return (wid,) if wid is not None else None
+        if table == "user_window_offsets":
+            offset = self.user_window_offsets.get(key[0], {}).get(key[1])
+            return (offset,) if offset is not None else None
+        if table == "group_chat_ids":
+            chat_id = self.group_chat_ids.get(key[0])
+            return (chat_id,) if chat_id is not None else None
+        name = self.window_display_names.get(key[0])  # window_display_names
+        return (name,) if name is not None else None
+
+    def _snapshot_state(self) -> dict[str, Any]:
+        """Copy state into plain JSON data (safe to serialize off-loop)."""
+        return {
             "window_states": {k: v.to_dict() for k, v in self.window_states.items()},
             "user_window_offsets": {
-                str(uid): offsets for uid, offsets in self.user_window_offsets.items()
+                str(uid): dict(offsets)
+                for uid, offsets in self.user_window_offsets.items()
             },
             "thread_bindings": {
                 str(uid): {str(tid): wid for tid, wid in bindings.items()}
                 for uid, bindings in self.thread_bindings.items()
             },
-            "group_chat_ids": self.group_chat_ids,
-            "window_display_names": self.window_display_names,
+            "group_chat_ids": dict(self.group_chat_ids),
+            "window_display_names": dict(self.window_display_names),
         }
-        atomic_write_json(config.state_file, state)
+
+    def _write_state(self, write: _StateWrite) -> None:
+        store = get_state_store()
+        if store is not None:
+            if write.rows is not None:
+                changed = store.write_rows(write.rows)
+            else:
+                changed = store.save_session_state(write.state or {})
+            logger.debug("State saved to %s (%d rows)", store.path, changed)
+            return
+        atomic_write_json(config.state_file, write.state)
         logger.debug("State saved to %s", config.state_file)
 
+    async def _save_later(self) -> None:
+        """Debounced save: write once per STATE_SAVE_DELAY while changes arrive.
+
+        A failed write leaves the state dirty and is retried after the
+        next delay.
+        """
+        while self._dirty:
+            await asyncio.sleep(STATE_SAVE_DELAY)
+            self._dirty = False
+            write = self._write_running = self._take_write()
+            self._write_future = asyncio.ensure_future(
+                asyncio.to_thread(self._write_state, write)
+            )
+            try:
+                # Shielded: cancelling the save must not abandon a half-done write
+                await asyncio.shield(self._write_future)
+            except (OSError, sqlite3.Error) as e:
+                logger.error("Failed to save state: %s", e)
+                self._restore_write(write)
+
+    async def flush_state(self) -> None:
+        """Write pending state changes now (called on shutdown)."""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+        self._save_task = None
+        if self._write_future is not None:
+            try:
+                await self._write_future
+            except (OSError, sqlite3.Error):
+                if self._write_running is not None:
+                    self._restore_write(self._write_running)  # Retried below
+            self._write_future = None
+        if self._dirty:
+            self._dirty = False
+            write = self._take_write()
+            try:
+                self._write_state(write)
+            except (OSError, sqlite3.Error) as e:
+                logger.error("Failed to save state: %s", e)
+                self._restore_write(write)
+
     def _is_window_id(self, key: str) -> bool:
         """Check if a key looks like a tmux window ID (e.g. '@0', '@12')."""
         return key.startswith("@") and len(key) > 1 and key[1:].isdigit()
@@ -159,9 +313,13 @@ class SessionManager:
         Detects old-format state (window_name keys without '@' prefix) and
         marks for migration on next startup re-resolution.
         """
-        if config.state_file.exists():
+        store = get_state_store()
+        if store is not None or config.state_file.exists():
             try:
-                state = json.loads(config.state_file.read_text())
+                if store is not None:
+                    state = store.load_session_state()
+                else:
+                    state = json.loads(config.state_file.read_text())
                 self.window_states = {
                     k: WindowState.from_dict(v)
                     for k, v in state.get("window_states", {}).items()
@@ -350,6 +508,7 @@ class SessionManager:
 
         if changed:
             self._rebuild_reverse_index()
+            self._dirty_rows = None  # Keys were remapped wholesale
             self._save_state()
             logger.info("Startup re-resolution complete")
 
@@ -365,63 +524,59 @@ class SessionManager:
         """Update display name for a window_id."""
         if self.window_display_names.get(window_id) != window_name:
             self.window_display_names[window_id] = window_name
+            self._mark("window_display_names", window_id)
             # Also update WindowState if it exists
             ws = self.window_states.get(window_id)
             if ws:
                 ws.window_name = window_name
+                self._mark("window_states", window_id)
             self._save_state()
 
     async def wait_for_session_map_entry(
         self, window_id: str, timeout: float = 5.0, interval: float = 0.5
     ) -> bool:
-        """Poll session_map.json until an entry for window_id appears.
+        """Wait until session_map.json has an entry for window_id.
 
-        Returns True if the entry was found within timeout, False otherwise.
+        Wakes as soon as the hook pushes its event over the bot socket;
+        without a push, re-checks the file every interval.  Returns True
+        if the entry was found within timeout, False otherwise.
         """
         logger.debug(
             "Waiting for session_map entry: window_id=%s, timeout=%.1f",
             window_id,
             timeout,
         )
-        key = f"{config.tmux_session_name}:{window_id}"
         deadline = asyncio.get_event_loop().time() + timeout
         while asyncio.get_event_loop().time() < deadline:
-            try:
-                if config.session_map_file.exists():
-                    async with aiofiles.open(config.session_map_file, "r") as f:
-                        content = await f.read()
-                    session_map = json.loads(content)
-                    info = session_map.get(key, {})
-                    if info.get("session_id"):
-                        # Found — load into window_states immediately
-                        logger.debug(
-                            "session_map entry found for window_id %s", window_id
-                        )
-                        await self.load_session_map()
-                        return True
-            except (json.JSONDecodeError, OSError):
-                pass
-            await asyncio.sleep(interval)
+            # refresh() applies a changed map to window_states via our listener
+            snapshot = await session_map_reader.refresh()
+            if snapshot.get(window_id).get("session_id"):
+                logger.debug("session_map entry found for window_id %s", window_id)
+                return True
+            remaining = deadline - asyncio.get_event_loop().time()
+            await session_map_reader.wait_for_change(min(interval, max(remaining, 0)))
         logger.warning(
             "Timed out waiting for session_map entry: window_id=%s", window_id
         )
         return False
 
     async def load_session_map(self) -> None:
-        """Read session_map.json and update window_states with new session associations.
+        """Refresh the shared session_map reader.
+
+        If session_map.json changed on disk, the new snapshot is applied to
+        window_states by _apply_session_map (a reader listener).
+        """
+        await session_map_reader.refresh()
+
+    def _apply_session_map(self, snapshot: SessionMapSnapshot) -> None:
+        """Update window_states with session associations from a new snapshot.
 
         Keys in session_map are formatted as "tmux_session:window_id" (e.g. "ccbot:@12").
         Only entries matching our tmux_session_name are processed.
         Also cleans up window_states entries not in current session_map.
         Updates window_display_names from the "window_name" field in values.
         """
-        if not config.session_map_file.exists():
-            return
-        try:
-            async with aiofiles.open(config.session_map_file, "r") as f:
-                content = await f.read()
-            session_map = json.loads(content)
-        except (json.JSONDecodeError, OSError):
+        if not snapshot.exists:
             return
 
         prefix = f"{config.tmux_session_name}:"
@@ -431,7 +586,7 @@ class SessionManager:
         old_format_sids: set[str] = set()
         changed = False
 
-        for key, info in session_map.items():
+        for key, info in snapshot.entries.items():
             # Only process entries for our tmux session
             if not key.startswith(prefix):
                 continue
@@ -461,12 +616,16 @@ class SessionManager:
                 )
                 state.session_id = new_sid
                 state.cwd = new_cwd
+                self._mark("window_states", window_id)
                 changed = True
             # Update display name
             if new_wname:
-                state.window_name = new_wname
+                if state.window_name != new_wname:
+                    state.window_name = new_wname
+                    self._mark("window_states", window_id)
                 if self.window_display_names.get(window_id) != new_wname:
                     self.window_display_names[window_id] = new_wname
+                    self._mark("window_display_names", window_id)
                     changed = True
 
         # Clean up window_states entries not in current session_map.
@@ -482,6 +641,7 @@ class SessionManager:
         for wid in stale_wids:
             logger.info("Removing stale window_state: %s", wid)
             del self.window_states[wid]
+            self._mark("window_states", wid)
             changed = True
 
         if changed:
@@ -499,6 +659,7 @@ class SessionManager:
         """Clear session association for a window (e.g., after /clear command)."""
         state = self.get_window_state(window_id)
         state.session_id = ""
+        self._mark("window_states", window_id)
         self._save_state()
         logger.info("Cleared session for window_id %s", window_id)
 
@@ -590,6 +751,7 @@ class SessionManager:
         )
         state.session_id = ""
         state.cwd = ""
+        self._mark("window_states", window_id)
         self._save_state()
         return None
 
@@ -612,6 +774,7 @@ class SessionManager:
         if user_id not in self.user_window_offsets:
             self.user_window_offsets[user_id] = {}
         self.user_window_offsets[user_id][window_id] = offset
+        self._mark("user_window_offsets", user_id, window_id)
         self._save_state()
 
     async def get_unread_info(self, user_id: int, window_id: str) -> UnreadInfo | None:
@@ -673,8 +836,10 @@ class SessionManager:
             self.thread_bindings[user_id] = {}
         self.thread_bindings[user_id][thread_id] = window_id
         self._window_to_thread[(user_id, window_id)] = thread_id
+        self._mark("thread_bindings", user_id, thread_id)
         if window_name:
             self.window_display_names[window_id] = window_name
+            self._mark("window_display_names", window_id)
         self._save_state()
         display = window_name or self.get_display_name(window_id)
         logger.info(
@@ -694,6 +859,7 @@ class SessionManager:
         self._window_to_thread.pop((user_id, window_id), None)
         if not bindings:
             del self.thread_bindings[user_id]
+        self._mark("thread_bindings", user_id, thread_id)
         self._save_state()
         logger.info(
             "Unbound thread %d (was %s) for user %d",
@@ -766,6 +932,7 @@ class SessionManager:
         key = f"{user_id}:{thread_id}"
         if self.group_chat_ids.get(key) != chat_id:
             self.group_chat_ids[key] = chat_id
+            self._mark("group_chat_ids", key)
             self._save_state()
             logger.info(
                 "Stored group chat_id %d for user %d, thread %d",
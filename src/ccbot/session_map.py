@@ -0,0 +1,284 @@
+"""Shared, change-gated reader for the session map (written by the hook).
+
+The map is session_map.json plus session_map.log, the records hooks
+append (see hook.py).  One reader serves every consumer (SessionManager,
+SessionMonitor, the new-window wait): each refresh() is a stat() of both
+files.  session_map.json is parsed only when (mtime_ns, size, inode)
+changed, i.e. after a compaction; from the log only the bytes appended
+since the last refresh are read.  compact() folds the log back in and
+drops entries of dead windows.  The result is published as an immutable
+SessionMapSnapshot, and listeners are called with the new snapshot
+whenever its contents changed.
+
+Key components:
+  - SessionMapSnapshot: Frozen parsed session_map plus our window→session view
+  - SessionMapReader: refresh(), snapshot, add_listener()/remove_listener(),
+    wait_for_change(), compact()
+  - session_map_reader: Module-level reader for config.session_map_file
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+
+import aiofiles
+
+from .config import config
+from .hook import apply_session_map_log, compact_session_map, map_side_paths
+
+logger = logging.getLogger(__name__)
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class SessionMapSnapshot:
+    """Immutable view of session_map.json at one point in time.
+
+    entries: full key ("tmux_session:window_id") -> read-only entry dict
+    window_sessions: window key -> session_id, for our tmux session only
+      (entries without a session_id are left out)
+    exists: False while the file is missing
+    version: increases by one each time the contents change
+    """
+
+    entries: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: _EMPTY)
+    window_sessions: Mapping[str, str] = field(default_factory=lambda: _EMPTY)
+    exists: bool = False
+    version: int = 0
+
+    def get(self, window_key: str) -> Mapping[str, Any]:
+        """Entry for a window key in our tmux session (empty if absent)."""
+        return self.entries.get(f"{config.tmux_session_name}:{window_key}", _EMPTY)
+
+
+SessionMapListener = Callable[[SessionMapSnapshot], None]
+
+
+class SessionMapReader:
+    """Stat-gated reader publishing SessionMapSnapshot to listeners."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        log_path, lock_path = map_side_paths(str(path))
+        self.log_path = Path(log_path)
+        self.lock_path = Path(lock_path)
+        self._snapshot = SessionMapSnapshot()
+        # Merged raw map the snapshot was built from
+        self._data: dict[str, Any] = {}
+        self._stat_key: tuple[int, int, int] | None = None
+        # Inode of session_map.log and how far into it we have applied
+        self._log_ino: int | None = None
+        self._log_offset = 0
+        self._listeners: list[SessionMapListener] = []
+        # Set (and replaced) each time a new snapshot is published
+        self._changed = asyncio.Event()
+
+    @property
+    def snapshot(self) -> SessionMapSnapshot:
+        """Latest snapshot (as of the last refresh)."""
+        return self._snapshot
+
+    def add_listener(self, listener: SessionMapListener) -> None:
+        """Call listener(snapshot) after each refresh that changed the map."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: SessionMapListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until a refresh publishes a new snapshot.
+
+        Returns False on timeout.  Someone else must call refresh() — the
+        hook socket handler does so as soon as a hook reports a change.
+        """
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    async def refresh(self) -> SessionMapSnapshot:
+        """Pick up changes on disk and return the snapshot.
+
+        session_map.json is re-parsed only when its (mtime_ns, size,
+        inode) changed, which hooks no longer cause; records the hooks
+        append to session_map.log are read from the last offset on.  A
+        file that can't be parsed (e.g. caught mid-write by a non-atomic
+        writer) keeps the previous snapshot and is retried on the next
+        refresh.
+        """
+        try:
+            st = _stat(self.path)
+            log_st = _stat(self.log_path)
+        except OSError as e:
+            logger.debug("Cannot stat %s: %s", self.path, e)
+            return self._snapshot
+        stat_key = (st.st_mtime_ns, st.st_size, st.st_ino) if st else None
+        log_ino = log_st.st_ino if log_st else None
+        log_size = log_st.st_size if log_st else 0
+
+        if (
+            stat_key != self._stat_key
+            or log_ino != self._log_ino
+            or log_size < self._log_offset
+        ):
+            # session_map.json rewritten (compaction) or log replaced
+            return await self._reload()
+        if log_size > self._log_offset:
+            chunk = await self._read_log(self._log_offset)
+            if chunk:
+                self._log_offset += len(chunk)
+                data = dict(self._data)
+                apply_session_map_log(data, chunk)
+                if data != self._data:
+                    self._data = data
+                    self._publish(data)
+        return self._snapshot
+
+    async def _reload(self) -> SessionMapSnapshot:
+        """Re-read session_map.json and all of session_map.log."""
+        try:
+            content, stat_key, chunk, log_ino = await asyncio.to_thread(
+                self._read_generation
+            )
+        except OSError as e:
+            logger.debug("Cannot read %s: %s", self.path, e)
+            return self._snapshot
+        data: Any = {}
+        if content is not None:
+            try:
+                data = json.loads(content)
+            except json.JSONDecodeError as e:
+                logger.debug("Cannot parse %s: %s", self.path, e)
+                return self._snapshot
+            if not isinstance(data, dict):
+                return self._snapshot
+
+        apply_session_map_log(data, chunk)
+        self._stat_key = stat_key
+        self._log_ino = log_ino
+        self._log_offset = len(chunk)
+
+        exists = stat_key is not None or log_ino is not None
+        if data == self._data and exists == self._snapshot.exists:
+            return self._snapshot  # Touched or compacted, but unchanged
+        self._data = data
+        self._publish(data, exists=exists)
+        return self._snapshot
+
+    def _read_generation(
+        self,
+    ) -> tuple[bytes | None, tuple[int, int, int] | None, bytes, int | None]:
+        """Read session_map.json and the complete lines of the log together.
+
+        Holds session_map.lock shared: compaction holds it exclusive, so it
+        cannot fold the log into the json between the two reads (which
+        would publish a map missing the folded entries).  Appending hooks
+        share the lock and are not held up.  Returns (json bytes or None,
+        json stat key, log lines, log inode).
+        """
+        with contextlib.ExitStack() as stack:
+            try:
+                lock_f = stack.enter_context(open(self.lock_path, "a"))
+                fcntl.flock(lock_f, fcntl.LOCK_SH)
+            except FileNotFoundError:
+                pass  # No CCBOT_DIR yet: nothing to race with
+            st = _stat(self.path)
+            log_st = _stat(self.log_path)
+            content = None
+            if st is not None:
+                try:
+                    with open(self.path, "rb") as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    st = None
+            chunk = b""
+            if log_st is not None:
+                try:
+                    with open(self.log_path, "rb") as f:
+                        chunk = f.read()
+                except FileNotFoundError:
+                    log_st = None
+        stat_key = (st.st_mtime_ns, st.st_size, st.st_ino) if st else None
+        log_ino = log_st.st_ino if log_st else None
+        return content, stat_key, chunk[: chunk.rfind(b"\n") + 1], log_ino
+
+    async def _read_log(self, offset: int) -> bytes:
+        """Complete lines of session_map.log from offset on.
+
+        A trailing partial line is an append still in progress; it is
+        read again on the next refresh.
+        """
+        try:
+            async with aiofiles.open(self.log_path, "rb") as f:
+                await f.seek(offset)
+                chunk = await f.read()
+        except OSError as e:
+            logger.debug("Cannot read %s: %s", self.log_path, e)
+            return b""
+        return chunk[: chunk.rfind(b"\n") + 1]
+
+    async def compact(
+        self, stale: Mapping[str, Mapping[str, Any]] | None = None
+    ) -> int:
+        """Fold session_map.log into session_map.json, dropping stale entries.
+
+        stale maps keys of dead windows to their entries as seen in a
+        snapshot taken *before* the live windows were listed; an entry
+        rewritten since then (a new window reusing the id) is kept.
+        Returns the number of entries removed.
+        """
+        stale_entries = {k: dict(v) for k, v in (stale or {}).items()}
+        removed = await asyncio.to_thread(
+            compact_session_map, str(self.path), stale_entries
+        )
+        await self.refresh()
+        return removed
+
+    def _publish(self, data: dict[str, Any], exists: bool = True) -> None:
+        """Freeze data into a new snapshot and notify listeners."""
+        prefix = f"{config.tmux_session_name}:"
+        entries: dict[str, Mapping[str, Any]] = {}
+        window_sessions: dict[str, str] = {}
+        for key, info in data.items():
+            if not isinstance(info, dict):
+                continue
+            entries[key] = MappingProxyType(dict(info))
+            if key.startswith(prefix) and info.get("session_id"):
+                window_sessions[key[len(prefix) :]] = info["session_id"]
+
+        self._snapshot = SessionMapSnapshot(
+            entries=MappingProxyType(entries),
+            window_sessions=MappingProxyType(window_sessions),
+            exists=exists,
+            version=self._snapshot.version + 1,
+        )
+        for listener in list(self._listeners):
+            try:
+                listener(self._snapshot)
+            except Exception as e:
+                logger.error("session_map listener %r failed: %s", listener, e)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+def _stat(path: Path) -> os.stat_result | None:
+    """os.stat(), or None if the file doesn't exist."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+session_map_reader = SessionMapReader(config.session_map_file)
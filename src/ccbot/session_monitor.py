@@ -1,12 +1,16 @@
 """Session monitoring service — watches JSONL files for new messages.
 
 Runs an async polling loop that:
-  1. Loads the current session_map to know which sessions to watch.
-  2. Detects session_map changes (new/changed/deleted windows) and cleans up.
-  3. Reads new JSONL lines from each session file using byte-offset tracking.
-  4. Parses entries via TranscriptParser and emits NewMessage objects to a callback.
+  1. Refreshes the shared session_map reader to know which sessions to watch.
+  2. Cleans up replaced/deleted windows' sessions when the reader publishes
+     a session_map change (_on_session_map_change listener).
+  3. Every SESSION_MAP_GC_INTERVAL, drops session_map entries of windows
+     that no longer exist and compacts the hook's append log.
+  4. Reads new JSONL lines from each session file using byte-offset tracking.
+  5. Parses entries via TranscriptParser and emits NewMessage objects to a callback.
 
-Optimizations: mtime cache skips unchanged files; byte offset avoids re-reading.
+Optimizations: a stat() of the size skips files with nothing past the byte
+offset; the offset avoids re-reading.
 
 Key classes: SessionMonitor, NewMessage, SessionInfo.
 """
@@ -14,6 +18,7 @@ Key classes: SessionMonitor, NewMessage, SessionInfo.
 import asyncio
 import json
 import logging
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Callable, Awaitable
@@ -22,12 +27,23 @@ import aiofiles
 
 from .config import config
 from .monitor_state import MonitorState, TrackedSession
+from .session_map import SessionMapSnapshot, session_map_reader
+from .state_store import get_state_store
 from .tmux_manager import tmux_manager
 from .transcript_parser import TranscriptParser
-from .utils import read_cwd_from_jsonl
+from .utils import ExpiringDict, read_cwd_from_jsonl
 
 logger = logging.getLogger(__name__)
 
+# Bounds on tool_use entries still waiting for their tool_result, per
+# session (interrupted tools never get one)
+PENDING_TOOLS_MAX_PER_SESSION = 256
+PENDING_TOOLS_TTL = 6 * 3600.0  # seconds
+
+# How often session_map entries of dead windows are dropped (and the
+# hook's append log compacted)
+SESSION_MAP_GC_INTERVAL = 600.0  # seconds
+
 
 @dataclass
 class SessionInfo:
@@ -70,19 +86,29 @@ class SessionMonitor:
             poll_interval if poll_interval is not None else config.monitor_poll_interval
         )
 
-        self.state = MonitorState(state_file=state_file or config.monitor_state_file)
+        # An explicit state_file (tests, tools) always uses the JSON format
+        self.state = MonitorState(
+            state_file=state_file or config.monitor_state_file,
+            store=None if state_file else get_state_store(),
+        )
         self.state.load()
 
         self._running = False
         self._task: asyncio.Task | None = None
         self._message_callback: Callable[[NewMessage], Awaitable[None]] | None = None
         # Per-session pending tool_use state carried across poll cycles
-        self._pending_tools: dict[str, dict[str, Any]] = {}  # session_id -> pending
+        # (session_id -> tool_use_id -> pending info), capped and expiring
+        self._pending_tools: dict[str, ExpiringDict[str, Any]] = {}
         # Track last known session_map for detecting changes
         # Keys may be window_id (@12) or window_name (old format) during transition
         self._last_session_map: dict[str, str] = {}  # window_key -> session_id
-        # In-memory mtime cache for quick file change detection (not persisted)
-        self._file_mtimes: dict[str, float] = {}  # session_id -> last_seen_mtime
+        # Set by wake() to start the next poll cycle immediately
+        self._wake = asyncio.Event()
+        # Serializes full cycles and single-session polls (both advance
+        # the same byte offsets)
+        self._poll_lock = asyncio.Lock()
+        # time.monotonic() after which the next session_map GC runs
+        self._next_gc = 0.0
 
     def set_message_callback(
         self, callback: Callable[[NewMessage], Awaitable[None]]
@@ -265,120 +291,113 @@ class SessionMonitor:
         for session_info in sessions:
             if session_info.session_id not in active_session_ids:
                 continue
-            try:
-                tracked = self.state.get_session(session_info.session_id)
+            new_messages.extend(await self._check_session(session_info))
 
-                if tracked is None:
-                    # For new sessions, initialize offset to end of file
-                    # to avoid re-processing old messages
-                    try:
-                        file_size = session_info.file_path.stat().st_size
-                        current_mtime = session_info.file_path.stat().st_mtime
-                    except OSError:
-                        file_size = 0
-                        current_mtime = 0.0
-                    tracked = TrackedSession(
-                        session_id=session_info.session_id,
-                        file_path=str(session_info.file_path),
-                        last_byte_offset=file_size,
-                    )
-                    self.state.update_session(tracked)
-                    self._file_mtimes[session_info.session_id] = current_mtime
-                    logger.info(f"Started tracking session: {session_info.session_id}")
-                    continue
+        self.state.save_if_dirty()
+        return new_messages
 
-                # Check mtime to see if file has changed
+    async def _check_session(self, session_info: SessionInfo) -> list[NewMessage]:
+        """Read and parse one session's new JSONL entries since its offset."""
+        new_messages: list[NewMessage] = []
+        try:
+            tracked = self.state.get_session(session_info.session_id)
+
+            if tracked is None:
+                # For new sessions, initialize offset to end of file
+                # to avoid re-processing old messages
                 try:
-                    current_mtime = session_info.file_path.stat().st_mtime
+                    file_size = session_info.file_path.stat().st_size
                 except OSError:
-                    continue
-
-                last_mtime = self._file_mtimes.get(session_info.session_id, 0.0)
-                if current_mtime <= last_mtime:
-                    # File hasn't changed, skip reading
-                    continue
-
-                # File changed, read new content from last offset
-                new_entries = await self._read_new_lines(
-                    tracked, session_info.file_path
+                    file_size = 0
+                tracked = TrackedSession(
+                    session_id=session_info.session_id,
+                    file_path=str(session_info.file_path),
+                    last_byte_offset=file_size,
                 )
-                self._file_mtimes[session_info.session_id] = current_mtime
-
-                if new_entries:
-                    logger.debug(
-                        f"Read {len(new_entries)} new entries for "
-                        f"session {session_info.session_id}"
-                    )
+                self.state.update_session(tracked)
+                logger.info(f"Started tracking session: {session_info.session_id}")
+                return new_messages
 
-                # Parse new entries using the shared logic, carrying over pending tools
-                carry = self._pending_tools.get(session_info.session_id, {})
-                parsed_entries, remaining = TranscriptParser.parse_entries(
-                    new_entries,
-                    pending_tools=carry,
+            # Gate on size, not mtime: an append landing in the same mtime
+            # tick as the previous read (e.g. right after a hook wake-up)
+            # would otherwise wait for the next write
+            try:
+                file_size = session_info.file_path.stat().st_size
+            except OSError:
+                return new_messages
+            if file_size == tracked.last_byte_offset:
+                # Nothing new (a smaller file was truncated: read to reset)
+                return new_messages
+
+            new_entries = await self._read_new_lines(tracked, session_info.file_path)
+
+            if new_entries:
+                logger.debug(
+                    f"Read {len(new_entries)} new entries for "
+                    f"session {session_info.session_id}"
                 )
-                if remaining:
-                    self._pending_tools[session_info.session_id] = remaining
-                else:
-                    self._pending_tools.pop(session_info.session_id, None)
 
-                for entry in parsed_entries:
-                    if not entry.text:
-                        continue
-                    # Skip user messages unless show_user_messages is enabled
-                    if entry.role == "user" and not config.show_user_messages:
-                        continue
-                    new_messages.append(
-                        NewMessage(
-                            session_id=session_info.session_id,
-                            text=entry.text,
-                            is_complete=True,
-                            content_type=entry.content_type,
-                            tool_use_id=entry.tool_use_id,
-                            role=entry.role,
-                            tool_name=entry.tool_name,
-                        )
+            # Parse new entries using the shared logic, carrying over pending tools
+            pending = self._pending_tools.get(session_info.session_id)
+            carry = dict(pending.items()) if pending else {}
+            parsed_entries, remaining = TranscriptParser.parse_entries(
+                new_entries,
+                pending_tools=carry,
+            )
+            self._carry_pending_tools(session_info.session_id, remaining)
+
+            for entry in parsed_entries:
+                if not entry.text:
+                    continue
+                # Skip user messages unless show_user_messages is enabled
+                if entry.role == "user" and not config.show_user_messages:
+                    continue
+                new_messages.append(
+                    NewMessage(
+                        session_id=session_info.session_id,
+                        text=entry.text,
+                        is_complete=True,
+                        content_type=entry.content_type,
+                        tool_use_id=entry.tool_use_id,
+                        role=entry.role,
+                        tool_name=entry.tool_name,
                     )
+                )
 
-                self.state.update_session(tracked)
+            self.state.update_session(tracked)
 
-            except OSError as e:
-                logger.debug(f"Error processing session {session_info.session_id}: {e}")
+        except OSError as e:
+            logger.debug(f"Error processing session {session_info.session_id}: {e}")
 
-        self.state.save_if_dirty()
         return new_messages
 
-    async def _load_current_session_map(self) -> dict[str, str]:
-        """Load current session_map and return window_key -> session_id mapping.
+    def _carry_pending_tools(self, session_id: str, remaining: dict[str, Any]) -> None:
+        """Store still-pending tools for the next poll, keeping their age.
 
-        Keys in session_map are formatted as "tmux_session:window_id"
-        (e.g. "ccbot:@12"). Old-format keys ("ccbot:window_name") are also
-        accepted so that sessions running before a code upgrade continue
-        to be monitored until the hook re-fires with new format.
-        Only entries matching our tmux_session_name are processed.
+        Tools already pending keep their original timestamp, so one whose
+        result never arrives expires after PENDING_TOOLS_TTL.
         """
-        window_to_session: dict[str, str] = {}
-        if config.session_map_file.exists():
-            try:
-                async with aiofiles.open(config.session_map_file, "r") as f:
-                    content = await f.read()
-                session_map = json.loads(content)
-                prefix = f"{config.tmux_session_name}:"
-                for key, info in session_map.items():
-                    # Only process entries for our tmux session
-                    if not key.startswith(prefix):
-                        continue
-                    window_key = key[len(prefix) :]
-                    session_id = info.get("session_id", "")
-                    if session_id:
-                        window_to_session[window_key] = session_id
-            except (json.JSONDecodeError, OSError):
-                pass
-        return window_to_session
+        if not remaining:
+            self._pending_tools.pop(session_id, None)
+            return
+        pending = self._pending_tools.get(session_id)
+        if pending is None:
+            pending = self._pending_tools[session_id] = ExpiringDict(
+                PENDING_TOOLS_MAX_PER_SESSION, PENDING_TOOLS_TTL
+            )
+        for tool_id in pending:
+            if tool_id not in remaining:
+                pending.pop(tool_id)
+        for tool_id, info in remaining.items():
+            if tool_id not in pending:
+                pending[tool_id] = info
+        if not len(pending):
+            self._pending_tools.pop(session_id, None)
 
     async def _cleanup_all_stale_sessions(self) -> None:
         """Clean up all tracked sessions not in current session_map (used on startup)."""
-        current_map = await self._load_current_session_map()
-        active_session_ids = set(current_map.values())
+        snapshot = await session_map_reader.refresh()
+        active_session_ids = set(snapshot.window_sessions.values())
 
         stale_sessions = []
         for session_id in self.state.tracked_sessions.keys():
@@ -391,15 +410,34 @@ class SessionMonitor:
             )
             for session_id in stale_sessions:
                 self.state.remove_session(session_id)
-                self._file_mtimes.pop(session_id, None)
+                self._pending_tools.pop(session_id, None)
             self.state.save_if_dirty()
 
-    async def _detect_and_cleanup_changes(self) -> dict[str, str]:
-        """Detect session_map changes and cleanup replaced/removed sessions.
+    async def _collect_session_map_garbage(self) -> None:
+        """Drop session_map entries of dead windows and compact the log.
 
-        Returns current session_map for further processing.
+        The snapshot is taken before the live windows are listed, and
+        compact() keeps entries rewritten since, so a window created in
+        between is never mistaken for a dead one.
         """
-        current_map = await self._load_current_session_map()
+        snapshot = await session_map_reader.refresh()
+        live_keys = await tmux_manager.list_window_keys()
+        if live_keys is None:
+            return
+        stale = {k: v for k, v in snapshot.entries.items() if k not in live_keys}
+        removed = await session_map_reader.compact(stale)
+        if removed:
+            logger.info("Removed %d session_map entries of dead windows", removed)
+
+    def _on_session_map_change(self, snapshot: SessionMapSnapshot) -> None:
+        """Session map listener: clean up replaced/removed sessions.
+
+        Keys are window keys of our tmux session ("@12", or a window_name
+        for entries written before the window_id format), so sessions
+        running before a code upgrade stay monitored until the hook
+        re-fires.
+        """
+        current_map = dict(snapshot.window_sessions)
 
         sessions_to_remove: set[str] = set()
 
@@ -433,14 +471,12 @@ class SessionMonitor:
         if sessions_to_remove:
             for session_id in sessions_to_remove:
                 self.state.remove_session(session_id)
-                self._file_mtimes.pop(session_id, None)
+                self._pending_tools.pop(session_id, None)
             self.state.save_if_dirty()
 
         # Update last known map
         self._last_session_map = current_map
 
-        return current_map
-
     async def _monitor_loop(self) -> None:
         """Background loop for checking session updates.
 
@@ -448,43 +484,75 @@ class SessionMonitor:
         """
         logger.info("Session monitor started, polling every %ss", self.poll_interval)
 
-        # Deferred import to avoid circular dependency (cached once)
-        from .session import session_manager
-
         # Clean up all stale sessions on startup
         await self._cleanup_all_stale_sessions()
-        # Initialize last known session_map
-        self._last_session_map = await self._load_current_session_map()
+        # Initialize last known session_map, then follow its changes
+        self._last_session_map = dict(session_map_reader.snapshot.window_sessions)
+        session_map_reader.add_listener(self._on_session_map_change)
 
         while self._running:
             try:
-                # Load hook-based session map updates
-                await session_manager.load_session_map()
-
-                # Detect session_map changes and cleanup replaced/removed sessions
-                current_map = await self._detect_and_cleanup_changes()
-                active_session_ids = set(current_map.values())
+                # One stat() per cycle; on change the reader re-parses and its
+                # listeners update window_states (SessionManager) and clean up
+                # replaced/removed sessions (_on_session_map_change)
+                snapshot = await session_map_reader.refresh()
+                active_session_ids = set(snapshot.window_sessions.values())
 
                 # Check for new messages (all I/O is async)
-                new_messages = await self.check_for_updates(active_session_ids)
+                async with self._poll_lock:
+                    new_messages = await self.check_for_updates(active_session_ids)
+                    await self._dispatch(new_messages)
 
-                for msg in new_messages:
-                    status = "complete" if msg.is_complete else "streaming"
-                    preview = msg.text[:80] + ("..." if len(msg.text) > 80 else "")
-                    logger.info("[%s] session=%s: %s", status, msg.session_id, preview)
-                    if self._message_callback:
-                        try:
-                            await self._message_callback(msg)
-                        except Exception as e:
-                            logger.error(f"Message callback error: {e}")
+                if time.monotonic() >= self._next_gc:
+                    self._next_gc = time.monotonic() + SESSION_MAP_GC_INTERVAL
+                    await self._collect_session_map_garbage()
 
             except Exception as e:
                 logger.error(f"Monitor loop error: {e}")
 
-            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
 
         logger.info("Session monitor stopped")
 
+    async def _dispatch(self, new_messages: list[NewMessage]) -> None:
+        """Hand new messages to the callback in order."""
+        for msg in new_messages:
+            status = "complete" if msg.is_complete else "streaming"
+            preview = msg.text[:80] + ("..." if len(msg.text) > 80 else "")
+            logger.info("[%s] session=%s: %s", status, msg.session_id, preview)
+            if self._message_callback:
+                try:
+                    await self._message_callback(msg)
+                except Exception as e:
+                    logger.error(f"Message callback error: {e}")
+
+    def wake(self) -> None:
+        """Run the next poll cycle now instead of after poll_interval."""
+        self._wake.set()
+
+    async def poll_session(self, session_id: str) -> None:
+        """Read one tracked session's new entries now (hook wake-up).
+
+        A session that isn't tracked yet needs the project scan of a full
+        cycle, so it wakes the loop instead.
+        """
+        tracked = self.state.get_session(session_id)
+        if (
+            tracked is None
+            or session_id not in session_map_reader.snapshot.window_sessions.values()
+        ):
+            self.wake()
+            return
+        async with self._poll_lock:
+            info = SessionInfo(session_id=session_id, file_path=Path(tracked.file_path))
+            new_messages = await self._check_session(info)
+            self.state.save_if_dirty()
+            await self._dispatch(new_messages)
+
     def start(self) -> None:
         if self._running:
             logger.warning("Monitor already running")
@@ -494,6 +562,7 @@ class SessionMonitor:
 
     def stop(self) -> None:
         self._running = False
+        session_map_reader.remove_listener(self._on_session_map_change)
         if self._task:
             self._task.cancel()
             self._task = None
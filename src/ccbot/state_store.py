@@ -0,0 +1,323 @@
+"""SQLite state backend (STATE_BACKEND=sqlite).
+
+Keeps the bot state (state.json) and the monitor byte offsets
+(monitor_state.json) in one SQLite database (~/.ccbot/state.db) in WAL
+mode. Callers load the same JSON-shaped dicts as the JSON files hold.
+SessionManager and MonitorState record which keys they changed and save
+just those rows (write_rows), so a save costs O(changed rows), in one
+transaction.  Whole-state saves (sync: the one-time JSON import, bulk
+rewrites at startup) diff every row against an in-memory mirror of the
+database instead.
+
+On first open the JSON files are imported once (recorded in the meta
+table). They are left in place, so switching back to STATE_BACKEND=json
+resumes from the state as it was at migration time.
+
+Key class: StateStore.
+Key function: get_state_store() — the shared store, or None for the JSON
+backend.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# table -> (key columns, value columns)
+TABLES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "window_states": (("window_id",), ("session_id", "cwd", "window_name")),
+    "thread_bindings": (("user_id", "thread_id"), ("window_id",)),
+    "user_window_offsets": (("user_id", "window_id"), ("byte_offset",)),
+    "group_chat_ids": (("chat_key",), ("chat_id",)),
+    "window_display_names": (("window_id",), ("window_name",)),
+    "tracked_sessions": (("session_id",), ("file_path", "last_byte_offset")),
+}
+SESSION_TABLES = (
+    "window_states",
+    "thread_bindings",
+    "user_window_offsets",
+    "group_chat_ids",
+    "window_display_names",
+)
+
+# key tuple -> value tuple, one entry per row
+Rows = dict[tuple[Any, ...], tuple[Any, ...]]
+# table -> {key tuple -> value tuple, or None to delete the row}
+RowChanges = dict[str, dict[tuple[Any, ...], tuple[Any, ...] | None]]
+# (table, upsert rows as key + value tuples, delete keys)
+_TablePlan = tuple[str, list[tuple[Any, ...]], list[tuple[Any, ...]]]
+
+
+class StateStore:
+    """Row-level persistence of bot and monitor state in SQLite.
+
+    The connection is shared between the event loop and the state-save
+    worker thread; a lock serializes access.  The rows last written are
+    mirrored in memory so each save can be diffed without reading back.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commits survive a process crash; only an OS crash
+        # can lose the last transactions
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._rows: dict[str, Rows] = {t: self._select(t) for t in TABLES}
+
+    def _create_tables(self) -> None:
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        for table, (keys, values) in TABLES.items():
+            columns = ", ".join(keys + values)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                f"({columns}, PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID"
+            )
+
+    def _select(self, table: str) -> Rows:
+        keys, values = TABLES[table]
+        cursor = self._conn.execute(f"SELECT {', '.join(keys + values)} FROM {table}")
+        n = len(keys)
+        return {row[:n]: row[n:] for row in cursor}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Row-level sync ---
+
+    def sync(self, tables: dict[str, Rows]) -> int:
+        """Make each given table hold exactly rows, writing only the difference.
+
+        Diffs every row; callers that know which keys changed use
+        write_rows() instead.  All upserts and deletes go into a single
+        transaction.  Returns the number of rows written or deleted.
+        """
+        with self._lock:
+            plan: list[_TablePlan] = []
+            for table, rows in tables.items():
+                old = self._rows[table]
+                upserts = [k + v for k, v in rows.items() if old.get(k) != v]
+                deletes = [k for k in old if k not in rows]
+                if upserts or deletes:
+                    plan.append((table, upserts, deletes))
+            self._execute(plan)
+            for table, _upserts, _deletes in plan:
+                self._rows[table] = dict(tables[table])
+            return sum(len(u) + len(d) for _, u, d in plan)
+
+    def write_rows(self, changes: RowChanges) -> int:
+        """Upsert or delete (value None) just the given rows.
+
+        Rows already holding the given value are skipped.  All writes go
+        into a single transaction.  Returns the number of rows written or
+        deleted.
+        """
+        with self._lock:
+            plan: list[_TablePlan] = []
+            for table, rows in changes.items():
+                old = self._rows[table]
+                upserts = [
+                    k + v for k, v in rows.items() if v is not None and old.get(k) != v
+                ]
+                deletes = [k for k, v in rows.items() if v is None and k in old]
+                if upserts or deletes:
+                    plan.append((table, upserts, deletes))
+            self._execute(plan)
+            for table, rows in changes.items():
+                mirror = self._rows[table]
+                for k, v in rows.items():
+                    if v is None:
+                        mirror.pop(k, None)
+                    else:
+                        mirror[k] = v
+            return sum(len(u) + len(d) for _, u, d in plan)
+
+    def _execute(self, plan: list[_TablePlan]) -> None:
+        """Apply (table, upsert rows, delete keys) in one transaction."""
+        if not plan:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            for table, upserts, deletes in plan:
+                keys, values = TABLES[table]
+                if upserts:
+                    self._conn.executemany(_upsert_sql(table, keys, values), upserts)
+                if deletes:
+                    where = " AND ".join(f"{k} = ?" for k in keys)
+                    self._conn.executemany(
+                        f"DELETE FROM {table} WHERE {where}", deletes
+                    )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # --- SessionManager state (state.json shape) ---
+
+    def load_session_state(self) -> dict[str, Any]:
+        """Return the bot state in the same shape as state.json."""
+        with self._lock:
+            rows = {t: dict(self._rows[t]) for t in SESSION_TABLES}
+        state: dict[str, Any] = {
+            "window_states": {},
+            "user_window_offsets": {},
+            "thread_bindings": {},
+            "group_chat_ids": {},
+            "window_display_names": {},
+        }
+        for (wid,), (session_id, cwd, window_name) in rows["window_states"].items():
+            ws = {"session_id": session_id, "cwd": cwd}
+            if window_name:
+                ws["window_name"] = window_name
+            state["window_states"][wid] = ws
+        for (uid, wid), (offset,) in rows["user_window_offsets"].items():
+            state["user_window_offsets"].setdefault(str(uid), {})[wid] = offset
+        for (uid, tid), (wid,) in rows["thread_bindings"].items():
+            state["thread_bindings"].setdefault(str(uid), {})[str(tid)] = wid
+        for (key,), (chat_id,) in rows["group_chat_ids"].items():
+            state["group_chat_ids"][key] = chat_id
+        for (wid,), (name,) in rows["window_display_names"].items():
+            state["window_display_names"][wid] = name
+        return state
+
+    def save_session_state(self, state: dict[str, Any]) -> int:
+        """Persist a whole state.json-shaped dict, writing only changed rows."""
+        return self.sync(_session_rows(state))
+
+    # --- MonitorState offsets (monitor_state.json shape) ---
+
+    def load_tracked_sessions(self) -> dict[str, dict[str, Any]]:
+        """Return tracked sessions as monitor_state.json's tracked_sessions."""
+        with self._lock:
+            rows = dict(self._rows["tracked_sessions"])
+        return {
+            sid: {"session_id": sid, "file_path": path, "last_byte_offset": offset}
+            for (sid,), (path, offset) in rows.items()
+        }
+
+    def save_tracked_sessions(self, sessions: dict[str, dict[str, Any] | None]) -> int:
+        """Persist the given tracked sessions (None = no longer tracked)."""
+        rows: dict[tuple[Any, ...], tuple[Any, ...] | None] = {
+            (sid,): None
+            if s is None
+            else (s.get("file_path", ""), s.get("last_byte_offset", 0))
+            for sid, s in sessions.items()
+        }
+        return self.write_rows({"tracked_sessions": rows})
+
+    # --- One-time JSON import ---
+
+    def migrate_from_json(self, state_file: Path, monitor_state_file: Path) -> bool:
+        """Import state.json and monitor_state.json once.
+
+        Returns True if the import ran (first open of a new database).
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+        if done:
+            return False
+
+        tables: dict[str, Rows] = {}
+        state = _read_json(state_file)
+        if state:
+            tables.update(_session_rows(state))
+        monitor = _read_json(monitor_state_file)
+        if monitor:
+            tables["tracked_sessions"] = {
+                (sid,): (s.get("file_path", ""), s.get("last_byte_offset", 0))
+                for sid, s in monitor.get("tracked_sessions", {}).items()
+            }
+        count = self.sync(tables)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')"
+            )
+        logger.info("Imported %d rows from JSON state into %s", count, self.path)
+        return True
+
+
+def _upsert_sql(table: str, keys: tuple[str, ...], values: tuple[str, ...]) -> str:
+    columns = keys + values
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{v} = excluded.{v}" for v in values)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+def _session_rows(state: dict[str, Any]) -> dict[str, Rows]:
+    """Flatten a state.json-shaped dict into rows per table."""
+    return {
+        "window_states": {
+            (wid,): (
+                ws.get("session_id", ""),
+                ws.get("cwd", ""),
+                ws.get("window_name", ""),
+            )
+            for wid, ws in state.get("window_states", {}).items()
+        },
+        "thread_bindings": {
+            (int(uid), int(tid)): (wid,)
+            for uid, bindings in state.get("thread_bindings", {}).items()
+            for tid, wid in bindings.items()
+        },
+        "user_window_offsets": {
+            (int(uid), wid): (offset,)
+            for uid, offsets in state.get("user_window_offsets", {}).items()
+            for wid, offset in offsets.items()
+        },
+        "group_chat_ids": {
+            (key,): (chat_id,)
+            for key, chat_id in state.get("group_chat_ids", {}).items()
+        },
+        "window_display_names": {
+            (wid,): (name,)
+            for wid, name in state.get("window_display_names", {}).items()
+        },
+    }
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("Skipping unreadable %s during migration: %s", path, e)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+_store: StateStore | None = None
+
+
+def get_state_store() -> StateStore | None:
+    """Return the shared SQLite store, or None when STATE_BACKEND is json.
+
+    The first call opens the database and imports the JSON files once.
+    """
+    global _store
+    if config.state_backend != "sqlite":
+        return None
+    if _store is None:
+        _store = StateStore(config.state_db_file)
+        _store.migrate_from_json(config.state_file, config.monitor_state_file)
+    return _store
@@ -2,42 +2,133 @@
 
 Provides:
   - split_message(): splits long text into Telegram-safe chunks (≤4096 chars),
-    preferring newline boundaries.
+    preferring newline boundaries. Fenced code blocks cut by a chunk
+    boundary are closed and reopened so every chunk is valid markdown.
+    Runs in linear time (lines are accumulated in lists, not by string
+    concatenation).
 """
 
+import re
+from collections.abc import Callable
+
+from .markdown_v2 import mdv2_escaped_length
+
 TELEGRAM_MAX_MESSAGE_LENGTH = 4096
 
+# Opening/closing line of a fenced code block (CommonMark: up to 3 spaces
+# of indentation, 3+ backticks or tildes, optional info string)
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$")
+
 
 def split_message(
-    text: str, max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH
+    text: str,
+    max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH,
+    *,
+    markdown_v2: bool = False,
 ) -> list[str]:
     """Split a message into chunks that fit Telegram's length limit.
 
     Tries to split on newlines when possible to preserve formatting.
+    A fenced code block that spans a boundary is closed at the end of one
+    chunk and reopened (same fence and info string) at the start of the
+    next.
+
+    With markdown_v2=True, lengths are measured after MarkdownV2 escaping,
+    so chunks still fit once converted.
     """
-    if len(text) <= max_length:
+    measure: Callable[[str], int] = mdv2_escaped_length if markdown_v2 else len
+    if measure(text) <= max_length:
         return [text]
 
-    chunks = []
-    current_chunk = ""
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0  # measure("\n".join(current))
+    fence_open = ""  # Opening line of the fence we are inside, if any
+    fence_close = ""
+
+    def flush(close: bool) -> None:
+        nonlocal current, size
+        if current and not (fence_open and current == [fence_open]):
+            chunk = "\n".join(current).rstrip("\n")
+            if close and fence_open:
+                chunk = f"{chunk}\n{fence_close}"
+            chunks.append(chunk)
+        # Carry the open fence into the next chunk
+        current = [fence_open] if fence_open else []
+        size = measure(fence_open) if fence_open else 0
 
     for line in text.split("\n"):
+        cost = measure(line)
+
+        # Fence state after this line, and room needed to close it
+        next_open, next_close = _fence_transition(line, fence_open, fence_close)
+        reserve = measure(next_close) + 1 if next_open else 0
+
+        if fence_open:
+            overhead = measure(fence_open) + measure(fence_close) + 2
+        else:
+            overhead = 0
+        if overhead >= max_length:
+            overhead = 0  # Budget too small to wrap pieces in fences
+
         # If single line exceeds max, split it forcefully
-        if len(line) > max_length:
-            if current_chunk:
-                chunks.append(current_chunk.rstrip("\n"))
-                current_chunk = ""
-            # Split long line into fixed-size pieces
-            for i in range(0, len(line), max_length):
-                chunks.append(line[i : i + max_length])
-        elif len(current_chunk) + len(line) + 1 > max_length:
+        if cost + overhead > max_length:
+            flush(close=True)
+            for piece in _cut(line, max_length - overhead, markdown_v2):
+                if overhead:
+                    chunks.append(f"{fence_open}\n{piece}\n{fence_close}")
+                else:
+                    chunks.append(piece)
+            current = [fence_open] if fence_open else []
+            size = measure(fence_open) if fence_open else 0
+            continue
+
+        need = cost + 1 if current else cost
+        if current and size + need + reserve > max_length:
             # Current chunk is full, start a new one
-            chunks.append(current_chunk.rstrip("\n"))
-            current_chunk = line + "\n"
-        else:
-            current_chunk += line + "\n"
+            flush(close=True)
+            need = cost + 1 if current else cost
 
-    if current_chunk:
-        chunks.append(current_chunk.rstrip("\n"))
+        current.append(line)
+        size += need
+        fence_open, fence_close = next_open, next_close
 
+    flush(close=False)
     return chunks
+
+
+def _fence_transition(line: str, fence_open: str, fence_close: str) -> tuple[str, str]:
+    """Return (opening line, closing marker) of the fence after this line."""
+    m = _FENCE_RE.match(line)
+    if not m:
+        return fence_open, fence_close
+    marker, info = m.groups()
+    if fence_open:
+        # Closing fence: same character, at least as long, nothing after it
+        if (
+            marker[0] == fence_close[0]
+            and len(marker) >= len(fence_close)
+            and not info.strip()
+        ):
+            return "", ""
+        return fence_open, fence_close
+    if marker[0] == "`" and "`" in info:
+        return "", ""  # Not a fence: backtick info strings can't contain `
+    return line, marker
+
+
+def _cut(line: str, limit: int, markdown_v2: bool) -> list[str]:
+    """Split an overlong line into pieces measuring at most limit each."""
+    if not markdown_v2:
+        return [line[i : i + limit] for i in range(0, len(line), limit)]
+    pieces: list[str] = []
+    start = 0
+    used = 0
+    for i, ch in enumerate(line):
+        width = mdv2_escaped_length(ch)
+        if used + width > limit:
+            pieces.append(line[start:i])
+            start, used = i, 0
+        used += width
+    pieces.append(line[start:])
+    return pieces
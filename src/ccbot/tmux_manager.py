@@ -2,8 +2,10 @@
 
 Wraps libtmux to provide async-friendly operations on a single tmux session:
   - list_windows / find_window_by_name: discover Claude Code windows.
+  - list_window_keys: live windows server-wide, for session_map GC.
   - capture_pane: read terminal content (plain or with ANSI colors).
-  - send_keys: forward user input or control keys to a window.
+  - send_keys: forward user input or control keys to a window (long
+    text as one bracketed paste via a tmux buffer).
   - create_window / kill_window: lifecycle management.
 
 All blocking libtmux calls are wrapped in asyncio.to_thread().
@@ -14,16 +16,41 @@ Key class: TmuxManager (singleton instantiated as `tmux_manager`).
 from __future__ import annotations
 
 import asyncio
+import itertools
 import logging
+import re
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
 
 import libtmux
 
+from . import procfs
 from .config import config
 
 logger = logging.getLogger(__name__)
 
+# Upper bounds on the waits in send_keys(): text → Enter, and "!" → the
+# rest of a bash-mode command.  Adaptive mode (config.send_keys_adaptive)
+# moves on as soon as the pane shows the text / the bash-mode prompt.
+SEND_ENTER_DELAY = 0.5  # seconds
+BASH_MODE_DELAY = 1.0  # seconds
+READY_POLL_INTERVAL = 0.03  # seconds
+
+# How long get_pane_pid() reuses a resolved foreground PID
+PANE_PID_CACHE_TTL = 2.0  # seconds
+
+# Literal text at least this long is typed as one bracketed paste through
+# a tmux buffer instead of key by key
+PASTE_THRESHOLD = 1024  # chars
+
+# Claude Code's bash-mode prompt: a line starting with "!" (after any box
+# border), where the normal prompt shows ">"
+_BASH_PROMPT_RE = re.compile(r"^[\s│]*!(?:\s|$)", re.MULTILINE)
+# Compare the tail of the typed text only; the TUI wraps long input
+_ECHO_NEEDLE_CHARS = 24
+
 
 @dataclass
 class TmuxWindow:
@@ -33,6 +60,8 @@ class TmuxWindow:
     window_name: str
     cwd: str  # Current working directory
     pane_current_command: str = ""  # Process running in active pane
+    pane_width: int = 0  # Active pane size in cells (0 if unknown)
+    pane_height: int = 0
 
 
 class TmuxManager:
@@ -46,6 +75,12 @@ class TmuxManager:
         """
         self.session_name = session_name or config.tmux_session_name
         self._server: libtmux.Server | None = None
+        # Unique tmux buffer names for _paste_text()
+        self._buffer_ids = itertools.count()
+        # get_pane_pid() caches: window_id -> shell PID (kept while alive),
+        # window_id -> (foreground PID, time.monotonic() expiry)
+        self._shell_pids: dict[str, int] = {}
+        self._pane_pids: dict[str, tuple[int, float]] = {}
 
     @property
     def server(self) -> libtmux.Server:
@@ -103,9 +138,12 @@ class TmuxManager:
                     if pane:
                         cwd = pane.pane_current_path or ""
                         pane_cmd = pane.pane_current_command or ""
+                        width = int(pane.pane_width or 0)
+                        height = int(pane.pane_height or 0)
                     else:
                         cwd = ""
                         pane_cmd = ""
+                        width = height = 0
 
                     windows.append(
                         TmuxWindow(
@@ -113,6 +151,8 @@ class TmuxManager:
                             window_name=name,
                             cwd=cwd,
                             pane_current_command=pane_cmd,
+                            pane_width=width,
+                            pane_height=height,
                         )
                     )
                 except Exception as e:
@@ -122,6 +162,38 @@ class TmuxManager:
 
         return await asyncio.to_thread(_sync_list_windows)
 
+    async def list_window_keys(self) -> set[str] | None:
+        """Keys of every live window on the tmux server, for session_map GC.
+
+        Each window contributes "session_name:@id" and the old-format
+        "session_name:window_name".  Returns None when tmux can't be
+        queried, so callers never mistake a failure for "no windows".
+        """
+
+        def _sync_list_keys() -> set[str] | None:
+            try:
+                result = self.server.cmd(
+                    "list-windows",
+                    "-a",
+                    "-F",
+                    "#{session_name}\t#{window_id}\t#{window_name}",
+                )
+            except Exception as e:
+                logger.debug(f"Failed to list windows: {e}")
+                return None
+            if result.stderr:
+                logger.debug("Failed to list windows: %s", result.stderr)
+                return None
+            keys: set[str] = set()
+            for line in result.stdout:
+                parts = line.split("\t", 2)
+                if len(parts) == 3:
+                    keys.add(f"{parts[0]}:{parts[1]}")
+                    keys.add(f"{parts[0]}:{parts[2]}")
+            return keys
+
+        return await asyncio.to_thread(_sync_list_keys)
+
     async def find_window_by_name(self, window_name: str) -> TmuxWindow | None:
         """Find a window by its name.
 
@@ -224,11 +296,11 @@ class TmuxManager:
             True if successful, False otherwise
         """
         if literal and enter:
-            # Split into text + delay + Enter via libtmux.
+            # Split into text + wait + Enter via libtmux.
             # Claude Code's TUI sometimes interprets a rapid-fire Enter
             # (arriving in the same input batch as the text) as a newline
-            # rather than submit.  A 500ms gap lets the TUI process the
-            # text before receiving Enter.
+            # rather than submit.  Enter is sent once the pane shows the
+            # text (the TUI has processed it), or after SEND_ENTER_DELAY.
             def _send_literal(chars: str) -> bool:
                 session = self.get_session()
                 if not session:
@@ -266,22 +338,37 @@ class TmuxManager:
                     logger.error(f"Failed to send Enter to window {window_id}: {e}")
                     return False
 
+            async def _type(chars: str) -> bool:
+                if len(chars) >= PASTE_THRESHOLD:
+                    return await self._paste_text(window_id, chars)
+                return await asyncio.to_thread(_send_literal, chars)
+
+            screen = await self._screen_for_wait(window_id)
             # Claude Code's ! command mode: send "!" first so the TUI
-            # switches to bash mode, wait 1s, then send the rest.
+            # switches to bash mode (wait up to BASH_MODE_DELAY), then
+            # send the rest.
             if text.startswith("!"):
                 if not await asyncio.to_thread(_send_literal, "!"):
                     return False
                 rest = text[1:]
                 if rest:
-                    await asyncio.sleep(1.0)
-                    if not await asyncio.to_thread(_send_literal, rest):
+                    screen = await self._wait_for_pane(
+                        window_id, screen, _count_bash_prompts, BASH_MODE_DELAY
+                    )
+                    if not await _type(rest):
                         return False
+                    text = rest
             else:
-                if not await asyncio.to_thread(_send_literal, text):
+                if not await _type(text):
                     return False
-            await asyncio.sleep(0.5)
+            await self._wait_for_pane(
+                window_id, screen, _echo_counter(text), SEND_ENTER_DELAY
+            )
             return await asyncio.to_thread(_send_enter)
 
+        if literal and not enter and len(text) >= PASTE_THRESHOLD:
+            return await self._paste_text(window_id, text)
+
         # Other cases: special keys (literal=False) or no-enter
         def _sync_send_keys() -> bool:
             session = self.get_session()
@@ -309,6 +396,136 @@ class TmuxManager:
 
         return await asyncio.to_thread(_sync_send_keys)
 
+    async def _paste_text(self, window_id: str, text: str) -> bool:
+        """Type text into a window as one bracketed paste.
+
+        The text goes to a tmux buffer through stdin (`load-buffer -`) and
+        is pasted with `paste-buffer -p`, which wraps it in bracketed-paste
+        markers when the application asked for them (Claude Code does).
+        The TUI receives it as a single paste instead of a key per
+        character.  -d deletes the buffer afterwards; if the paste fails,
+        the buffer is deleted explicitly so it doesn't pile up in tmux.
+        """
+        buffer = f"ccbot-{window_id.lstrip('@')}-{next(self._buffer_ids)}"
+        loaded = pasted = False
+        try:
+            load = await asyncio.create_subprocess_exec(
+                "tmux",
+                "load-buffer",
+                "-b",
+                buffer,
+                "-",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, err = await load.communicate(text.encode("utf-8"))
+            if load.returncode != 0:
+                logger.error(f"Failed to load paste buffer: {err.decode().strip()}")
+                return False
+            loaded = True
+            paste = await asyncio.create_subprocess_exec(
+                "tmux",
+                "paste-buffer",
+                "-p",
+                "-d",
+                "-b",
+                buffer,
+                "-t",
+                window_id,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, err = await paste.communicate()
+            if paste.returncode != 0:
+                logger.error(
+                    f"Failed to paste into window {window_id}: {err.decode().strip()}"
+                )
+                return False
+            pasted = True
+        except OSError as e:
+            logger.error(f"Failed to paste into window {window_id}: {e}")
+            return False
+        finally:
+            if loaded and not pasted:
+                await self._delete_buffer(buffer)
+        return True
+
+    @staticmethod
+    async def _delete_buffer(buffer: str) -> None:
+        """Best-effort `tmux delete-buffer` for a paste that didn't happen."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "tmux",
+                "delete-buffer",
+                "-b",
+                buffer,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            await proc.wait()
+        except OSError as e:
+            logger.debug(f"Failed to delete paste buffer {buffer}: {e}")
+
+    async def _capture_text(self, window_id: str) -> str | None:
+        """Plain visible text of a pane: one `tmux capture-pane` call."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "tmux",
+                "capture-pane",
+                "-p",
+                "-t",
+                window_id,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await proc.communicate()
+        except OSError as e:
+            logger.debug("Cannot capture %s: %s", window_id, e)
+            return None
+        return stdout.decode("utf-8", "replace") if proc.returncode == 0 else None
+
+    async def _screen_for_wait(self, window_id: str) -> str | None:
+        """Pane text before typing, the baseline for _wait_for_pane()."""
+        if not config.send_keys_adaptive:
+            return None
+        return await self._capture_text(window_id)
+
+    async def _wait_for_pane(
+        self,
+        window_id: str,
+        baseline: str | None,
+        count: Callable[[str], int],
+        timeout: float,
+    ) -> str | None:
+        """Wait until count(screen) exceeds count(baseline), at most timeout.
+
+        Polls the pane every READY_POLL_INTERVAL; unchanged captures are
+        not re-scanned.  Counting occurrences (rather than testing for
+        one) keeps an identical earlier message on screen from passing
+        for the echo.  Without a baseline (adaptive mode off, or the
+        capture failed) this is a plain sleep of timeout.  Returns the last
+        screen seen, the baseline for a following wait.
+        """
+        if baseline is None:
+            await asyncio.sleep(timeout)
+            return None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        before = count(baseline)
+        last = baseline
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return last
+            await asyncio.sleep(min(READY_POLL_INTERVAL, remaining))
+            screen = await self._capture_text(window_id)
+            if screen is None or screen == last:
+                continue
+            last = screen
+            if count(screen) > before:
+                return screen
+
     async def kill_window(self, window_id: str) -> bool:
         """Kill a tmux window by its ID."""
 
@@ -332,55 +549,96 @@ class TmuxManager:
     async def get_pane_pid(self, window_id: str) -> int | None:
         """Get the PID of the foreground process running in a window's pane.
 
-        Uses ``tmux display-message`` to read ``pane_pid`` (the shell PID),
-        then finds the deepest child — typically the ``claude`` process.
-        Returns *None* if the window doesn't exist or PID can't be determined.
+        Reads ``pane_pid`` (the shell PID) from tmux, then finds the deepest
+        child — typically the ``claude`` process.  On Linux the tree walk
+        reads /proc (procfs) and the shell PID is kept while it lives, so a
+        cache miss costs microseconds instead of forks; the result is
+        reused for PANE_PID_CACHE_TTL.  Elsewhere it runs ``pgrep -P`` per
+        tree level.  Returns *None* if the window doesn't exist or PID
+        can't be determined.
         """
+        now = time.monotonic()
+        cached = self._pane_pids.get(window_id)
+        if cached and cached[1] > now and procfs.is_alive(cached[0]):
+            return cached[0]
 
-        def _sync_get_pid() -> int | None:
-            import subprocess
+        shell_pid = await self.get_shell_pid(window_id)
+        if shell_pid is None:
+            return None
 
-            try:
-                # Get pane_pid (the shell process) via tmux
-                result = subprocess.run(
-                    [
-                        "tmux",
-                        "display-message",
-                        "-t",
-                        window_id,
-                        "-p",
-                        "#{pane_pid}",
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=5,
-                )
-                if result.returncode != 0 or not result.stdout.strip():
-                    return None
+        if procfs.available():
+            pid = procfs.deepest_child(shell_pid)
+        else:
+            pid = await asyncio.to_thread(self._deepest_child_pgrep, shell_pid)
+            if pid is None:
+                return None
+        self._pane_pids[window_id] = (pid, now + PANE_PID_CACHE_TTL)
+        return pid
 
-                shell_pid = int(result.stdout.strip())
+    async def get_shell_pid(self, window_id: str) -> int | None:
+        """PID of the shell tmux started in a window's pane (``pane_pid``).
 
-                # Walk child processes to find the deepest one (claude)
-                pid = shell_pid
-                while True:
-                    children = subprocess.run(
-                        ["pgrep", "-P", str(pid)],
-                        capture_output=True,
-                        text=True,
-                        timeout=5,
-                    )
-                    child_pids = children.stdout.strip().split()
-                    if not child_pids:
-                        break
-                    # Take the first child (the main process, not background jobs)
-                    pid = int(child_pids[0])
+        With /proc the PID is kept while the process lives, so tmux is
+        asked once per pane.  The shell's subtree holds claude and every
+        tool process it runs.
+        """
+        shell_pid = self._shell_pids.get(window_id)
+        if shell_pid and procfs.available() and procfs.is_alive(shell_pid):
+            return shell_pid
+        shell_pid = await asyncio.to_thread(self._read_shell_pid, window_id)
+        if shell_pid is None:
+            self._shell_pids.pop(window_id, None)
+        else:
+            self._shell_pids[window_id] = shell_pid
+        return shell_pid
+
+    @staticmethod
+    def _read_shell_pid(window_id: str) -> int | None:
+        """pane_pid of a window's active pane via `tmux display-message`."""
+        import subprocess
 
-                return pid
-            except Exception as e:
-                logger.error("Failed to get pane PID for %s: %s", window_id, e)
+        try:
+            result = subprocess.run(
+                [
+                    "tmux",
+                    "display-message",
+                    "-t",
+                    window_id,
+                    "-p",
+                    "#{pane_pid}",
+                ],
+                capture_output=True,
+                text=True,
+                timeout=5,
+            )
+            if result.returncode != 0 or not result.stdout.strip():
                 return None
+            return int(result.stdout.strip())
+        except Exception as e:
+            logger.error("Failed to get pane PID for %s: %s", window_id, e)
+            return None
 
-        return await asyncio.to_thread(_sync_get_pid)
+    @staticmethod
+    def _deepest_child_pgrep(pid: int) -> int | None:
+        """procfs.deepest_child() for systems without /proc."""
+        import subprocess
+
+        try:
+            while True:
+                children = subprocess.run(
+                    ["pgrep", "-P", str(pid)],
+                    capture_output=True,
+                    text=True,
+                    timeout=5,
+                )
+                child_pids = children.stdout.strip().split()
+                if not child_pids:
+                    return pid
+                # Take the first child (the main process, not background jobs)
+                pid = int(child_pids[0])
+        except Exception as e:
+            logger.error("Failed to walk child processes of %s: %s", pid, e)
+            return None
 
     async def create_window(
         self,
@@ -453,5 +711,27 @@ class TmuxManager:
         return await asyncio.to_thread(_create_and_start)
 
 
+def _count_bash_prompts(screen: str) -> int:
+    return len(_BASH_PROMPT_RE.findall(screen))
+
+
+def _echo_counter(text: str) -> Callable[[str], int]:
+    """Count occurrences of text's tail on a screen, ignoring whitespace.
+
+    Whitespace is dropped on both sides so soft wraps and indentation
+    don't matter.  A long paste that the TUI collapses into a
+    "[Pasted text …]" placeholder counts that placeholder instead.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    needle = "".join(lines[-1].split())[-_ECHO_NEEDLE_CHARS:] if lines else ""
+
+    def count(screen: str) -> int:
+        flat = "".join(screen.split())
+        pasted = flat.count("[Pastedtext")
+        return (flat.count(needle) if needle else 0) + pasted
+
+    return count
+
+
 # Global instance with default session name
 tmux_manager = TmuxManager()
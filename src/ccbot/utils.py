@@ -2,18 +2,26 @@
 
 Provides:
   - ccbot_dir(): resolve config directory from CCBOT_DIR env var.
+  - HOOK_SOCKET_NAME: Unix socket (in ccbot_dir) the bot serves for hook events.
   - atomic_write_json(): crash-safe JSON file writes via temp+rename.
   - read_cwd_from_jsonl(): extract the cwd field from the first JSONL entry.
+  - ExpiringDict: size-capped mapping whose entries expire after a TTL.
 """
 
 import json
 import os
 import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 CCBOT_DIR_ENV = "CCBOT_DIR"
 
+# Unix socket in ccbot_dir() on which the bot receives `ccbot hook` events
+HOOK_SOCKET_NAME = "hook.sock"
+
 
 def ccbot_dir() -> Path:
     """Resolve config directory from CCBOT_DIR env var or default ~/.ccbot."""
@@ -70,3 +78,67 @@ def read_cwd_from_jsonl(file_path: str | Path) -> str:
     except OSError:
         pass
     return ""
+
+
+class ExpiringDict[K, V]:
+    """Mapping with a size cap and a per-entry time-to-live.
+
+    Entries are kept in insertion order; setting a key refreshes it.  The
+    oldest entries are evicted once max_size is exceeded, and entries older
+    than ttl seconds are dropped on the next write (or on read of that key),
+    so memory stays flat however many entries are never consumed.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def __setitem__(self, key: K, value: V) -> None:
+        now = time.monotonic()
+        self._data[key] = (value, now)
+        self._data.move_to_end(key)
+        self._evict(now)
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, stamp = item
+        if time.monotonic() - stamp > self.ttl:
+            del self._data[key]
+            return default
+        return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        value, stamp = item
+        if time.monotonic() - stamp > self.ttl:
+            return default
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        item = self._data.get(key)  # type: ignore[call-overload]
+        return item is not None and time.monotonic() - item[1] <= self.ttl
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def items(self) -> list[tuple[K, V]]:
+        """Live (unexpired) entries, oldest first."""
+        self._evict(time.monotonic())
+        return [(key, value) for key, (value, _stamp) in self._data.items()]
+
+    def _evict(self, now: float) -> None:
+        data = self._data
+        while data:
+            key, (_value, stamp) = next(iter(data.items()))
+            if len(data) > self.max_size or now - stamp > self.ttl:
+                del data[key]
+            else:
+                break
@@ -0,0 +1,494 @@
+"""Tests for message_queue content merging and the linger window."""
+
+import asyncio
+
+import pytest
+
+from ccbot.handlers.message_queue import (
+    MessageTask,
+    _can_merge_tasks,
+    _linger_and_merge,
+)
+
+
+def _content(text: str, content_type: str = "text", window_id: str = "@1"):
+    return MessageTask(
+        task_type="content",
+        window_id=window_id,
+        parts=[text],
+        content_type=content_type,
+    )
+
+
+class TestCanMergeTasks:
+    @pytest.mark.parametrize(
+        "base_type, candidate_type, expected",
+        [
+            ("text", "text", True),
+            ("text", "thinking", True),
+            ("tool_use", "text", False),
+            ("text", "tool_use", False),
+            ("text", "tool_result", False),
+        ],
+    )
+    def test_content_types(self, base_type, candidate_type, expected):
+        base = _content("a", base_type)
+        candidate = _content("b", candidate_type)
+        assert _can_merge_tasks(base, candidate) is expected
+
+    def test_different_window_not_merged(self):
+        assert not _can_merge_tasks(_content("a"), _content("b", window_id="@2"))
+
+
+class TestLingerAndMerge:
+    async def test_merges_content_arriving_within_window(self):
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        lock = asyncio.Lock()
+
+        async def producer():
+            for text in ("b", "c"):
+                await asyncio.sleep(0.02)
+                queue.put_nowait(_content(text))
+
+        producer_task = asyncio.create_task(producer())
+        merged, count = await _linger_and_merge(queue, _content("a"), lock, 0.2)
+        await producer_task
+        assert count == 2
+        assert merged.parts == ["a", "b", "c"]
+
+    async def test_no_linger_when_disabled(self):
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        merged, count = await _linger_and_merge(
+            queue, _content("a"), asyncio.Lock(), 0.0
+        )
+        assert count == 0
+        assert merged.parts == ["a"]
+        assert loop.time() - start < 0.05
+
+    async def test_no_linger_for_tool_use(self):
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await _linger_and_merge(queue, _content("a", "tool_use"), asyncio.Lock(), 1.0)
+        assert loop.time() - start < 0.05
+
+    async def test_stops_early_on_non_mergeable_task(self):
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        async def producer():
+            await asyncio.sleep(0.02)
+            queue.put_nowait(_content("tool", "tool_use"))
+
+        producer_task = asyncio.create_task(producer())
+        start = loop.time()
+        merged, count = await _linger_and_merge(
+            queue, _content("a"), asyncio.Lock(), 1.0
+        )
+        await producer_task
+        assert count == 0
+        assert merged.parts == ["a"]
+        assert queue.qsize() == 1
+        assert loop.time() - start < 0.5
+
+    async def test_backlog_skips_linger(self):
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        queue.put_nowait(_content("b"))
+        queue.put_nowait(_content("tool", "tool_use"))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        merged, count = await _linger_and_merge(
+            queue, _content("a"), asyncio.Lock(), 1.0
+        )
+        assert count == 1
+        assert merged.parts == ["a", "b"]
+        assert loop.time() - start < 0.05
+
+
+class TestDocumentTasks:
+    def test_document_task_not_merged(self):
+        with_doc = _content("preview")
+        with_doc.document = ("text.md", "full body")
+        assert not _can_merge_tasks(_content("a"), with_doc)
+        assert not _can_merge_tasks(with_doc, _content("b"))
+
+    async def test_document_uploaded_after_parts(self, monkeypatch):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers import message_queue
+
+        calls: list[str] = []
+
+        async def fake_send_message(bot, chat_id, text, **kwargs):
+            calls.append(f"message:{text}")
+
+        async def fake_send_document(bot, chat_id, filename, body, **kwargs):
+            calls.append(f"document:{filename}:{body}")
+
+        monkeypatch.setattr(message_queue, "rate_limit_send_message", fake_send_message)
+        monkeypatch.setattr(
+            message_queue, "rate_limit_send_document", fake_send_document
+        )
+        monkeypatch.setattr(
+            message_queue, "_check_and_send_status", AsyncMock(return_value=None)
+        )
+        task = _content("preview")
+        task.document = ("text.md", "full body")
+        await message_queue._process_content_task(AsyncMock(), 1, task)
+        assert calls == ["message:preview", "document:text.md:full body"]
+
+
+class TestLiveAppend:
+    @pytest.fixture
+    def sends(self, monkeypatch):
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        from ccbot.config import config
+        from ccbot.handlers import message_queue
+
+        sent: list[str] = []
+
+        async def fake_send_message(bot, chat_id, text, **kwargs):
+            sent.append(text)
+            return SimpleNamespace(message_id=100 + len(sent))
+
+        async def no_wait(chat_id):
+            return None
+
+        async def capture_pane(window_id):
+            return self.pane_text
+
+        # The pane shows no status line unless a test sets one
+        self.pane_text = ""
+        monkeypatch.setattr(config, "live_append", True)
+        monkeypatch.setattr(message_queue, "rate_limit_send_message", fake_send_message)
+        monkeypatch.setattr(message_queue, "rate_limit_send", no_wait)
+        monkeypatch.setattr(
+            message_queue.tmux_manager,
+            "find_window_by_id",
+            AsyncMock(return_value=SimpleNamespace(window_id="@1")),
+        )
+        monkeypatch.setattr(message_queue.tmux_manager, "capture_pane", capture_pane)
+        message_queue._live_msg_info.clear()
+        message_queue.clear_status_msg_info(1)
+        yield sent
+        message_queue._live_msg_info.clear()
+        message_queue.clear_status_msg_info(1)
+
+    async def test_content_appended_to_live_message(self, sends):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers.message_queue import _process_content_task
+
+        bot = AsyncMock()
+        await _process_content_task(bot, 1, _content("first"))
+        await _process_content_task(bot, 1, _content("second"))
+        assert sends == ["first"]
+        bot.edit_message_text.assert_awaited_once()
+        assert bot.edit_message_text.await_args.kwargs["text"] == "first\n\nsecond"
+        assert bot.edit_message_text.await_args.kwargs["message_id"] == 101
+
+    async def test_appended_content_replaces_status(self, sends):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers import message_queue
+        from ccbot.handlers.message_queue import _process_content_task
+
+        self.pane_text = "✻ Working… (3s · esc to interrupt)\n"
+        bot = AsyncMock()
+        await _process_content_task(bot, 1, _content("first"))
+        await _process_content_task(bot, 1, _content("second"))
+        # first, its status (102), then a fresh status (103) below the
+        # live message once the old one is deleted
+        assert sends[0] == "first"
+        assert len(sends) == 3
+        bot.delete_message.assert_awaited_once()
+        assert bot.delete_message.await_args.kwargs["message_id"] == 102
+        assert message_queue._status_msg_info[(1, 0)][0] == 103
+
+    async def test_tool_use_rolls_over(self, sends):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers.message_queue import _process_content_task
+
+        bot = AsyncMock()
+        await _process_content_task(bot, 1, _content("before"))
+        await _process_content_task(bot, 1, _content("**Read**(a.py)", "tool_use"))
+        await _process_content_task(bot, 1, _content("after"))
+        assert sends == ["before", "**Read**(a.py)", "after"]
+        bot.edit_message_text.assert_not_awaited()
+
+    async def test_rolls_over_near_limit(self, sends):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers.message_queue import (
+            LIVE_APPEND_MAX_LENGTH,
+            _process_content_task,
+        )
+
+        bot = AsyncMock()
+        big = "x" * (LIVE_APPEND_MAX_LENGTH - 10)
+        await _process_content_task(bot, 1, _content(big))
+        await _process_content_task(bot, 1, _content("does not fit"))
+        await _process_content_task(bot, 1, _content("fits"))
+        assert sends == [big, "does not fit"]
+        assert bot.edit_message_text.await_args.kwargs["text"] == (
+            "does not fit\n\nfits"
+        )
+
+    async def test_end_live_message_starts_new_turn(self, sends):
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers.message_queue import (
+            _process_content_task,
+            end_live_message,
+        )
+
+        bot = AsyncMock()
+        await _process_content_task(bot, 1, _content("turn one"))
+        end_live_message(1)
+        await _process_content_task(bot, 1, _content("turn two"))
+        assert sends == ["turn one", "turn two"]
+
+    async def test_disabled_sends_each_message(self, sends, monkeypatch):
+        from unittest.mock import AsyncMock
+
+        from ccbot.config import config
+        from ccbot.handlers.message_queue import _process_content_task
+
+        monkeypatch.setattr(config, "live_append", False)
+        bot = AsyncMock()
+        await _process_content_task(bot, 1, _content("one"))
+        await _process_content_task(bot, 1, _content("two"))
+        assert sends == ["one", "two"]
+
+
+class TestToolMsgIds:
+    async def test_tool_use_ids_indexed_by_topic(self, monkeypatch):
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers import message_queue
+
+        async def fake_send_message(bot, chat_id, text, **kwargs):
+            return SimpleNamespace(message_id=42)
+
+        monkeypatch.setattr(message_queue, "rate_limit_send_message", fake_send_message)
+        monkeypatch.setattr(
+            message_queue, "_check_and_send_status", AsyncMock(return_value=None)
+        )
+        task = _content("**Bash**(ls)", "tool_use")
+        task.tool_use_id = "toolu_1"
+        task.thread_id = 7
+        await message_queue._process_content_task(AsyncMock(), 1, task)
+        assert message_queue._tool_msg_ids[(1, 7)].get("toolu_1") == 42
+
+        message_queue.clear_tool_msg_ids_for_topic(1, 7)
+        assert (1, 7) not in message_queue._tool_msg_ids
+
+    def test_per_topic_map_is_capped(self):
+        from ccbot.handlers.message_queue import TOOL_MSG_IDS_MAX_PER_TOPIC
+        from ccbot.utils import ExpiringDict
+
+        ids: ExpiringDict[str, int] = ExpiringDict(TOOL_MSG_IDS_MAX_PER_TOPIC, 60)
+        for i in range(TOOL_MSG_IDS_MAX_PER_TOPIC * 4):
+            ids[f"toolu_{i}"] = i
+        assert len(ids) == TOOL_MSG_IDS_MAX_PER_TOPIC
+
+
+def _tool(
+    text: str,
+    content_type: str = "tool_use",
+    tool_use_id: str | None = None,
+    thread_id: int | None = None,
+):
+    return MessageTask(
+        task_type="content",
+        window_id="@1",
+        parts=[text],
+        text=text,
+        content_type=content_type,
+        tool_use_id=tool_use_id,
+        thread_id=thread_id,
+    )
+
+
+class TestToolDigest:
+    def test_digest_counts_calls_per_tool(self):
+        from ccbot.handlers.message_queue import _build_tool_digest
+
+        tasks = [
+            _tool("**Read**(a.py)", tool_use_id="1"),
+            _tool("**Read**(a.py)\n  ⎿  Read 5 lines", "tool_result", "1"),
+            _tool("**Edit**(b.py)", tool_use_id="2"),
+            _tool("**Read**(c.py)", tool_use_id="3"),
+        ]
+        assert _build_tool_digest(tasks) == "🧰 3 tool calls: Read×2, Edit×1"
+
+    def test_digest_highlights_errors(self):
+        from ccbot.handlers.message_queue import _build_tool_digest
+
+        tasks = [
+            _tool("**Bash**(npm test)", tool_use_id="1"),
+            _tool("**Bash**(npm test)\n  ⎿  Error: exit 1", "tool_result", "1"),
+        ]
+        digest = _build_tool_digest(tasks)
+        assert digest.startswith("🧰 1 tool call: Bash×1")
+        assert "⚠️ **Bash**(npm test) — Error: exit 1" in digest
+
+    async def test_collapse_stops_at_text(self):
+        from ccbot.handlers.message_queue import _collapse_tool_backlog
+
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        status = MessageTask(task_type="status_update", text="working", window_id="@1")
+        for task in [
+            _tool("**Read**(b.py)", tool_use_id="2"),
+            status,
+            _tool("**Grep**(x)", tool_use_id="3"),
+            _content("prose"),
+            _tool("**Bash**(ls)", tool_use_id="4"),
+        ]:
+            queue.put_nowait(task)
+        first = _tool("**Read**(a.py)", tool_use_id="1")
+        digest, collapsed = await _collapse_tool_backlog(queue, first, asyncio.Lock())
+        assert collapsed == 2
+        assert digest.content_type == "tool_digest"
+        assert digest.text == "🧰 3 tool calls: Read×2, Grep×1"
+        remaining = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert remaining[0] is status
+        assert [t.parts[0] for t in remaining[1:]] == ["prose", "**Bash**(ls)"]
+
+    async def test_other_topic_ends_run(self):
+        from ccbot.handlers.message_queue import _collapse_tool_backlog
+
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        queue.put_nowait(_tool("**Read**(b.py)", thread_id=9))
+        queue.put_nowait(_tool("**Read**(c.py)"))
+        first = _tool("**Read**(a.py)")
+        task, collapsed = await _collapse_tool_backlog(queue, first, asyncio.Lock())
+        assert task is first
+        assert collapsed == 0
+        assert queue.qsize() == 2
+
+    def test_lane_behind_thresholds(self, monkeypatch):
+        from ccbot.config import config
+        from ccbot.handlers.message_queue import _lane_behind
+
+        monkeypatch.setattr(config, "tool_digest_backlog", 3)
+        monkeypatch.setattr(config, "tool_digest_latency", 15.0)
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        task = _tool("**Read**(a.py)")
+        assert not _lane_behind(queue, task)
+        for _ in range(3):
+            queue.put_nowait(_tool("**Read**(b.py)"))
+        assert _lane_behind(queue, task)
+
+        empty: asyncio.Queue[MessageTask] = asyncio.Queue()
+        task.enqueued_at -= 20
+        assert _lane_behind(empty, task)
+        monkeypatch.setattr(config, "tool_digest_latency", 0.0)
+        assert not _lane_behind(empty, task)
+
+
+def _status(text: str, window_id: str = "@1") -> MessageTask:
+    return MessageTask(task_type="status_update", text=text, window_id=window_id)
+
+
+class TestStatusThrottle:
+    @pytest.fixture
+    def bot(self, monkeypatch):
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock
+
+        from ccbot.handlers import message_queue
+
+        sent: list[str] = []
+
+        async def fake_send_message(bot, chat_id, text, **kwargs):
+            sent.append(text)
+            return SimpleNamespace(message_id=100 + len(sent))
+
+        monkeypatch.setattr(message_queue, "rate_limit_send_message", fake_send_message)
+        fake = SimpleNamespace(
+            sent=sent,
+            send_chat_action=AsyncMock(),
+            edit_message_text=AsyncMock(),
+            delete_message=AsyncMock(),
+        )
+        message_queue.clear_status_msg_info(1)
+        yield fake
+        message_queue.clear_status_msg_info(1)
+        message_queue._message_queues.pop(1, None)
+
+    @staticmethod
+    def _age(mapping, seconds: float) -> None:
+        """Pretend the last send recorded in mapping happened seconds earlier."""
+        for key in mapping:
+            mapping[key] -= seconds
+
+    async def test_typing_action_throttled(self, bot):
+        from ccbot.handlers import message_queue
+        from ccbot.handlers.message_queue import _process_status_update_task
+
+        for i in range(3):
+            await _process_status_update_task(
+                bot, 1, _status(f"Working… ({i}s · esc to interrupt)")
+            )
+        assert bot.send_chat_action.await_count == 1
+
+        self._age(message_queue._typing_sent_at, message_queue.TYPING_ACTION_INTERVAL)
+        await _process_status_update_task(
+            bot, 1, _status("Working… (9s · esc to interrupt)")
+        )
+        assert bot.send_chat_action.await_count == 2
+
+    async def test_edits_throttled_latest_wins(self, bot):
+        from ccbot.handlers import message_queue
+        from ccbot.handlers.message_queue import _process_status_update_task
+
+        queue: asyncio.Queue[MessageTask] = asyncio.Queue()
+        message_queue._message_queues[1] = queue
+
+        await _process_status_update_task(bot, 1, _status("frame 1"))
+        assert bot.sent == ["frame 1"]
+        for i in range(2, 6):
+            await _process_status_update_task(bot, 1, _status(f"frame {i}"))
+        bot.edit_message_text.assert_not_awaited()
+        assert message_queue._status_pending[(1, 0)][0].text == "frame 5"
+
+        # Interval passes: only the latest frame is re-queued and edited in
+        self._age(message_queue._status_sent_at, message_queue.STATUS_EDIT_INTERVAL)
+        message_queue._requeue_pending_status(1, (1, 0))
+        assert queue.qsize() == 1
+        await _process_status_update_task(bot, 1, queue.get_nowait())
+        assert bot.edit_message_text.await_count == 1
+        assert "frame 5" in bot.edit_message_text.await_args.kwargs["text"]
+        assert not message_queue._status_pending
+
+    async def test_stale_frame_dropped(self, bot):
+        from ccbot.handlers.message_queue import _process_status_update_task
+
+        older = _status("older")
+        newer = _status("newer")
+        await _process_status_update_task(bot, 1, newer)
+        await _process_status_update_task(bot, 1, older)
+        assert bot.sent == ["newer"]
+        bot.edit_message_text.assert_not_awaited()
+
+    async def test_clear_cancels_pending(self, bot):
+        from ccbot.handlers import message_queue
+        from ccbot.handlers.message_queue import (
+            _do_clear_status_message,
+            _process_status_update_task,
+        )
+
+        await _process_status_update_task(bot, 1, _status("frame 1"))
+        await _process_status_update_task(bot, 1, _status("frame 2"))
+        handle = message_queue._status_pending[(1, 0)][1]
+        await _do_clear_status_message(bot, 1, 0)
+        assert handle.cancelled()
+        assert not message_queue._status_pending
+        bot.delete_message.assert_awaited_once()
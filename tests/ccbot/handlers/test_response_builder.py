@@ -58,3 +58,147 @@ class TestBuildResponseParts:
         assert len(parts) == 1
         assert "\U0001f464" not in parts[0]
         assert "Thinking" not in parts[0]
+
+
+class TestRenderCache:
+    def test_repeated_calls_hit_cache(self):
+        from ccbot.handlers.response_builder import _render_parts
+
+        text = "cache me " + "x" * 50
+        build_response_parts(text, is_complete=True)
+        hits = _render_parts.cache_info().hits
+        build_response_parts(text, is_complete=True)
+        assert _render_parts.cache_info().hits == hits + 1
+
+    def test_returns_independent_lists(self):
+        first = build_response_parts("independent", is_complete=True)
+        first.append("mutated")
+        second = build_response_parts("independent", is_complete=True)
+        assert "mutated" not in second
+
+    def test_key_includes_role_and_content_type(self):
+        as_text = build_response_parts("same", is_complete=True)
+        as_user = build_response_parts("same", is_complete=True, role="user")
+        as_thinking = build_response_parts(
+            "same", is_complete=True, content_type="thinking"
+        )
+        assert len({as_text[0], as_user[0], as_thinking[0]}) == 3
+
+
+class TestOffloadedRender:
+    async def test_small_text_renders_inline(self, monkeypatch):
+        from ccbot.config import config
+        from ccbot.handlers.response_builder import (
+            build_response_parts_async,
+            render_stats,
+        )
+
+        monkeypatch.setattr(config, "render_offload_threshold", 1000)
+        before = render_stats()
+        parts = await build_response_parts_async("short inline", is_complete=True)
+        after = render_stats()
+        assert parts == build_response_parts("short inline", is_complete=True)
+        assert after["inline"]["count"] == before["inline"]["count"] + 1
+        assert after["offloaded"]["count"] == before["offloaded"]["count"]
+
+    async def test_large_text_renders_off_loop(self, monkeypatch):
+        import threading
+
+        from ccbot.config import config
+        from ccbot.handlers import response_builder
+
+        threads: list[str] = []
+        original = response_builder.build_response_parts
+
+        def spy(*args):
+            threads.append(threading.current_thread().name)
+            return original(*args)
+
+        monkeypatch.setattr(config, "render_offload_threshold", 100)
+        monkeypatch.setattr(response_builder, "build_response_parts", spy)
+        text = "offloaded paragraph\n\n" * 20
+        before = response_builder.render_stats()
+        parts = await response_builder.build_response_parts_async(
+            text, is_complete=True
+        )
+        after = response_builder.render_stats()
+        assert parts == original(text, True)
+        assert threads and threads[0].startswith("ccbot-render")
+        assert after["offloaded"]["count"] == before["offloaded"]["count"] + 1
+        response_builder.shutdown_render_executor()
+
+    async def test_large_conversion_renders_off_loop(self, monkeypatch):
+        import threading
+
+        from ccbot.config import config
+        from ccbot.handlers import response_builder
+        from ccbot.markdown_v2 import convert_markdown
+
+        threads: list[str] = []
+        original = response_builder.convert_markdown
+
+        def spy(text):
+            threads.append(threading.current_thread().name)
+            return original(text)
+
+        monkeypatch.setattr(config, "render_offload_threshold", 100)
+        monkeypatch.setattr(response_builder, "convert_markdown", spy)
+        assert await response_builder.convert_markdown_async("*short*") == (
+            convert_markdown("*short*")
+        )
+        text = "history page line\n" * 20
+        assert await response_builder.convert_markdown_async(text) == (
+            convert_markdown(text)
+        )
+        assert threads[0] == threading.current_thread().name
+        assert threads[1].startswith("ccbot-render")
+        response_builder.shutdown_render_executor()
+
+
+class TestPartSizing:
+    def test_escape_dense_text_fits_limit(self):
+        text = "\n".join("a.b(c)[d]{e}!" * 5 for _ in range(500))
+        parts = build_response_parts(text, is_complete=True)
+        assert len(parts) > 1
+        assert all(len(part) <= 4096 for part in parts)
+
+    def test_expanding_tables_fit_limit(self):
+        rows = ["| a.b | c-d | e_f |" if i % 3 else "|---|---|---|" for i in range(900)]
+        parts = build_response_parts("\n".join(rows), is_complete=True)
+        assert all(len(part) <= 4096 for part in parts)
+
+    def test_code_block_split_keeps_fences_balanced(self):
+        text = "```py\n" + "x = (1)\n" * 2000 + "```"
+        parts = build_response_parts(text, is_complete=True)
+        assert len(parts) > 1
+        for part in parts:
+            assert part.count("```") == 2
+
+
+class TestDocumentResponse:
+    def test_text_becomes_markdown_document(self):
+        from ccbot.handlers.response_builder import build_document_response
+
+        text = "\n".join(f"paragraph {i} " + "y" * 80 for i in range(200))
+        parts, (filename, body) = build_document_response(text, "text")
+        assert filename == "text.md"
+        assert body == text + "\n"
+        assert len(parts) == 1
+        assert len(parts[0]) < 1500
+        assert "text\\.md" in parts[0]
+
+    def test_tool_output_becomes_text_document_without_sentinels(self):
+        from ccbot.handlers.response_builder import build_document_response
+
+        text = f"  ⎿  Output 3 lines\n{EXP_START}a\nb\nc{EXP_END}"
+        parts, (filename, body) = build_document_response(text, "tool_result")
+        assert filename == "tool_result.txt"
+        assert EXP_START not in body and EXP_END not in body
+        assert EXP_START not in parts[0]
+
+    def test_preview_keeps_fences_balanced(self):
+        from ccbot.handlers.response_builder import build_document_response
+
+        text = "```\n" + "code line\n" * 500 + "```"
+        parts, _document = build_document_response(text, "text")
+        assert parts[0].count("```") == 2
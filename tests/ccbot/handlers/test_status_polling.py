@@ -0,0 +1,70 @@
+"""Tests for the status poller's /proc activity probe."""
+
+import pytest
+
+from ccbot import procfs
+from ccbot.handlers import status_polling
+from ccbot.handlers.status_polling import (
+    IDLE_RECAPTURE_INTERVAL,
+    _needs_capture,
+    probe_activity,
+)
+
+
+@pytest.fixture
+def samples(monkeypatch: pytest.MonkeyPatch) -> list:
+    """Queue of (ticks, process count) samples; the clock steps 1s a probe."""
+    queue: list = []
+    clock = iter(range(100))
+
+    async def get_shell_pid(window_id: str) -> int:
+        return 42
+
+    monkeypatch.setattr(status_polling, "_activity", {})
+    monkeypatch.setattr(procfs, "available", lambda: True)
+    monkeypatch.setattr(procfs, "CLK_TCK", 100)
+    monkeypatch.setattr(procfs, "tree_cpu_ticks", lambda pid: queue.pop(0))
+    monkeypatch.setattr(status_polling.tmux_manager, "get_shell_pid", get_shell_pid)
+    monkeypatch.setattr(status_polling.time, "monotonic", lambda: next(clock))
+    return queue
+
+
+class TestProbeActivity:
+    async def test_classifies_cpu_share(self, samples) -> None:
+        samples.extend([(1000, 3), (1050, 3), (1051, 3), (1051, 3), (1051, 4)])
+        assert await probe_activity("@1") == "unknown"  # First sample
+        assert await probe_activity("@1") == "busy"  # 50% of a CPU
+        assert await probe_activity("@1") == "idle"  # 1%
+        assert await probe_activity("@1") == "idle"
+        assert await probe_activity("@1") == "busy"  # A tool started
+
+    async def test_in_between_share_is_unknown(self, samples) -> None:
+        samples.extend([(0, 1), (5, 1)])
+        await probe_activity("@1")
+        assert await probe_activity("@1") == "unknown"
+
+    async def test_gone_process_is_unknown(self, samples) -> None:
+        samples.extend([(0, 1), None])
+        await probe_activity("@1")
+        assert await probe_activity("@1") == "unknown"
+        assert "@1" not in status_polling._activity
+
+
+class TestNeedsCapture:
+    async def test_idle_pane_captured_once_then_throttled(self, samples) -> None:
+        samples.extend([(0, 1), (0, 1)])
+        await probe_activity("@1")
+        assert await probe_activity("@1") == "idle"
+        assert _needs_capture("@1", "idle", 10.0)
+        status_polling._activity["@1"].idle_captured_at = 10.0
+        assert not _needs_capture("@1", "idle", 11.0)
+        assert _needs_capture("@1", "idle", 10.0 + IDLE_RECAPTURE_INTERVAL)
+        assert _needs_capture("@1", "busy", 11.0)
+
+    async def test_activity_resets_idle_capture(self, samples) -> None:
+        samples.extend([(0, 1), (0, 1), (80, 1)])
+        await probe_activity("@1")
+        await probe_activity("@1")
+        status_polling._activity["@1"].idle_captured_at = 1.0
+        assert await probe_activity("@1") == "busy"
+        assert status_polling._activity["@1"].idle_captured_at is None
@@ -0,0 +1,33 @@
+"""Tests for bot handlers' helpers."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from ccbot import bot, screenshot
+from ccbot.tmux_manager import TmuxWindow
+
+
+async def test_refresh_skips_upload_of_shown_frame(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(bot, "_screenshot_frames", {})
+    monkeypatch.setattr(screenshot, "_frame_cache", {})
+
+    async def fake_render(text, **kwargs) -> bytes:
+        return b"png"
+
+    edits = []
+
+    async def edit_message_media(**kwargs) -> None:
+        edits.append(kwargs)
+
+    monkeypatch.setattr(screenshot, "text_to_image", fake_render)
+    message = SimpleNamespace(chat=SimpleNamespace(id=-100), message_id=7)
+    query = SimpleNamespace(message=message, edit_message_media=edit_message_media)
+    w = TmuxWindow("@1", "proj", "/tmp", pane_width=80, pane_height=24)
+
+    assert await bot._edit_screenshot(query, w, "frame")
+    assert not await bot._edit_screenshot(query, w, "frame")
+    assert await bot._edit_screenshot(query, w, "changed")
+    assert len(edits) == 2
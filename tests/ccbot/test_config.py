@@ -54,3 +54,45 @@ class TestConfigMissingEnv:
         monkeypatch.setenv("ALLOWED_USERS", "abc")
         with pytest.raises(ValueError, match="non-numeric"):
             Config()
+
+    def test_invalid_state_backend(self, monkeypatch):
+        monkeypatch.setenv("STATE_BACKEND", "redis")
+        with pytest.raises(ValueError, match="STATE_BACKEND"):
+            Config()
+
+
+class TestNotifyDocumentThreshold:
+    def test_defaults_written_on_first_run(self, tmp_path):
+        import json
+
+        from ccbot.config import DOCUMENT_THRESHOLD_DEFAULTS, NotifyConfig
+
+        notify = NotifyConfig(tmp_path)
+        assert notify.document_threshold("text") == DOCUMENT_THRESHOLD_DEFAULTS["text"]
+        assert notify.document_threshold("tool_use") == 0
+        data = json.loads((tmp_path / "notify.json").read_text())
+        assert data["document_threshold"] == DOCUMENT_THRESHOLD_DEFAULTS
+
+    def test_per_type_override(self, tmp_path):
+        from ccbot.config import NotifyConfig
+
+        (tmp_path / "notify.json").write_text(
+            '{"text": true, "document_threshold": {"text": 0, "thinking": 5000}}'
+        )
+        notify = NotifyConfig(tmp_path)
+        assert notify.document_threshold("text") == 0
+        assert notify.document_threshold("thinking") == 5000
+        assert notify.should_notify("text") is True
+
+    def test_invalid_values_ignored(self, tmp_path):
+        from ccbot.config import DOCUMENT_THRESHOLD_DEFAULTS, NotifyConfig
+
+        (tmp_path / "notify.json").write_text(
+            '{"document_threshold": {"text": "big", "tool_result": true}}'
+        )
+        notify = NotifyConfig(tmp_path)
+        assert notify.document_threshold("text") == DOCUMENT_THRESHOLD_DEFAULTS["text"]
+        assert (
+            notify.document_threshold("tool_result")
+            == DOCUMENT_THRESHOLD_DEFAULTS["tool_result"]
+        )
@@ -2,14 +2,27 @@
 
 import io
 import json
+import os
+import subprocess
 import sys
+import time
 
 import pytest
 
-from ccbot.hook import _UUID_RE, _is_hook_installed, hook_main
+from ccbot import hook
+from ccbot.hook import _install_hook, _is_hook_installed, _is_uuid, hook_main
+from ccbot.utils import HOOK_SOCKET_NAME, ccbot_dir
 
+SESSION_ID = "550e8400-e29b-41d4-a716-446655440000"
 
-class TestUuidRegex:
+# Wall time of one `ccbot hook` process, interpreter start included
+HOOK_BUDGET = 0.1  # seconds
+HOOK_ENTRY = (
+    "import sys; sys.argv = ['ccbot', 'hook']; from ccbot.main import main; main()"
+)
+
+
+class TestIsUuid:
     @pytest.mark.parametrize(
         "value",
         [
@@ -20,7 +33,7 @@ class TestUuidRegex:
         ids=["standard", "all-zeros", "all-hex"],
     )
     def test_valid_uuid_matches(self, value: str) -> None:
-        assert _UUID_RE.match(value) is not None
+        assert _is_uuid(value)
 
     @pytest.mark.parametrize(
         "value",
@@ -28,12 +41,13 @@ class TestUuidRegex:
             "not-a-uuid",
             "550e8400-e29b-41d4-a716",
             "550e8400-e29b-41d4-a716-44665544000g",
+            "550e8400ae29b-41d4-a716-446655440000",
             "",
         ],
-        ids=["gibberish", "truncated", "invalid-hex-char", "empty"],
+        ids=["gibberish", "truncated", "invalid-hex-char", "no-dash", "empty"],
     )
     def test_invalid_uuid_no_match(self, value: str) -> None:
-        assert _UUID_RE.match(value) is None
+        assert not _is_uuid(value)
 
 
 class TestIsHookInstalled:
@@ -144,3 +158,234 @@ class TestHookMainValidation:
             },
         )
         assert not (tmp_path / "session_map.json").exists()
+
+
+class TestWakeEvents:
+    def test_wake_event_notifies_bot(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ) -> None:
+        sent: list[dict] = []
+        monkeypatch.setattr(hook, "_notify_bot", sent.append)
+        monkeypatch.setenv("CCBOT_DIR", str(tmp_path))
+        monkeypatch.setattr(sys, "argv", ["ccbot", "hook"])
+        payload = {
+            "session_id": "550e8400-e29b-41d4-a716-446655440000",
+            "cwd": "/tmp",
+            "hook_event_name": "PostToolUse",
+        }
+        monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(payload)))
+        hook_main()
+        assert sent == [
+            {
+                "event": "PostToolUse",
+                "session_id": "550e8400-e29b-41d4-a716-446655440000",
+            }
+        ]
+        assert not (tmp_path / "session_map.json").exists()
+
+    def test_install_wake_events(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ) -> None:
+        settings_file = tmp_path / "settings.json"
+        monkeypatch.setattr(hook, "_CLAUDE_SETTINGS_FILE", settings_file)
+        monkeypatch.setattr(hook, "_find_ccbot_path", lambda: "/usr/bin/ccbot")
+
+        assert _install_hook() == 0
+        settings = json.loads(settings_file.read_text())
+        assert list(settings["hooks"]) == ["SessionStart"]
+
+        assert _install_hook(wake_events=True) == 0
+        settings = json.loads(settings_file.read_text())
+        for event in ("SessionStart", "Stop", "PostToolUse", "Notification"):
+            assert _is_hook_installed(settings, event)
+        assert len(settings["hooks"]["SessionStart"]) == 1
+
+
+class TestFastPath:
+    def _start_session(self, monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+        monkeypatch.setenv("CCBOT_DIR", str(tmp_path))
+        monkeypatch.setenv("TMUX_PANE", "%7")
+        monkeypatch.setattr(hook, "_notify_bot", lambda event: None)
+        monkeypatch.setattr(sys, "argv", ["ccbot", "hook"])
+        payload = {
+            "session_id": SESSION_ID,
+            "cwd": "/tmp",
+            "hook_event_name": "SessionStart",
+        }
+        monkeypatch.setattr(sys, "stdin", io.StringIO(json.dumps(payload)))
+        hook_main()
+
+    @staticmethod
+    def _fake_tmux(
+        monkeypatch: pytest.MonkeyPatch, stdout: str, returncode: int = 0
+    ) -> list[list[str]]:
+        calls: list[list[str]] = []
+
+        def fake_run(cmd, **kwargs):
+            calls.append(cmd)
+            return subprocess.CompletedProcess(cmd, returncode, stdout=stdout)
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        return calls
+
+    def test_window_resolved_with_one_tmux_call(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ) -> None:
+        calls = self._fake_tmux(monkeypatch, "ccbot:@3:proj\n")
+        (tmp_path / "session_map.json").write_text(
+            json.dumps({"ccbot:proj": {"session_id": "old"}, "other:@1": {}})
+        )
+        self._start_session(monkeypatch, tmp_path)
+
+        session_map = hook.load_session_map(str(tmp_path / "session_map.json"))
+        assert session_map == {
+            "other:@1": {},
+            "ccbot:@3": {
+                "session_id": SESSION_ID,
+                "cwd": "/tmp",
+                "window_name": "proj",
+            },
+        }
+        assert calls == [
+            [
+                "tmux",
+                "display-message",
+                "-t",
+                "%7",
+                "-p",
+                "#{session_name}:#{window_id}:#{window_name}",
+            ]
+        ]
+
+    def test_tmux_failure_writes_nothing(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ) -> None:
+        self._fake_tmux(monkeypatch, "", returncode=1)
+        self._start_session(monkeypatch, tmp_path)
+        assert hook.load_session_map(str(tmp_path / "session_map.json")) == {}
+
+    def test_paths_match_utils(self, monkeypatch: pytest.MonkeyPatch, tmp_path):
+        monkeypatch.delenv("CCBOT_DIR", raising=False)
+        assert hook._ccbot_dir() == str(ccbot_dir())
+        monkeypatch.setenv("CCBOT_DIR", str(tmp_path))
+        assert hook._ccbot_dir() == str(ccbot_dir())
+        assert hook._HOOK_SOCKET_NAME == HOOK_SOCKET_NAME
+
+    def test_entry_imports_stay_minimal(self) -> None:
+        # -S: site-packages .pth files would import some of these themselves
+        code = (
+            "import sys; from ccbot.main import main; import ccbot.hook; "
+            "print([m for m in ('argparse', 'logging', 'pathlib', "
+            "'subprocess', 'socket') if m in sys.modules])"
+        )
+        src = os.path.dirname(os.path.dirname(hook.__file__))
+        out = subprocess.run(
+            [sys.executable, "-S", "-c", code],
+            capture_output=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": src},
+            text=True,
+        )
+        assert out.stdout.strip() == "[]"
+
+    def test_budget_with_large_session_map(self, tmp_path) -> None:
+        """A SessionStart hook process stays inside HOOK_BUDGET.
+
+        Times the whole `ccbot hook` subprocess (interpreter start, the tmux
+        lookup through a stub on PATH, the map write) with 5000 entries in
+        session_map.json.  -S as above.
+        """
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        tmux = bin_dir / "tmux"
+        tmux.write_text('#!/bin/sh\necho "ccbot:@3:proj"\n')
+        tmux.chmod(0o755)
+        payload = json.dumps(
+            {
+                "session_id": SESSION_ID,
+                "cwd": "/tmp",
+                "hook_event_name": "SessionStart",
+            }
+        )
+        src = os.path.dirname(os.path.dirname(hook.__file__))
+
+        env = {
+            **os.environ,
+            "CCBOT_DIR": str(tmp_path),
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "PYTHONPATH": src,
+            "TMUX_PANE": "%7",
+        }
+        big = {
+            f"ccbot:@{i}": {
+                "session_id": f"{i:08x}-0000-0000-0000-000000000000",
+                "cwd": f"/home/user/projects/project-{i}",
+                "window_name": f"project-{i}",
+            }
+            for i in range(5000)
+        }
+        (tmp_path / "session_map.json").write_text(json.dumps(big))
+
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-S", "-c", HOOK_ENTRY],
+                check=True,
+                env=env,
+                input=payload,
+                text=True,
+            )
+            best = min(best, time.perf_counter() - start)
+
+        assert best < HOOK_BUDGET
+        session_map = hook.load_session_map(str(tmp_path / "session_map.json"))
+        assert len(session_map) == 5000
+        assert session_map["ccbot:@3"]["session_id"] == SESSION_ID
+
+
+class TestSessionMapLog:
+    def test_append_and_compact(self, tmp_path) -> None:
+        map_file = tmp_path / "session_map.json"
+        log_file = tmp_path / "session_map.log"
+        map_file.write_text(json.dumps({"s:@1": {"session_id": "a"}}))
+        log_file.write_text(
+            '{"key":"s:@2","entry":{"session_id":"b"}}\n'
+            '{"key":"s:@1","entry":null}\n'
+            "not json\n"
+            '{"key":"s:@3","entry":{"session_id":"c"}}'  # Append in progress
+        )
+        expected = {"s:@2": {"session_id": "b"}}
+        assert hook.load_session_map(str(map_file)) == expected
+
+        log_file.write_text(log_file.read_text() + "\n")
+        expected["s:@3"] = {"session_id": "c"}
+        assert hook.compact_session_map(str(map_file)) == 0
+        assert json.loads(map_file.read_text()) == expected
+        assert log_file.read_bytes() == b""
+
+    def test_compact_drops_only_unchanged_stale(self, tmp_path) -> None:
+        map_file = tmp_path / "session_map.json"
+        map_file.write_text(
+            json.dumps({"s:@1": {"session_id": "a"}, "s:@2": {"session_id": "b"}})
+        )
+        # @2 was rewritten after the caller saw it dead
+        stale = {"s:@1": {"session_id": "a"}, "s:@2": {"session_id": "old"}}
+        assert hook.compact_session_map(str(map_file), stale) == 1
+        assert json.loads(map_file.read_text()) == {"s:@2": {"session_id": "b"}}
+
+    def test_hook_compacts_large_log(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path
+    ) -> None:
+        monkeypatch.setattr(hook, "COMPACT_LOG_BYTES", 200)
+        monkeypatch.setenv("CCBOT_DIR", str(tmp_path))
+        entry = {"session_id": SESSION_ID, "cwd": "/tmp", "window_name": "w"}
+        hook._update_session_map("s:@1", entry, "s:w")
+        assert not (tmp_path / "session_map.json").exists()
+        hook._update_session_map("s:@2", entry, "s:w")
+
+        assert (tmp_path / "session_map.log").read_bytes() == b""
+        assert json.loads((tmp_path / "session_map.json").read_text()) == {
+            "s:@1": entry,
+            "s:@2": entry,
+        }
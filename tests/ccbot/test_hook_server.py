@@ -0,0 +1,89 @@
+"""Tests for the hook → bot Unix-socket push channel."""
+
+import asyncio
+import os
+import stat
+
+import pytest
+
+from ccbot.hook import _notify_bot
+from ccbot.hook_server import start_hook_server, stop_hook_server
+from ccbot.utils import HOOK_SOCKET_NAME
+
+
+@pytest.fixture
+def sock_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("CCBOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+class TestHookServer:
+    async def test_event_delivered(self, sock_dir):
+        received: list[dict] = []
+        got = asyncio.Event()
+
+        async def handler(event):
+            received.append(event)
+            got.set()
+
+        path = sock_dir / HOOK_SOCKET_NAME
+        server = await start_hook_server(path, handler)
+        assert server is not None
+        try:
+            _notify_bot({"event": "SessionStart", "window_key": "ccbot:@3"})
+            await asyncio.wait_for(got.wait(), 2.0)
+        finally:
+            await stop_hook_server(server, path)
+        assert received == [{"event": "SessionStart", "window_key": "ccbot:@3"}]
+        assert not path.exists()
+
+    async def test_malformed_event_ignored(self, sock_dir):
+        received: list[dict] = []
+
+        async def handler(event):
+            received.append(event)
+
+        path = sock_dir / HOOK_SOCKET_NAME
+        server = await start_hook_server(path, handler)
+        assert server is not None
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(path))
+            writer.write(b"not json\n")
+            await writer.drain()
+            await reader.read()  # Server closes the connection
+            writer.close()
+        finally:
+            await stop_hook_server(server, path)
+        assert received == []
+
+    async def test_socket_is_private_from_bind(self, sock_dir, monkeypatch):
+        async def handler(event):
+            pass
+
+        bind_dirs: list[int] = []
+        real_start = asyncio.start_unix_server
+
+        async def recording_start(*args, path, **kwargs):
+            bind_dirs.append(stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode))
+            return await real_start(*args, path=path, **kwargs)
+
+        def no_umask(mask):
+            raise AssertionError("the process umask must not change")
+
+        monkeypatch.setattr(asyncio, "start_unix_server", recording_start)
+        monkeypatch.setattr(os, "umask", no_umask)
+        path = sock_dir / HOOK_SOCKET_NAME
+        server = await start_hook_server(path, handler)
+        assert server is not None
+        try:
+            assert bind_dirs == [0o700]
+            assert stat.S_IMODE(path.stat().st_mode) == 0o600
+            assert sorted(p.name for p in sock_dir.iterdir()) == [HOOK_SOCKET_NAME]
+        finally:
+            await stop_hook_server(server, path)
+
+    def test_notify_without_bot_is_silent(self, sock_dir):
+        _notify_bot({"event": "SessionStart"})
+        # Stale socket file with nobody listening
+        (sock_dir / HOOK_SOCKET_NAME).touch()
+        _notify_bot({"event": "SessionStart"})
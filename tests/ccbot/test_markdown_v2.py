@@ -1,8 +1,18 @@
 """Tests for Markdown → Telegram MarkdownV2 conversion."""
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from ccbot.markdown_v2 import _escape_mdv2, convert_markdown
+from ccbot import markdown_v2
+from ccbot.markdown_v2 import (
+    _escape_mdv2,
+    _markdownify,
+    _try_fast_convert,
+    convert_markdown,
+    markdown_cache_stats,
+)
 from ccbot.transcript_parser import TranscriptParser
 
 EXP_START = TranscriptParser.EXPANDABLE_QUOTE_START
@@ -56,3 +66,116 @@ class TestConvertMarkdown:
         assert ">inside quote||" in result
         assert "before" in result
         assert "after" in result
+
+
+class TestConversionCache:
+    def test_repeated_input_is_cache_hit(self) -> None:
+        text = "**Read**(cached_file.py)"
+        first = convert_markdown(text)
+        before = markdown_cache_stats()
+        assert convert_markdown(text) == first
+        after = markdown_cache_stats()
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"]
+
+    def test_large_input_bypasses_cache(self) -> None:
+        text = "word " * 2000
+        before = markdown_cache_stats()
+        convert_markdown(text)
+        after = markdown_cache_stats()
+        assert after["hits"] == before["hits"]
+        assert after["misses"] == before["misses"]
+
+    def test_hit_rate_in_range(self) -> None:
+        convert_markdown("hit rate probe")
+        convert_markdown("hit rate probe")
+        assert 0.0 < markdown_cache_stats()["hit_rate"] <= 1.0
+
+
+# Inputs the fast path must accept, rendered identically to the full renderer
+FAST_CORPUS = [
+    "hello world",
+    "Done. All 12 tests passed!",
+    "**Read**(src/ccbot/bot.py)",
+    "**Bash**(git status) -> ok",
+    "Use `convert_markdown()` for `snake_case` names",
+    "snake_case_name and CONSTANT_VALUE stay literal",
+    "first line\nsecond line (with parens)\n\nthird paragraph.",
+    "Price: $5 + tax = {total}; 50% off? #tag @user",
+    "中文 text — em dash, émoji 🚀 and 'quotes' \"here\"",
+    "**Edit** `a.py`: renamed `old` to `new`.",
+]
+
+# Inputs with structure the fast path must leave to the full renderer
+FULL_CORPUS = [
+    "# Heading",
+    "- list item",
+    "1. numbered",
+    "> quote",
+    "```\ncode block\n```",
+    "[link](https://example.com)",
+    "*emphasis*",
+    "__bold__",
+    "_italic_",
+    "~~strike~~",
+    "a | b | c",
+    "  indented",
+    "trailing ",
+    "back\\slash",
+    "`code``a b`",
+    "<tag> & entity",
+    "**bold *nested* text**",
+    "",
+]
+
+
+def _full_render(text: str, monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.setattr(markdown_v2, "_try_fast_convert", lambda _text: None)
+    return _markdownify(text)
+
+
+class TestFastPath:
+    @pytest.mark.parametrize("text", FAST_CORPUS)
+    def test_matches_full_renderer(
+        self, text: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        fast = _try_fast_convert(text)
+        assert fast is not None
+        assert fast == _full_render(text, monkeypatch)
+
+    @pytest.mark.parametrize("text", FULL_CORPUS)
+    def test_structured_text_takes_full_path(self, text: str) -> None:
+        assert _try_fast_convert(text) is None
+
+    def test_faster_than_full_renderer(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        rounds = 20
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in FAST_CORPUS:
+                _markdownify(text)
+        fast_elapsed = time.perf_counter() - start
+
+        monkeypatch.setattr(markdown_v2, "_try_fast_convert", lambda _text: None)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for text in FAST_CORPUS:
+                _markdownify(text)
+        full_elapsed = time.perf_counter() - start
+
+        assert fast_elapsed < full_elapsed
+
+
+class TestConcurrentRenders:
+    def test_threads_do_not_corrupt_each_other(self) -> None:
+        """mistletoe's global token registry is shared across threads."""
+        long_text = "# Title\n\n" + "- item with `code` and **bold**\n" * 100
+        texts = [long_text, "**Status** _working_ …\n\n> quote", "1. a\n2. b"]
+        expected = [_markdownify(text) for text in texts]
+
+        def render_many(index: int) -> list[str]:
+            return [_markdownify(texts[index]) for _ in range(30)]
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = {i: pool.submit(render_many, i % len(texts)) for i in range(6)}
+        for i, future in futures.items():
+            assert future.result() == [expected[i % len(texts)]] * 30
@@ -0,0 +1,64 @@
+"""Tests for /proc process-tree lookups."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ccbot import procfs
+
+pytestmark = pytest.mark.skipif(not procfs.available(), reason="needs Linux /proc")
+
+
+@pytest.fixture
+def child():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    yield proc.pid
+    proc.kill()
+    proc.wait()
+
+
+class TestChildren:
+    def test_finds_spawned_child(self, child) -> None:
+        assert child in procfs.children(os.getpid())
+        assert procfs.children(child) == []
+        assert procfs.deepest_child(child) == child
+
+    def test_scan_fallback_agrees(self, child) -> None:
+        assert procfs._children_by_scan(os.getpid()) == procfs.children(os.getpid())
+
+    def test_missing_pid(self) -> None:
+        assert procfs.children(2**22 + 1) == []
+        assert not procfs.is_alive(2**22 + 1)
+
+
+class TestPanePidCache:
+    async def test_shell_pid_read_once(self, child, monkeypatch) -> None:
+        from ccbot.tmux_manager import TmuxManager
+
+        manager = TmuxManager(session_name="test")
+        reads = []
+
+        def read_shell_pid(window_id: str) -> int:
+            reads.append(window_id)
+            return os.getpid()
+
+        monkeypatch.setattr(manager, "_read_shell_pid", read_shell_pid)
+        monkeypatch.setattr("ccbot.tmux_manager.PANE_PID_CACHE_TTL", 0)
+        assert await manager.get_pane_pid("@1") == procfs.deepest_child(os.getpid())
+        # Expired foreground PID: the tree is walked again, tmux not asked
+        await manager.get_pane_pid("@1")
+        assert reads == ["@1"]
+
+
+class TestCpuTicks:
+    def test_tree_includes_children(self, child) -> None:
+        own = procfs.cpu_ticks(os.getpid())
+        ticks, count = procfs.tree_cpu_ticks(os.getpid())
+        assert count >= 2
+        assert ticks >= own
+
+    def test_gone_pid(self) -> None:
+        assert procfs.cpu_ticks(2**22 + 1) is None
+        assert procfs.tree_cpu_ticks(2**22 + 1) is None
@@ -0,0 +1,134 @@
+"""Tests for the terminal screenshot renderer."""
+
+import io
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+from ccbot import screenshot
+from ccbot.screenshot import text_to_image
+
+
+@pytest.fixture
+def font_loads(monkeypatch: pytest.MonkeyPatch) -> list:
+    monkeypatch.setattr(screenshot, "_font_cache", {})
+    monkeypatch.setattr(screenshot, "_advance_cache", {})
+    monkeypatch.setattr(screenshot, "_glyph_cache", {})
+    loads = []
+    load = screenshot._load_font
+
+    def counting_load(path, size):
+        loads.append((path.name, size))
+        return load(path, size)
+
+    monkeypatch.setattr(screenshot, "_load_font", counting_load)
+    return loads
+
+
+class TestFontCache:
+    async def test_fonts_loaded_once_per_size(self, font_loads) -> None:
+        await text_to_image("hello", font_size=20)
+        await text_to_image("world", font_size=20)
+        assert len(font_loads) == len(screenshot._FONT_PATHS)
+        await text_to_image("hello", font_size=24)
+        assert len(font_loads) == 2 * len(screenshot._FONT_PATHS)
+
+    async def test_advances_memoized_per_char(self, font_loads) -> None:
+        width = screenshot._text_width("abca", 0, 20)
+        assert {k[2] for k in screenshot._advance_cache} == {"a", "b", "c"}
+        font = screenshot._get_fonts(20)[0]
+        assert width == pytest.approx(font.getlength("abca"))
+
+
+async def test_image_width_follows_longest_line(font_loads) -> None:
+    png = await text_to_image("ab\n\x1b[41mabcd\x1b[0m", font_size=20)
+    img = Image.open(io.BytesIO(png))
+    advance = screenshot._get_fonts(20)[0].getlength("a")
+    assert img.width == int(4 * advance) + 32
+    assert img.getpixel((17, 16 + 28 + 2)) == screenshot._ANSI_COLORS[1]
+
+
+class TestGrid:
+    def test_layout_wide_chars_and_background_runs(self) -> None:
+        segments = screenshot._parse_ansi_line("中a\x1b[41m b\x1b[0mc")
+        bg_runs, glyphs, used = screenshot._layout_grid_line(segments)
+        assert [(g.col, g.cells, g.text) for g in glyphs] == [
+            (0, 2, "中"),
+            (2, 1, "a"),
+            (4, 1, "b"),
+            (5, 1, "c"),
+        ]
+        assert bg_runs == [[3, 5, screenshot._ANSI_COLORS[1]]]
+        assert used == 6
+
+    def test_combining_mark_joins_base(self) -> None:
+        segments = screenshot._parse_ansi_line("e\u0301x")
+        _, glyphs, used = screenshot._layout_grid_line(segments)
+        assert [g.text for g in glyphs] == ["e\u0301", "x"]
+        assert used == 2
+
+    def test_combining_mark_after_space_stays_in_its_cell(self) -> None:
+        segments = screenshot._parse_ansi_line("a \u0301b\u0303")
+        _, glyphs, used = screenshot._layout_grid_line(segments)
+        assert [(g.col, g.text) for g in glyphs] == [
+            (0, "a"),
+            (1, " \u0301"),
+            (2, "b\u0303"),
+        ]
+        assert used == 3
+
+    def test_orphan_combining_mark_dropped(self) -> None:
+        segments = screenshot._parse_ansi_line("\u0301x")
+        _, glyphs, used = screenshot._layout_grid_line(segments)
+        assert [(g.col, g.text) for g in glyphs] == [(0, "x")]
+        assert used == 1
+
+    def test_glyph_mask_keeps_negative_left_bearing(self, font_loads) -> None:
+        font = screenshot._get_fonts(28)[0]
+        ch = "\u0389"  # Greek capital eta with tonos, overhangs to the left
+        assert font.getbbox(ch)[0] < 0
+        mask, offset = screenshot._glyph_mask(ch, 0, 28)
+        expected = Image.new("L", (100, 50))
+        ImageDraw.Draw(expected).text((40, 0), ch, fill=255, font=font)
+        drawn = Image.new("L", (100, 50))
+        drawn.paste(255, (40 + offset, 0), mask)
+        assert ImageChops.difference(expected, drawn).getbbox() is None
+
+    async def test_canvas_follows_pane_size(self, font_loads) -> None:
+        png = await text_to_image("ab\ncd\n", font_size=20, columns=80, rows=24)
+        img = Image.open(io.BytesIO(png))
+        cell = screenshot._get_fonts(20)[0].getlength("M")
+        assert img.size == (round(80 * cell) + 32, 24 * 28 + 32)
+
+    async def test_glyphs_rasterized_once(self, font_loads) -> None:
+        await text_to_image("aaa\naba", font_size=20, columns=10, rows=2)
+        assert set(screenshot._glyph_cache) == {(20, 0, "a"), (20, 0, "b")}
+
+
+class TestFrameCache:
+    @pytest.fixture
+    def renders(self, monkeypatch: pytest.MonkeyPatch) -> list:
+        monkeypatch.setattr(screenshot, "_frame_cache", {})
+        calls = []
+
+        async def fake_render(text, **kwargs) -> bytes:
+            calls.append(text)
+            return f"png:{text}".encode()
+
+        monkeypatch.setattr(screenshot, "text_to_image", fake_render)
+        return calls
+
+    async def test_unchanged_pane_is_not_rendered_again(self, renders) -> None:
+        first = await screenshot.render_frame("@1", "frame", 80, 24)
+        assert await screenshot.render_frame("@1", "frame", 80, 24) == first
+        assert renders == ["frame"]
+
+        await screenshot.render_frame("@1", "frame", 100, 24)  # Resized
+        await screenshot.render_frame("@1", "next", 100, 24)
+        assert renders == ["frame", "frame", "next"]
+
+    async def test_cache_is_bounded(self, renders, monkeypatch) -> None:
+        monkeypatch.setattr(screenshot, "_FRAME_CACHE_MAX", 2)
+        for wid in ("@1", "@2", "@1", "@3"):
+            await screenshot.render_frame(wid, "frame")
+        assert list(screenshot._frame_cache) == ["@1", "@3"]
@@ -1,4 +1,4 @@
-"""Tests for SessionManager pure dict operations."""
+"""Tests for SessionManager dict operations and state persistence."""
 
 import pytest
 
@@ -115,3 +115,150 @@ class TestIsWindowId:
         assert mgr._is_window_id("@") is False
         assert mgr._is_window_id("") is False
         assert mgr._is_window_id("@abc") is False
+
+
+class TestWriteBehind:
+    @pytest.fixture
+    def persisted(self, monkeypatch, tmp_path):
+        from ccbot import session
+        from ccbot.config import config
+
+        writes: list[dict] = []
+        real_write = session.atomic_write_json
+
+        def counting_write(path, data, indent=2):
+            writes.append(data)
+            real_write(path, data, indent)
+
+        monkeypatch.setattr(config, "state_file", tmp_path / "state.json")
+        monkeypatch.setattr(session, "atomic_write_json", counting_write)
+        monkeypatch.setattr(session, "STATE_SAVE_DELAY", 0.01)
+        monkeypatch.setattr(SessionManager, "_load_state", lambda self: None)
+        return SessionManager(), writes, tmp_path / "state.json"
+
+    def test_saves_immediately_outside_loop(self, persisted) -> None:
+        mgr, writes, path = persisted
+        mgr.bind_thread(100, 1, "@1")
+        assert len(writes) == 1
+        assert path.exists()
+
+    async def test_coalesces_saves(self, persisted) -> None:
+        import asyncio
+        import json
+
+        mgr, writes, path = persisted
+        for offset in range(50):
+            mgr.update_user_window_offset(100, "@1", offset)
+        assert writes == []
+        await asyncio.sleep(0.1)
+        assert len(writes) == 1
+        data = json.loads(path.read_text())
+        assert data["user_window_offsets"]["100"]["@1"] == 49
+
+    async def test_flush_writes_pending_changes(self, persisted, monkeypatch) -> None:
+        import json
+
+        from ccbot import session
+
+        monkeypatch.setattr(session, "STATE_SAVE_DELAY", 60.0)
+        mgr, writes, path = persisted
+        mgr.set_group_chat_id(100, 1, -200)
+        assert writes == []
+        await mgr.flush_state()
+        assert len(writes) == 1
+        assert json.loads(path.read_text())["group_chat_ids"] == {"100:1": -200}
+        await mgr.flush_state()
+        assert len(writes) == 1
+
+    async def test_failed_sqlite_save_is_retried(self, persisted, monkeypatch):
+        import asyncio
+        import sqlite3
+
+        mgr, writes, _path = persisted
+        real_write = mgr._write_state
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        def flaky_write(state):
+            if failures:
+                raise failures.pop()
+            real_write(state)
+
+        monkeypatch.setattr(mgr, "_write_state", flaky_write)
+        mgr.set_group_chat_id(100, 1, -200)
+        await asyncio.sleep(0.1)
+        assert len(writes) == 1
+        assert not mgr._dirty
+
+    async def test_flush_survives_sqlite_error(self, persisted, monkeypatch):
+        import sqlite3
+
+        from ccbot import session
+
+        monkeypatch.setattr(session, "STATE_SAVE_DELAY", 60.0)
+        mgr, _writes, _path = persisted
+
+        def locked(state):
+            raise sqlite3.OperationalError("database is locked")
+
+        mgr.set_group_chat_id(100, 1, -200)
+        monkeypatch.setattr(mgr, "_write_state", locked)
+        await mgr.flush_state()
+        assert mgr._dirty
+
+
+class TestSqliteDirtyRows:
+    @pytest.fixture
+    def stored(self, monkeypatch, tmp_path):
+        from ccbot import session
+        from ccbot.state_store import StateStore
+
+        store = StateStore(tmp_path / "state.db")
+        written: list[dict] = []
+        real_write_rows = store.write_rows
+
+        def recording_write_rows(changes):
+            written.append(changes)
+            return real_write_rows(changes)
+
+        monkeypatch.setattr(store, "write_rows", recording_write_rows)
+        monkeypatch.setattr(session, "get_state_store", lambda: store)
+        monkeypatch.setattr(session, "STATE_SAVE_DELAY", 60.0)
+        monkeypatch.setattr(SessionManager, "_load_state", lambda self: None)
+        yield SessionManager(), store, written
+        store.close()
+
+    async def test_save_writes_only_changed_keys(self, stored) -> None:
+        mgr, store, written = stored
+        for uid in range(50):
+            mgr.bind_thread(uid, 1, f"@{uid}")
+        await mgr.flush_state()
+        assert store.load_session_state()["thread_bindings"]["7"] == {"1": "@7"}
+
+        mgr.update_user_window_offset(7, "@7", 123)
+        mgr.unbind_thread(8, 1)
+        await mgr.flush_state()
+        assert written[-1] == {
+            "user_window_offsets": {(7, "@7"): (123,)},
+            "thread_bindings": {(8, 1): None},
+        }
+        state = store.load_session_state()
+        assert state["user_window_offsets"] == {"7": {"@7": 123}}
+        assert "8" not in state["thread_bindings"]
+
+    async def test_failed_write_keeps_its_keys(self, stored, monkeypatch) -> None:
+        import sqlite3
+
+        mgr, store, _written = stored
+        mgr.set_group_chat_id(100, 1, -200)
+
+        def locked(write):
+            raise sqlite3.OperationalError("database is locked")
+
+        real_write = mgr._write_state
+        monkeypatch.setattr(mgr, "_write_state", locked)
+        await mgr.flush_state()
+        assert mgr._dirty_rows == {"group_chat_ids": {("100:1",)}}
+
+        monkeypatch.setattr(mgr, "_write_state", real_write)
+        await mgr.flush_state()
+        assert store.load_session_state()["group_chat_ids"] == {"100:1": -200}
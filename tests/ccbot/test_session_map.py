@@ -0,0 +1,170 @@
+"""Tests for the shared, change-gated session_map reader."""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import os
+
+import pytest
+
+from ccbot.config import config
+from ccbot.session_map import SessionMapReader
+
+
+def _write(path, data: dict) -> None:
+    path.write_text(json.dumps(data))
+
+
+@pytest.fixture
+def reader(tmp_path):
+    return SessionMapReader(tmp_path / "session_map.json")
+
+
+def _key(wid: str) -> str:
+    return f"{config.tmux_session_name}:{wid}"
+
+
+class TestSessionMapReader:
+    async def test_missing_file(self, reader):
+        snapshot = await reader.refresh()
+        assert not snapshot.exists
+        assert snapshot.version == 0
+
+    async def test_parses_only_on_change(self, reader, monkeypatch):
+        import ccbot.session_map as session_map
+
+        _write(reader.path, {_key("@1"): {"session_id": "s1", "cwd": "/a"}})
+        loads = 0
+        real_loads = json.loads
+
+        def counting_loads(text):
+            nonlocal loads
+            loads += 1
+            return real_loads(text)
+
+        monkeypatch.setattr(session_map.json, "loads", counting_loads)
+        first = await reader.refresh()
+        second = await reader.refresh()
+        assert loads == 1
+        assert second is first
+        assert first.window_sessions == {"@1": "s1"}
+        assert first.get("@1")["cwd"] == "/a"
+
+    async def test_snapshot_is_immutable(self, reader):
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        snapshot = await reader.refresh()
+        with pytest.raises(TypeError):
+            snapshot.entries[_key("@2")] = {}  # type: ignore[index]
+        with pytest.raises(TypeError):
+            snapshot.get("@1")["session_id"] = "x"  # type: ignore[index]
+
+    async def test_listeners_called_on_change_only(self, reader):
+        seen = []
+        reader.add_listener(lambda snap: seen.append(dict(snap.window_sessions)))
+
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        await reader.refresh()
+        # Same contents rewritten: stat changes, snapshot does not
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        os.utime(reader.path, ns=(1, 1))
+        await reader.refresh()
+        _write(reader.path, {_key("@1"): {"session_id": "s2"}, "other:@9": {}})
+        await reader.refresh()
+        reader.path.unlink()
+        await reader.refresh()
+
+        assert seen == [{"@1": "s1"}, {"@1": "s2"}, {}]
+        assert not reader.snapshot.exists
+
+    async def test_unparseable_keeps_previous(self, reader):
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        good = await reader.refresh()
+        reader.path.write_text('{"truncated": ')
+        assert await reader.refresh() is good
+        _write(reader.path, {_key("@1"): {"session_id": "s3"}})
+        assert (await reader.refresh()).window_sessions == {"@1": "s3"}
+
+    async def test_wait_for_change(self, reader):
+        assert not await reader.wait_for_change(0.01)
+
+        async def write_later():
+            await asyncio.sleep(0.01)
+            _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+            await reader.refresh()
+
+        task = asyncio.create_task(write_later())
+        assert await reader.wait_for_change(2.0)
+        await task
+
+
+def _append_raw(reader, text: str) -> None:
+    with open(reader.log_path, "a") as f:
+        f.write(text)
+
+
+def _append(reader, *records: tuple[str, dict | None]) -> None:
+    _append_raw(
+        reader, "".join(json.dumps({"key": k, "entry": e}) + "\n" for k, e in records)
+    )
+
+
+@contextlib.contextmanager
+def _exclusive_lock(reader):
+    with open(reader.lock_path, "w") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        yield
+
+
+class TestSessionMapLog:
+    async def test_reads_only_appended_records(self, reader):
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        await reader.refresh()
+        base_key = reader._stat_key
+
+        _append(reader, (_key("@2"), {"session_id": "s2"}))
+        snapshot = await reader.refresh()
+        assert snapshot.window_sessions == {"@1": "s1", "@2": "s2"}
+        assert reader._stat_key == base_key  # session_map.json not re-read
+
+        # A partial line waits for the rest of the append
+        _append_raw(reader, json.dumps({"key": _key("@1"), "entry": None}))
+        assert await reader.refresh() is snapshot
+        _append_raw(reader, "\n")
+        assert (await reader.refresh()).window_sessions == {"@2": "s2"}
+
+    async def test_log_without_base(self, reader):
+        _append(reader, (_key("@1"), {"session_id": "s1"}))
+        snapshot = await reader.refresh()
+        assert snapshot.exists
+        assert snapshot.window_sessions == {"@1": "s1"}
+
+    async def test_compact_keeps_snapshot(self, reader):
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        _append(reader, (_key("@2"), {"session_id": "s2"}))
+        before = await reader.refresh()
+
+        assert await reader.compact() == 0
+        assert reader.snapshot is before
+        assert reader.log_path.read_bytes() == b""
+
+        stale = {_key("@1"): before.entries[_key("@1")]}
+        assert await reader.compact(stale) == 1
+        assert reader.snapshot.window_sessions == {"@2": "s2"}
+        assert json.loads(reader.path.read_text()) == {_key("@2"): {"session_id": "s2"}}
+
+    async def test_reload_waits_for_compaction(self, reader):
+        _write(reader.path, {_key("@1"): {"session_id": "s1"}})
+        _append(reader, (_key("@2"), {"session_id": "s2"}))
+        with _exclusive_lock(reader):  # A compaction in progress
+            reload = asyncio.create_task(reader.refresh())
+            await asyncio.sleep(0.05)
+            assert not reload.done()
+            # Fold the log in, as compact_session_map does, then unlock
+            _write(
+                reader.path,
+                {_key("@1"): {"session_id": "s1"}, _key("@2"): {"session_id": "s2"}},
+            )
+            os.truncate(reader.log_path, 0)
+        snapshot = await reload
+        assert snapshot.window_sessions == {"@1": "s1", "@2": "s2"}
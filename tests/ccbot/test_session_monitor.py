@@ -0,0 +1,138 @@
+"""Tests for SessionMonitor pending tool_use bookkeeping."""
+
+import os
+
+import pytest
+
+from ccbot.session_monitor import PENDING_TOOLS_MAX_PER_SESSION, SessionMonitor
+
+
+@pytest.fixture
+def monitor(tmp_path) -> SessionMonitor:
+    return SessionMonitor(
+        projects_path=tmp_path,
+        poll_interval=1.0,
+        state_file=tmp_path / "monitor_state.json",
+    )
+
+
+class TestCarryPendingTools:
+    def test_resolved_tools_are_dropped(self, monitor: SessionMonitor):
+        monitor._carry_pending_tools("s1", {"a": 1, "b": 2})
+        monitor._carry_pending_tools("s1", {"b": 2})
+        assert dict(monitor._pending_tools["s1"].items()) == {"b": 2}
+
+    def test_empty_remaining_removes_session(self, monitor: SessionMonitor):
+        monitor._carry_pending_tools("s1", {"a": 1})
+        monitor._carry_pending_tools("s1", {})
+        assert "s1" not in monitor._pending_tools
+
+    def test_pending_tools_are_capped(self, monitor: SessionMonitor):
+        remaining = {f"t{i}": i for i in range(PENDING_TOOLS_MAX_PER_SESSION + 50)}
+        monitor._carry_pending_tools("s1", remaining)
+        assert len(monitor._pending_tools["s1"]) == PENDING_TOOLS_MAX_PER_SESSION
+
+    def test_existing_entries_keep_their_age(
+        self, monitor: SessionMonitor, monkeypatch
+    ):
+        now = [100.0]
+        monkeypatch.setattr("ccbot.utils.time.monotonic", lambda: now[0])
+        monitor._carry_pending_tools("s1", {"old": 1})
+        now[0] += 10
+        monitor._carry_pending_tools("s1", {"old": 1, "new": 2})
+        now[0] += monitor._pending_tools["s1"].ttl - 5
+        assert "old" not in monitor._pending_tools["s1"]
+        assert "new" in monitor._pending_tools["s1"]
+
+
+class TestPollSession:
+    async def test_reads_one_tracked_session(
+        self, monitor: SessionMonitor, tmp_path, monkeypatch, make_jsonl_entry
+    ):
+        import json
+        from types import MappingProxyType, SimpleNamespace
+
+        from ccbot import session_monitor
+        from ccbot.monitor_state import TrackedSession
+
+        jsonl = tmp_path / "s1.jsonl"
+        jsonl.write_text("")
+        monitor.state.update_session(TrackedSession("s1", str(jsonl), 0))
+        monkeypatch.setattr(
+            session_monitor,
+            "session_map_reader",
+            SimpleNamespace(
+                snapshot=SimpleNamespace(window_sessions=MappingProxyType({"@1": "s1"}))
+            ),
+        )
+        received = []
+
+        async def callback(msg):
+            received.append(msg.text)
+
+        monitor.set_message_callback(callback)
+        entry = make_jsonl_entry(
+            content=[{"type": "text", "text": "hello"}], session_id="s1"
+        )
+        jsonl.write_text(json.dumps(entry) + "\n")
+
+        await monitor.poll_session("s1")
+        assert received == ["hello"]
+        assert monitor.state.get_session("s1").last_byte_offset == jsonl.stat().st_size
+
+        # An append in the same mtime tick as that read is still picked up
+        mtime_ns = jsonl.stat().st_mtime_ns
+        entry = make_jsonl_entry(
+            content=[{"type": "text", "text": "final"}], session_id="s1"
+        )
+        with jsonl.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+        os.utime(jsonl, ns=(mtime_ns, mtime_ns))
+        await monitor.poll_session("s1")
+        assert received == ["hello", "final"]
+
+    async def test_untracked_session_wakes_loop(self, monitor: SessionMonitor):
+        await monitor.poll_session("unknown")
+        assert monitor._wake.is_set()
+
+
+class TestSessionMapGarbage:
+    async def test_drops_entries_of_dead_windows(
+        self, monitor: SessionMonitor, tmp_path, monkeypatch
+    ):
+        import json
+
+        from ccbot import session_monitor
+        from ccbot.session_map import SessionMapReader
+
+        reader = SessionMapReader(tmp_path / "session_map.json")
+        reader.path.write_text(
+            json.dumps({"s:@1": {"session_id": "a"}, "s:@2": {"session_id": "b"}})
+        )
+        monkeypatch.setattr(session_monitor, "session_map_reader", reader)
+
+        async def live_keys():
+            return {"s:@2", "s:proj"}
+
+        monkeypatch.setattr(session_monitor.tmux_manager, "list_window_keys", live_keys)
+        await monitor._collect_session_map_garbage()
+        assert set(reader.snapshot.entries) == {"s:@2"}
+
+    async def test_tmux_failure_keeps_entries(
+        self, monitor: SessionMonitor, tmp_path, monkeypatch
+    ):
+        import json
+
+        from ccbot import session_monitor
+        from ccbot.session_map import SessionMapReader
+
+        reader = SessionMapReader(tmp_path / "session_map.json")
+        reader.path.write_text(json.dumps({"s:@1": {"session_id": "a"}}))
+        monkeypatch.setattr(session_monitor, "session_map_reader", reader)
+
+        async def no_tmux():
+            return None
+
+        monkeypatch.setattr(session_monitor.tmux_manager, "list_window_keys", no_tmux)
+        await monitor._collect_session_map_garbage()
+        assert json.loads(reader.path.read_text()) == {"s:@1": {"session_id": "a"}}
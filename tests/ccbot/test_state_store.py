@@ -0,0 +1,120 @@
+"""Tests for the SQLite state backend."""
+
+import json
+
+import pytest
+
+from ccbot.monitor_state import MonitorState, TrackedSession
+from ccbot.state_store import StateStore
+
+STATE = {
+    "window_states": {
+        "@1": {"session_id": "s1", "cwd": "/a", "window_name": "proj"},
+        "@2": {"session_id": "s2", "cwd": "/b"},
+    },
+    "user_window_offsets": {"100": {"@1": 10, "@2": 20}},
+    "thread_bindings": {"100": {"5": "@1", "6": "@2"}},
+    "group_chat_ids": {"100:5": -1001},
+    "window_display_names": {"@1": "proj", "@2": "other"},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = StateStore(tmp_path / "state.db")
+    yield s
+    s.close()
+
+
+class TestSessionState:
+    def test_roundtrip_across_reopen(self, store, tmp_path):
+        store.save_session_state(STATE)
+        store.close()
+        reopened = StateStore(tmp_path / "state.db")
+        try:
+            assert reopened.load_session_state() == STATE
+        finally:
+            reopened.close()
+
+    def test_wal_mode(self, store):
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_writes_only_changed_rows(self, store):
+        assert store.save_session_state(STATE) == 9
+        assert store.save_session_state(STATE) == 0
+
+        state = json.loads(json.dumps(STATE))
+        state["user_window_offsets"]["100"]["@1"] = 99
+        assert store.save_session_state(state) == 1
+
+        del state["thread_bindings"]["100"]["6"]
+        assert store.save_session_state(state) == 1
+        assert store.load_session_state()["thread_bindings"] == {"100": {"5": "@1"}}
+
+    def test_write_rows_touches_only_given_keys(self, store):
+        store.save_session_state(STATE)
+        changes = {
+            "user_window_offsets": {(100, "@1"): (11,), (100, "@2"): (20,)},
+            "thread_bindings": {(100, 6): None, (100, 9): None},
+        }
+        assert store.write_rows(changes) == 2  # Unchanged and missing rows skipped
+        state = store.load_session_state()
+        assert state["user_window_offsets"] == {"100": {"@1": 11, "@2": 20}}
+        assert state["thread_bindings"] == {"100": {"5": "@1"}}
+        assert state["window_states"] == STATE["window_states"]
+
+
+class TestMigration:
+    def test_imports_json_once(self, store, tmp_path):
+        state_file = tmp_path / "state.json"
+        monitor_file = tmp_path / "monitor_state.json"
+        state_file.write_text(json.dumps(STATE))
+        monitor_file.write_text(
+            json.dumps(
+                {
+                    "tracked_sessions": {
+                        "s1": {
+                            "session_id": "s1",
+                            "file_path": "/a/s1.jsonl",
+                            "last_byte_offset": 42,
+                        }
+                    }
+                }
+            )
+        )
+
+        assert store.migrate_from_json(state_file, monitor_file) is True
+        assert store.load_session_state() == STATE
+        assert store.load_tracked_sessions()["s1"]["last_byte_offset"] == 42
+
+        # Later JSON edits are not re-imported
+        state_file.write_text(json.dumps({"window_states": {}}))
+        assert store.migrate_from_json(state_file, monitor_file) is False
+        assert store.load_session_state() == STATE
+
+    def test_missing_json_files(self, store, tmp_path):
+        assert store.migrate_from_json(tmp_path / "no.json", tmp_path / "none.json")
+        assert store.load_session_state()["window_states"] == {}
+
+
+class TestMonitorStateWithStore:
+    def test_save_and_load(self, store, tmp_path):
+        state = MonitorState(state_file=tmp_path / "unused.json", store=store)
+        state.update_session(TrackedSession("s1", "/a/s1.jsonl", 7))
+        state.save_if_dirty()
+        assert not (tmp_path / "unused.json").exists()
+
+        loaded = MonitorState(state_file=tmp_path / "unused.json", store=store)
+        loaded.load()
+        assert loaded.get_session("s1").last_byte_offset == 7
+
+        loaded.update_session(TrackedSession("s1", "/a/s1.jsonl", 8))
+        loaded.save()
+        assert store.load_tracked_sessions()["s1"]["last_byte_offset"] == 8
+
+        loaded.update_session(TrackedSession("s2", "/a/s2.jsonl", 1))
+        loaded.remove_session("s1")
+        loaded.save()
+        assert list(store.load_tracked_sessions()) == ["s2"]
+        assert loaded._dirty_ids == set()
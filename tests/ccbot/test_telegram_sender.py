@@ -79,3 +79,64 @@ class TestSplitMessage:
         chunks = split_message(text, max_length=200)
         for chunk in chunks:
             assert len(chunk) <= 200
+
+
+class TestSplitMessageFences:
+    def test_fence_closed_and_reopened_across_chunks(self):
+        body = "\n".join(f"line {i}" for i in range(30))
+        text = f"intro\n```python\n{body}\n```\noutro"
+        chunks = split_message(text, max_length=80)
+        assert len(chunks) > 2
+        for chunk in chunks:
+            assert chunk.count("```") % 2 == 0
+        assert all(chunk.startswith("```python") for chunk in chunks[1:])
+        assert chunks[-1].endswith("```\noutro")
+
+    def test_content_preserved_across_fenced_chunks(self):
+        body = [f"value_{i} = {i}" for i in range(50)]
+        text = "```\n" + "\n".join(body) + "\n```"
+        chunks = split_message(text, max_length=100)
+        lines = [
+            line
+            for chunk in chunks
+            for line in chunk.split("\n")
+            if not line.startswith("```")
+        ]
+        assert lines == body
+
+    def test_tilde_fence_not_closed_by_backticks(self):
+        text = "~~~\n" + "```\n" * 40 + "~~~"
+        chunks = split_message(text, max_length=40)
+        assert all(chunk.startswith("~~~") for chunk in chunks)
+        assert all(chunk.endswith("~~~") for chunk in chunks)
+
+    def test_long_line_inside_fence_is_wrapped(self):
+        text = "```\n" + "a" * 200 + "\n```"
+        chunks = split_message(text, max_length=60)
+        for chunk in chunks:
+            assert chunk.startswith("```\n")
+            assert chunk.endswith("\n```")
+            assert len(chunk) <= 60
+
+
+class TestSplitMessageMarkdownV2Budget:
+    def test_budget_counts_escapes(self):
+        text = "\n".join(["a.b.c.d.e"] * 20)  # 9 chars, 13 once escaped
+        assert len(split_message(text, max_length=100)) == 2
+        chunks = split_message(text, max_length=100, markdown_v2=True)
+        assert len(chunks) == 3
+        for chunk in chunks:
+            assert len(chunk) + chunk.count(".") <= 100
+
+    def test_long_line_cut_by_escaped_length(self):
+        chunks = split_message("!" * 100, max_length=30, markdown_v2=True)
+        assert chunks == ["!" * 15] * 6 + ["!" * 10]
+
+    def test_large_input_is_fast(self):
+        import time
+
+        text = "\n".join(f"line {i} with text" for i in range(200_000))
+        start = time.perf_counter()
+        chunks = split_message(text)
+        assert time.perf_counter() - start < 5
+        assert "\n".join(chunks) == text
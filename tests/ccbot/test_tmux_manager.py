@@ -0,0 +1,155 @@
+"""Tests for TmuxManager's input path: readiness waits and pastes."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ccbot.config import config
+from ccbot.tmux_manager import (
+    PASTE_THRESHOLD,
+    TmuxManager,
+    _count_bash_prompts,
+    _echo_counter,
+)
+
+
+class TestEchoCounter:
+    def test_counts_wrapped_tail(self) -> None:
+        count = _echo_counter("please refactor the session monitor loop")
+        screen = "> please refactor the session mon\n  itor loop\n"
+        assert count(screen) == 1
+        assert count("> please refactor\n") == 0
+
+    def test_pasted_placeholder_counts(self) -> None:
+        count = _echo_counter("line one\nline two\n")
+        assert count("> [Pasted text #1 +2 lines]") == 1
+
+    def test_bash_prompt(self) -> None:
+        assert _count_bash_prompts("history\n! ls -la\n") == 1
+        assert _count_bash_prompts("> !ls\n") == 0
+
+
+class TestWaitForPane:
+    @pytest.fixture
+    def manager(self, monkeypatch: pytest.MonkeyPatch) -> TmuxManager:
+        monkeypatch.setattr("ccbot.tmux_manager.READY_POLL_INTERVAL", 0.001)
+        return TmuxManager(session_name="test")
+
+    async def test_returns_once_echoed(self, manager, monkeypatch) -> None:
+        screens = iter(["> hel", "> hel", "> hello world"])
+        captures = 0
+
+        async def capture(window_id: str) -> str:
+            nonlocal captures
+            captures += 1
+            return next(screens)
+
+        monkeypatch.setattr(manager, "_capture_text", capture)
+        screen = await manager._wait_for_pane(
+            "@1", "> ", _echo_counter("hello world"), 5.0
+        )
+        assert screen == "> hello world"
+        assert captures == 3
+
+    async def test_earlier_identical_message_is_not_the_echo(
+        self, manager, monkeypatch
+    ) -> None:
+        baseline = "> hello world\n● Hi!\n> "
+
+        async def capture(window_id: str) -> str:
+            return baseline  # New text never shows up
+
+        monkeypatch.setattr(manager, "_capture_text", capture)
+        screen = await manager._wait_for_pane(
+            "@1", baseline, _echo_counter("hello world"), 0.02
+        )
+        assert screen == baseline
+
+    async def test_no_baseline_sleeps(self, manager, monkeypatch) -> None:
+        monkeypatch.setattr(config, "send_keys_adaptive", False)
+        slept: list[float] = []
+
+        async def fake_sleep(delay: float) -> None:
+            slept.append(delay)
+
+        monkeypatch.setattr("ccbot.tmux_manager.asyncio.sleep", fake_sleep)
+        baseline = await manager._screen_for_wait("@1")
+        assert baseline is None
+        assert await manager._wait_for_pane("@1", baseline, len, 0.5) is None
+        assert slept == [0.5]
+
+
+class TestPaste:
+    @pytest.fixture
+    def manager(self, monkeypatch: pytest.MonkeyPatch) -> TmuxManager:
+        monkeypatch.setattr(config, "send_keys_adaptive", False)
+        monkeypatch.setattr("ccbot.tmux_manager.SEND_ENTER_DELAY", 0)
+        manager = TmuxManager(session_name="test")
+        self.keys: list[tuple[str, bool]] = []
+        self.pasted: list[str] = []
+        pane = SimpleNamespace(
+            send_keys=lambda chars, enter, literal: self.keys.append((chars, enter))
+        )
+        window = SimpleNamespace(active_pane=pane)
+        session = SimpleNamespace(windows=SimpleNamespace(get=lambda **kw: window))
+        monkeypatch.setattr(manager, "get_session", lambda: session)
+
+        async def paste(window_id: str, text: str) -> bool:
+            self.pasted.append(text)
+            return True
+
+        monkeypatch.setattr(manager, "_paste_text", paste)
+        return manager
+
+    async def test_long_text_is_pasted(self, manager) -> None:
+        text = "x" * PASTE_THRESHOLD
+        assert await manager.send_keys("@1", text)
+        assert self.pasted == [text]
+        assert self.keys == [("", True)]  # Only Enter goes through send-keys
+
+    async def test_short_text_is_typed(self, manager) -> None:
+        assert await manager.send_keys("@1", "hello")
+        assert self.pasted == []
+        assert self.keys == [("hello", False), ("", True)]
+
+    async def test_bash_mode_prefix_is_typed(self, manager, monkeypatch) -> None:
+        monkeypatch.setattr("ccbot.tmux_manager.BASH_MODE_DELAY", 0)
+        rest = "y" * PASTE_THRESHOLD
+        assert await manager.send_keys("@1", "!" + rest)
+        assert self.keys[0] == ("!", False)
+        assert self.pasted == [rest]
+
+
+class TestPasteBuffer:
+    @pytest.fixture
+    def tmux_calls(self, monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, ...]]:
+        calls: list[tuple[str, ...]] = []
+
+        class FakeProcess:
+            def __init__(self, args: tuple[str, ...]) -> None:
+                # paste-buffer fails, everything else succeeds
+                self.returncode = 1 if args[1] == "paste-buffer" else 0
+
+            async def communicate(self, data: bytes | None = None):
+                return b"", b"can't find pane"
+
+            async def wait(self) -> int:
+                return self.returncode
+
+        async def fake_exec(*args: str, **kwargs) -> FakeProcess:
+            calls.append(args)
+            return FakeProcess(args)
+
+        monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+        return calls
+
+    async def test_failed_paste_deletes_buffer(self, tmux_calls) -> None:
+        manager = TmuxManager(session_name="test")
+        assert not await manager._paste_text("@1", "hello")
+        assert [call[1] for call in tmux_calls] == [
+            "load-buffer",
+            "paste-buffer",
+            "delete-buffer",
+        ]
+        assert tmux_calls[2][3] == tmux_calls[0][3]  # Same buffer name
@@ -5,7 +5,12 @@ from pathlib import Path
 
 import pytest
 
-from ccbot.utils import atomic_write_json, ccbot_dir, read_cwd_from_jsonl
+from ccbot.utils import (
+    ExpiringDict,
+    atomic_write_json,
+    ccbot_dir,
+    read_cwd_from_jsonl,
+)
 
 
 class TestCcbotDir:
@@ -70,3 +75,50 @@ class TestReadCwdFromJsonl:
 
     def test_missing_file_returns_empty(self, tmp_path: Path):
         assert read_cwd_from_jsonl(tmp_path / "nonexistent.jsonl") == ""
+
+
+class TestExpiringDict:
+    @pytest.fixture
+    def clock(self, monkeypatch: pytest.MonkeyPatch) -> list[float]:
+        now = [1000.0]
+        monkeypatch.setattr("ccbot.utils.time.monotonic", lambda: now[0])
+        return now
+
+    def test_size_cap_evicts_oldest(self, clock: list[float]):
+        d: ExpiringDict[str, int] = ExpiringDict(max_size=3, ttl=60)
+        for i in range(5):
+            d[f"k{i}"] = i
+        assert len(d) == 3
+        assert list(d) == ["k2", "k3", "k4"]
+        assert d.get("k0") is None
+
+    def test_entries_expire_after_ttl(self, clock: list[float]):
+        d: ExpiringDict[str, int] = ExpiringDict(max_size=10, ttl=60)
+        d["old"] = 1
+        clock[0] += 61
+        assert d.get("old") is None
+        assert "old" not in d
+        d["new"] = 2
+        assert len(d) == 1
+
+    def test_expired_entries_dropped_on_write(self, clock: list[float]):
+        d: ExpiringDict[str, int] = ExpiringDict(max_size=10, ttl=60)
+        for i in range(5):
+            d[f"k{i}"] = i
+        clock[0] += 61
+        d["fresh"] = 0
+        assert list(d) == ["fresh"]
+
+    def test_pop_returns_value_once(self, clock: list[float]):
+        d: ExpiringDict[str, int] = ExpiringDict(max_size=10, ttl=60)
+        d["a"] = 1
+        assert d.pop("a") == 1
+        assert d.pop("a") is None
+
+    def test_setting_refreshes_entry(self, clock: list[float]):
+        d: ExpiringDict[str, int] = ExpiringDict(max_size=2, ttl=60)
+        d["a"] = 1
+        d["b"] = 2
+        d["a"] = 3
+        d["c"] = 4
+        assert d.items() == [("a", 3), ("c", 4)]